@@ -1,9 +1,15 @@
+import os
+from datetime import date
+
 from dotenv import load_dotenv
-from mysmtp.email import Mailer
-from mysmtp.subproc import do, parse, lines
-from mysmtp.tasks import log_gpu_metrics
+from mysmtp.email import Mailer, Outbox
+from mysmtp.subproc import hostname
+from mysmtp.sink import flush_all
+from mysmtp.tasks import log_gpu_metrics, log_user_cpu, metrics_root
 from pathlib import Path
-from mysmtp.task.plot import plot_gpu_day
+
+# pandas, pyarrow and matplotlib are imported inside the daily tasks that
+# need them, so a (re)start only pays for what the 1 s loggers use.
 
 
 from rocketry import Rocketry
@@ -11,12 +17,13 @@ from rocketry.conds import daily, every
 
 load_dotenv()
 app = Rocketry()
+outbox = Outbox()  # mail is queued on disk and sent by a background worker
 
 # @app.task(daily)
 @app.task(daily.after("07:00"))
 def do_daily():
     M = Mailer()
-    M.send(subject="Test Email", message="Hello, this is a test email from Python.")
+    outbox.enqueue(M.compose(subject="Test Email", message="Hello, this is a test email from Python."))
 
 
 # @app.task(every("1 second"))
@@ -30,34 +37,69 @@ def do_daily():
 def do_log_gpu():
     log_gpu_metrics()
 
+@app.task(every("1 second"))
+def do_log_cpu():
+    log_user_cpu()
+
+@app.task(every("5 minutes"))
+def do_rollup():
+    from mysmtp.rollup import rollup_all
+
+    rollup_all(metrics_root())
+
 @app.task(daily.after("11:00"))
 def do_send_plot():
+    from mysmtp.task.plot import plot_gpu_day
 
+    flush_all()  # include rows still buffered by the logger
     d = Path(".").resolve()
-    f = list(d.glob("*metric*.csv"))[0]
+    f = metrics_root().resolve() / "gpu"
+    cache_dir = None  # the store has rollup tiers; the plot cache is for CSV input
+    if not f.exists():
+        f = list(d.glob("*metric*.csv"))[0]
+        cache_dir = d / ".plot_cache"
     print(f)
-    fig, ax = plot_gpu_day(f)
+    fig, ax = plot_gpu_day(f, cache_dir=cache_dir)
     # plt.show()
     # save to file
-    out_png = f.with_suffix(".png")
+    out_png = d / "gpu_metrics.png"
     fig.savefig(out_png)
     print(f"Saved plot to {out_png}")
 
 
 
-    hostname = lines(do(parse("hostname"))[0])[0]
-    subject = f'[auto smtp] {hostname}'
-    msg = f"GPU metrics plot from {hostname}"
+    host = hostname()
+    if os.environ.get("MYSMTP_DIGEST_DIR"):
+        # fleet mode: hand the report to the aggregator instead of mailing it
+        import pandas as pd
+        from mysmtp.digest import submit_report, summarize_gpu
+
+        today = pd.Timestamp(date.today())
+        stats = summarize_gpu(f, today, today + pd.Timedelta(days=1))
+        submit_report(host, stats, out_png)
+        return
+
+    subject = f'[auto smtp] {host}'
+    msg = f"GPU metrics plot from {host}"
     M = Mailer()
-    (
-        M.compose(subject=subject, message=msg)
-        .attach(path="gpu_metrics.png")
-        .send()
-    )
-    
+    outbox.enqueue(M.with_attachments(M.compose(subject=subject, message=msg), [out_png]))
+
+@app.task(daily.after("11:30"))
+def do_send_digest():
+    # only the host with MYSMTP_DIGEST_AGGREGATOR=1 sends the fleet digest
+    if os.environ.get("MYSMTP_DIGEST_AGGREGATOR") != "1":
+        return
+    from mysmtp.digest import send_digest
+
+    send_digest(Mailer(), date.today(), outbox=outbox)
+
 def main():
     print("Starting Rocketry app...")
-    app.run()
+    outbox.start()
+    try:
+        app.run()
+    finally:
+        outbox.stop()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Benchmark rendering a fleet of hosts as one figure per pass.
+
+Synthetic per-GPU series (one sample per second) are generated for each
+host and rendered repeatedly, reporting time and RSS after every pass::
+
+    uv run scripts/bench_dashboard.py --hosts 60 --passes 5
+
+* ``pyplot``: one ``plt.subplots`` figure per host, saved and never
+  closed (what a collector looping over ``plot_gpu_day`` used to do).
+* ``dashboard``: :class:`mysmtp.task.dashboard.Dashboard`, one reused
+  small-multiples figure for all hosts.
+
+Flat RSS across passes means figures are not leaking.
+"""
+
+import multiprocessing as mp
+import resource
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+
+def _rss_mib() -> float:
+    with open("/proc/self/statm") as fh:
+        return int(fh.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+def host_series(seed: int, gpus: int, hours: int):
+    """Yield ``(gpu, t, util, mem_pct)`` like :func:`mysmtp.task.plot.gpu_series`."""
+    rng = np.random.default_rng(seed)
+    t0 = np.datetime64("2026-01-01T00:00:00")
+    n = hours * 3600
+    t = t0 + np.arange(n).astype("timedelta64[s]")
+    for k in range(gpus):
+        util = rng.integers(0, 101, n // 60).repeat(60).astype(np.float32)
+        mem = np.cumsum(rng.normal(0, 0.05, n)).clip(-50, 50).astype(np.float32) + 50
+        yield k, t, util, mem
+
+
+# -------------------------------------------------------------------------
+# Renderers (each runs in its own process)
+# -------------------------------------------------------------------------
+
+def pyplot(cfg: "Config", out: Path, report) -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    from mysmtp.task.downsample import lttb, minmax_envelope
+
+    for p in range(cfg.passes):
+        t0 = time.perf_counter()
+        for h in range(cfg.hosts):
+            fig, ax = plt.subplots(figsize=(12, 6))
+            width = int(fig.get_figwidth() * fig.dpi)
+            for k, t, util, mem in host_series(h, cfg.gpus, cfg.hours):
+                tu, _, umax = minmax_envelope(t, util, width)
+                ax.step(tu, umax, where="post")
+                keep = lttb(t, mem, width)
+                ax.plot(t[keep], mem[keep], linestyle="--")
+            fig.savefig(out / f"host{h}.png")
+        report.put((p, time.perf_counter() - t0, _rss_mib()))
+
+
+def dashboard(cfg: "Config", out: Path, report) -> None:
+    from mysmtp.task.dashboard import Dashboard
+
+    t = next(host_series(0, 1, cfg.hours))[1]
+    with Dashboard(ncols=cfg.ncols) as dash:
+        for p in range(cfg.passes):
+            t0 = time.perf_counter()
+            panels = {f"host{h:03d}": host_series(h, cfg.gpus, cfg.hours) for h in range(cfg.hosts)}
+            dash.render(panels, out / "fleet.png", t[0], t[-1])
+            report.put((p, time.perf_counter() - t0, _rss_mib()))
+
+
+RENDERERS = {"pyplot": pyplot, "dashboard": dashboard}
+
+
+def _child(name: str, cfg: "Config", out: str, report) -> None:
+    try:
+        RENDERERS[name](cfg, Path(out), report)
+    finally:
+        report.put(None)
+
+
+def run(name: str, cfg: "Config", out: Path) -> list:
+    ctx = mp.get_context("spawn")
+    report = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(name, cfg, str(out), report))
+    proc.start()
+    rows = []
+    while (row := report.get()) is not None:
+        rows.append(row)
+    proc.join()
+    return rows
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+
+@dataclass
+class Config:
+    hosts: int = 60
+    gpus: int = 8
+    hours: int = 24
+    passes: int = 5
+    ncols: int = 6
+
+
+def main(cfg: Config) -> None:
+    table = Table(title=f"{cfg.hosts} hosts x {cfg.gpus} GPUs, {cfg.hours} h at 1 Hz")
+    table.add_column("renderer", style="cyan")
+    table.add_column("pass", justify="right")
+    table.add_column("time (s)", justify="right")
+    table.add_column("RSS (MiB)", justify="right", style="green")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in RENDERERS:
+            for p, elapsed, rss in run(name, cfg, Path(tmp)):
+                table.add_row(name, str(p + 1), f"{elapsed:.2f}", f"{rss:,.0f}")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
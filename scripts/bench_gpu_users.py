@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark attributing GPU processes to users once per tick.
+
+``--processes`` real processes (``sleep``) stand in for GPU processes
+spread over ``--gpus`` GPUs; every tick a few of them exit and new ones
+start, like short jobs coming and going::
+
+    uv run scripts/bench_gpu_users.py --processes 300 --ticks 200
+
+* ``uncached``: :func:`mysmtp.top.usage.get_uid` (``/proc/<pid>/status``)
+  for every GPU process on every tick, then per-user sums.
+* ``cached``: :class:`mysmtp.top.gpu_users.GpuUserSampler`, which reads
+  the start time (``/proc/<pid>/stat``) of known pids to catch reuse and
+  looks up the owner only for pids that are new or were reused.
+
+``/proc reads`` counts every file read or stat of ``/proc``.
+"""
+
+import subprocess
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+from mysmtp.top.gpu_users import GpuUserSampler
+from mysmtp.top.usage import get_uid
+
+console = Console()
+
+
+def uncached(processes: list[dict]) -> dict:
+    users: dict = {}
+    for p in processes:
+        uid = get_uid(p["pid"])
+        mem, gpus = users.setdefault(uid, [0, set()])
+        users[uid][0] = mem + p["gpu_memory_MiB"]
+        gpus.add(p["gpu"])
+    return users
+
+
+def cached_factory():
+    sampler = GpuUserSampler()
+
+    def cached(processes: list[dict]) -> dict:
+        return sampler.sample(processes).users
+
+    cached.sampler = sampler
+    return cached
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+
+@dataclass
+class Config:
+    processes: int = 300
+    gpus: int = 8
+    ticks: int = 200
+    churn: int = 2  # processes replaced per tick
+    seed: int = 0
+
+
+def main(cfg: Config) -> None:
+    rng = np.random.default_rng(cfg.seed)
+
+    def spawn() -> dict:
+        proc = subprocess.Popen(["sleep", "3600"])
+        return {"proc": proc, "pid": proc.pid, "gpu": int(rng.integers(cfg.gpus)),
+                "gpu_memory_MiB": int(rng.integers(100, 40_000))}
+
+    with console.status(f"starting {cfg.processes} processes"):
+        live = [spawn() for _ in range(cfg.processes)]
+    cached = cached_factory()
+    timings = {"uncached": [], "cached": []}
+    try:
+        for _ in range(cfg.ticks):
+            for i in rng.choice(len(live), cfg.churn, replace=False):
+                live[i]["proc"].kill()
+                live[i]["proc"].wait()
+                live[i] = spawn()
+            frame = [{k: p[k] for k in ("pid", "gpu", "gpu_memory_MiB")} for p in live]
+            for name, fn in (("uncached", uncached), ("cached", cached)):
+                t0 = time.perf_counter()
+                fn(frame)
+                timings[name].append(time.perf_counter() - t0)
+    finally:
+        for p in live:
+            p["proc"].kill()
+            p["proc"].wait()
+
+    table = Table(title=f"{cfg.processes} GPU processes, {cfg.churn} replaced per tick, {cfg.ticks} ticks")
+    table.add_column("attribution", style="cyan")
+    table.add_column("median (ms/tick)", justify="right", style="green")
+    table.add_column("p99 (ms/tick)", justify="right")
+    table.add_column("/proc reads", justify="right")
+    reads = {"uncached": cfg.ticks * cfg.processes, "cached": cached.sampler.owners.reads + cached.sampler.owners.checks}
+    for name, ts in timings.items():
+        ms = np.array(ts[1:]) * 1000  # the first tick fills the cache
+        table.add_row(name, f"{np.median(ms):.3f}", f"{np.percentile(ms, 99):.3f}", f"{reads[name]:,}")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Benchmark loading and preparing GPU metrics for ``plot_gpu_day``.
+
+A synthetic ``gpu.csv`` in the logger's format is written with one row per
+GPU per second, ending today, e.g. a month for 8 GPUs::
+
+    uv run scripts/bench_plot.py --days 30 --gpus 8
+
+Each pipeline runs in a fresh process so its peak RSS can be reported:
+
+* ``legacy``: the previous loader (all columns, inferred dtypes,
+  ``pd.to_datetime``, windowed ``.copy()``, per-group ``sort_values``
+  and change-point filtering).
+* ``lean``: :func:`load_gpu_metrics` + :func:`change_points` +
+  :func:`split_by_gpu`.
+* ``plot`` (with ``--render``): the full :func:`plot_gpu_day`, saved as PNG.
+"""
+
+import multiprocessing as mp
+import resource
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+
+# -------------------------------------------------------------------------
+# Fixture
+# -------------------------------------------------------------------------
+
+def write_fixture(path: Path, days: int, gpus: int, seed: int = 0) -> int:
+    """Write ``days`` of 1 Hz samples for ``gpus`` GPUs ending today; return the row count."""
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(datetime.now().date()) + np.timedelta64(1, "D")
+    start = end - np.timedelta64(days, "D")
+    rows = 0
+    with pacsv.CSVWriter(path, _schema()) as writer:
+        for day in range(days):
+            t0 = start + np.timedelta64(day, "D")
+            secs = t0 + np.arange(86_400).astype("timedelta64[s]")
+            for gpu in range(gpus):
+                n = len(secs)
+                # utilization holds for a while and then jumps, like real jobs
+                jumps = rng.random(n) < 0.3
+                util = rng.integers(0, 101, n)[np.maximum.accumulate(np.where(jumps, np.arange(n), 0))]
+                mem_jumps = rng.random(n) < 0.01
+                mem = rng.integers(0, 81_920, n)[np.maximum.accumulate(np.where(mem_jumps, np.arange(n), 0))]
+                writer.write_table(
+                    pa.table(
+                        {
+                            "timestamp": pa.array(secs.astype("datetime64[us]"), pa.timestamp("us", tz="UTC")),
+                            "driver_version": pa.array(["550.54.14"] * n),
+                            "cuda_version": pa.array(["12.4"] * n),
+                            "index": pa.array(np.full(n, gpu), pa.int64()),
+                            "name": pa.array(["NVIDIA A100-SXM4-80GB"] * n),
+                            "bus_id": pa.array([f"00000000:{gpu:02X}:00.0"] * n),
+                            "temperature_C": pa.array(30 + util // 3, pa.int64()),
+                            "power_usage_W": pa.array(60.0 + 3 * util),
+                            "power_cap_W": pa.array(np.full(n, 400.0)),
+                            "memory_used_MiB": pa.array(mem, pa.int64()),
+                            "memory_total_MiB": pa.array(np.full(n, 81_920), pa.int64()),
+                            "util_percent": pa.array(util, pa.int64()),
+                        },
+                        schema=_schema(),
+                    )
+                )
+                rows += n
+    return rows
+
+
+def _schema() -> pa.Schema:
+    return pa.schema(
+        [
+            ("timestamp", pa.timestamp("us", tz="UTC")),
+            ("driver_version", pa.string()),
+            ("cuda_version", pa.string()),
+            ("index", pa.int64()),
+            ("name", pa.string()),
+            ("bus_id", pa.string()),
+            ("temperature_C", pa.int64()),
+            ("power_usage_W", pa.float64()),
+            ("power_cap_W", pa.float64()),
+            ("memory_used_MiB", pa.int64()),
+            ("memory_total_MiB", pa.int64()),
+            ("util_percent", pa.int64()),
+        ]
+    )
+
+
+# -------------------------------------------------------------------------
+# Pipelines (each runs in its own process)
+# -------------------------------------------------------------------------
+
+def _window():
+    import pandas as pd
+
+    today = pd.Timestamp(datetime.now().date())
+    return today - pd.Timedelta(days=7), today + pd.Timedelta(days=1)
+
+
+def legacy(path: str) -> int:
+    import pandas as pd
+
+    tweek, tomorrow = _window()
+    df = pd.read_csv(path)
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    df["timestamp"] = df["timestamp"].dt.tz_localize(None)
+    df = df[(df["timestamp"] >= tweek) & (df["timestamp"] < tomorrow)].copy()
+    kept = 0
+    for _, gf in df.groupby("index"):
+        gf.sort_values("timestamp", inplace=True)
+        gf = gf.loc[(gf["util_percent"].shift() != gf["util_percent"])
+                    | (gf["memory_used_MiB"].shift() != gf["memory_used_MiB"])]
+        kept += len(gf)
+    return kept
+
+
+def lean(path: str) -> int:
+    from mysmtp.task.plot import change_points, load_gpu_metrics, split_by_gpu
+
+    tweek, tomorrow = _window()
+    gpus = split_by_gpu(change_points(load_gpu_metrics(path, tweek, tomorrow)))
+    return sum(len(gf) for _, gf in gpus)
+
+
+def plot(path: str) -> int:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from mysmtp.task.plot import plot_gpu_day
+
+    fig, _ = plot_gpu_day(path)
+    fig.savefig(Path(path).with_suffix(".png"))
+    return 0
+
+
+PIPELINES = {"legacy": legacy, "lean": lean, "plot": plot}
+
+
+def _child(name: str, path: str, out) -> None:
+    t0 = time.perf_counter()
+    result = PIPELINES[name](path)
+    elapsed = time.perf_counter() - t0
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    out.put((result, elapsed, peak_mib))
+
+
+def run(name: str, path: Path):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(name, str(path), out))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        return None  # killed, most likely out of memory
+    return out.get()
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+
+@dataclass
+class Config:
+    days: int = 30
+    gpus: int = 8
+    path: Path = Path("/tmp/bench_gpu.csv")
+    legacy: bool = True  # needs several GB of RAM for a month of data
+    render: bool = False
+    regenerate: bool = False
+
+
+def main(cfg: Config) -> None:
+    if cfg.regenerate or not cfg.path.exists():
+        with console.status(f"writing {cfg.days} days x {cfg.gpus} GPUs to {cfg.path}"):
+            rows = write_fixture(cfg.path, cfg.days, cfg.gpus)
+        console.print(f"{rows:,} rows, {cfg.path.stat().st_size / 2**20:,.0f} MiB")
+
+    names = (["legacy"] if cfg.legacy else []) + ["lean"] + (["plot"] if cfg.render else [])
+    table = Table(title=f"plot_gpu_day input: {cfg.path.name}")
+    table.add_column("pipeline", style="cyan")
+    table.add_column("rows kept", justify="right")
+    table.add_column("time (s)", justify="right")
+    table.add_column("peak RSS (MiB)", justify="right", style="green")
+    for name in names:
+        res = run(name, cfg.path)
+        if res is None:
+            table.add_row(name, "failed", "-", "-")
+        else:
+            kept, elapsed, peak = res
+            table.add_row(name, f"{kept:,}", f"{elapsed:.2f}", f"{peak:,.0f}")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Micro-benchmark the streaming nvidia-smi parser against the old two-pass one.
+
+Fixtures are rendered in the layout of a real ``nvidia-smi`` table for 1, 8
+and 16 GPUs with hundreds of processes, e.g.::
+
+    uv run scripts/bench_smi_parser.py --procs 400 --repeat 200
+"""
+
+import re
+import timeit
+from dataclasses import dataclass
+
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+from mysmtp.top.gpu import parse_nvidia_smi
+
+console = Console()
+
+# -------------------------------------------------------------------------
+# Fixtures
+# -------------------------------------------------------------------------
+
+HEADER = """\
+Wed Dec 10 14:51:16 2025
++-----------------------------------------------------------------------------------------+
+| NVIDIA-SMI 550.54.14              Driver Version: 550.54.14      CUDA Version: 12.4     |
+|-----------------------------------------+------------------------+----------------------+
+| GPU  Name                 Persistence-M | Bus-Id          Disp.A | Volatile Uncorr. ECC |
+| Fan  Temp   Perf          Pwr:Usage/Cap |           Memory-Usage | GPU-Util  Compute M. |
+|                                         |                        |               MIG M. |
+|=========================================+========================+======================|"""
+
+GPU_BLOCK = """\
+|  {i:>2}  NVIDIA A100-SXM4-80GB          On  |   00000000:{i:02X}:00.0 Off |                    0 |
+| {fan}   {temp}C    P0            {power}W /  400W |   {used:>6}MiB /  81920MiB |    {util:>3}%      Default |
+|                                         |                        |             Disabled |
++-----------------------------------------+------------------------+----------------------+"""
+
+PROC_HEADER = """\
+                                                                                         
++-----------------------------------------------------------------------------------------+
+| Processes:                                                                              |
+|  GPU   GI   CI        PID   Type   Process name                              GPU Memory |
+|        ID   ID                                                               Usage      |
+|=========================================================================================|"""
+
+PROC_ROW = "|  {gpu:>3}   N/A  N/A    {pid:>6}      C   /usr/bin/python3 train.py --rank {rank:<14} {mem:>6}MiB |"
+FOOTER = "+-----------------------------------------------------------------------------------------+"
+
+
+def render_nvidia_smi(n_gpus: int, n_procs: int) -> str:
+    """Render a deterministic ``nvidia-smi`` table with the given sizes."""
+    lines = [HEADER]
+    for i in range(n_gpus):
+        lines.append(
+            GPU_BLOCK.format(
+                i=i,
+                fan="N/A" if i % 2 else "30%",
+                temp=30 + i,
+                power=60 + 10 * i,
+                used=1000 * i + 4,
+                util=(17 * i) % 101,
+            )
+        )
+    lines.append(PROC_HEADER)
+    for k in range(n_procs):
+        lines.append(
+            PROC_ROW.format(gpu=k % n_gpus, pid=10_000 + k, rank=k, mem=100 + k)
+        )
+    lines.append(FOOTER)
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------------------------------
+# Baseline: the previous two-pass implementation, kept for comparison
+# -------------------------------------------------------------------------
+
+def _maybe_int(value: str) -> int | None:
+    return None if value == "N/A" else int(value)
+
+
+def legacy_parse_nvidia_smi(text: str):
+    result = {
+        "driver_version": None,
+        "cuda_version": None,
+        "gpus": [],
+        "processes": []
+    }
+
+    lines = text.splitlines()
+
+    # -----------------------------
+    # Parse header for driver + CUDA
+    # -----------------------------
+    header_re = re.compile(r"NVIDIA-SMI\s+([\d\.]+).*CUDA Version:\s+([\d\.]+)")
+    for line in lines:
+        m = header_re.search(line)
+        if m:
+            result["driver_version"] = m.group(1)
+            result["cuda_version"] = m.group(2)
+            break
+
+    # -----------------------------
+    # Parse GPU summary blocks
+    # -----------------------------
+    gpu_section = False
+    gpu_info_re = re.compile(
+        r"\|\s*(\d+)\s+(.+?)\s+\S+\s*\|\s*([0-9A-Fa-f:.]+)\s+(\S+)\s*\|.*"
+    )
+    # Fan is "NN%" or "N/A" (passively cooled cards); power may be "N/A" too.
+    metrics_re = re.compile(
+        r"\|\s*(?:\d+%|N/A)\s+(\d+)C.*?(\d+|N/A)W?\s*/\s*(\d+|N/A)W?\s*\|\s*(\d+)MiB\s*/\s*(\d+)MiB\s*\|\s*(\d+)%"
+    )
+
+    current_gpu = None
+
+    for i, line in enumerate(lines):
+        # Enter GPU blocks at the "|====...|" rule under the column headers
+        if line.startswith("|=") and not gpu_section:
+            gpu_section = True
+            continue
+
+        if gpu_section:
+            # GPU name + Bus ID line
+            m1 = gpu_info_re.match(line)
+            if m1:
+                gpu_index = int(m1.group(1))
+                name = m1.group(2).strip()
+                bus_id = m1.group(3)
+                current_gpu = {
+                    "index": gpu_index,
+                    "name": name,
+                    "bus_id": bus_id,
+                    "temperature_C": None,
+                    "power_usage_W": None,
+                    "power_cap_W": None,
+                    "memory_used_MiB": None,
+                    "memory_total_MiB": None,
+                    "util_percent": None
+                }
+                continue
+
+            # Metrics line directly under the GPU info
+            m2 = metrics_re.match(line)
+            if m2 and current_gpu is not None:
+                current_gpu["temperature_C"] = int(m2.group(1))
+                current_gpu["power_usage_W"] = _maybe_int(m2.group(2))
+                current_gpu["power_cap_W"] = _maybe_int(m2.group(3))
+                current_gpu["memory_used_MiB"] = int(m2.group(4))
+                current_gpu["memory_total_MiB"] = int(m2.group(5))
+                current_gpu["util_percent"] = int(m2.group(6))
+                result["gpus"].append(current_gpu)
+                current_gpu = None
+
+        # Exit GPU section when process table begins
+        if "Processes:" in line:
+            gpu_section = False
+            break
+
+    # -----------------------------
+    # Parse Process Table
+    # -----------------------------
+    process_line_re = re.compile(
+        r"\|\s*(\d+)\s+N/A\s+N/A\s+(\d+)\s+(\w)\s+(.+?)\s+(\d+)MiB"
+    )
+
+    in_proc = False
+    for line in lines:
+        if "Processes:" in line:
+            in_proc = True
+            continue
+        if in_proc:
+            m = process_line_re.match(line)
+            if m:
+                gpu_idx = int(m.group(1))
+                pid = int(m.group(2))
+                ptype = m.group(3)
+                procname = m.group(4).strip()
+                mem = int(m.group(5))
+                result["processes"].append({
+                    "gpu": gpu_idx,
+                    "pid": pid,
+                    "type": ptype,    # C = compute, G = graphics
+                    "process_name": procname,
+                    "gpu_memory_MiB": mem
+                })
+
+    return result
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+
+@dataclass
+class Config:
+    procs: int = 300
+    repeat: int = 200
+
+
+def main(cfg: Config) -> None:
+    table = Table(title=f"nvidia-smi parser ({cfg.procs} processes)")
+    table.add_column("GPUs", justify="right", style="cyan")
+    table.add_column("legacy (us)", justify="right")
+    table.add_column("streaming (us)", justify="right")
+    table.add_column("speedup", justify="right", style="green")
+
+    for n_gpus in (1, 8, 16):
+        text = render_nvidia_smi(n_gpus, cfg.procs)
+        new = parse_nvidia_smi(text)
+        old = legacy_parse_nvidia_smi(text)
+        assert new == old, "parsers disagree"
+        assert len(new["gpus"]) == n_gpus and len(new["processes"]) == cfg.procs
+
+        t_old = min(timeit.repeat(lambda: legacy_parse_nvidia_smi(text), number=cfg.repeat, repeat=3))
+        t_new = min(timeit.repeat(lambda: parse_nvidia_smi(text), number=cfg.repeat, repeat=3))
+        table.add_row(
+            str(n_gpus),
+            f"{t_old / cfg.repeat * 1e6:.0f}",
+            f"{t_new / cfg.repeat * 1e6:.0f}",
+            f"{t_old / t_new:.2f}x",
+        )
+
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Guard the scheduler's cold-start cost.
+
+Imports ``main`` (the Rocketry app) in fresh interpreters under
+``python -X importtime``, then runs the first ``--ticks`` logger ticks
+(``log_gpu_metrics`` and ``log_user_cpu``) against a temporary
+``MYSMTP_METRICS_DIR``. Reports the import time, the time of the ticks, the
+peak RSS after each phase, the slowest modules, and whether any heavy
+library was loaded that should only be imported by the daily tasks or the
+first flush of a sink::
+
+    uv run scripts/bench_startup.py --max-ms 600 --max-rss-mib 80
+
+Exits with status 1 if a limit is exceeded or a heavy module is loaded.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+ROOT = Path(__file__).resolve().parents[1]
+
+PROBE = """
+import resource, sys, time
+ticks, heavy = int(sys.argv[1]), sys.argv[2:]
+
+def report():
+    loaded = [m for m in heavy if m in sys.modules]
+    return f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} {','.join(loaded) or '-'}"
+
+import main
+from mysmtp import tasks
+after_import = report()
+print("--- ticks", file=sys.stderr, flush=True)  # later imports are not part of startup
+t0 = time.perf_counter()
+for _ in range(ticks):
+    tasks.log_gpu_metrics()
+    tasks.log_user_cpu()
+print(after_import, (time.perf_counter() - t0) * 1000, report())
+"""
+
+
+@dataclass
+class Run:
+    import_ms: float
+    import_rss_mib: float
+    import_heavy: list[str]
+    ticks_ms: float
+    ticks_rss_mib: float
+    ticks_heavy: list[str]
+    cumulative: dict[str, int]  # us per module
+
+
+def run_once(heavy: list[str], ticks: int) -> Run:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT / "src"), str(ROOT)])}
+    with tempfile.TemporaryDirectory() as tmp:
+        # keep the outbox that main creates at import and the metrics out of the repo
+        env["MYSMTP_OUTBOX"] = str(Path(tmp) / "outbox.sqlite3")
+        env["MYSMTP_METRICS_DIR"] = str(Path(tmp) / "metrics")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE, str(ticks), *heavy],
+            capture_output=True, text=True, cwd=ROOT, env=env, check=True,
+        )
+    cumulative = {}
+    for line in proc.stderr.partition("--- ticks")[0].splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if cum.strip().isdigit():
+            cumulative[name.rstrip()] = int(cum)
+    rss1, loaded1, ticks_ms, rss2, loaded2 = proc.stdout.strip().splitlines()[-1].split()
+    return Run(
+        cumulative.get(" main", 0) / 1000, int(rss1) / 1024, [m for m in loaded1.split(",") if m != "-"],
+        float(ticks_ms), int(rss2) / 1024, [m for m in loaded2.split(",") if m != "-"], cumulative,
+    )
+
+
+@dataclass
+class Config:
+    repeat: int = 5
+    top: int = 10
+    ticks: int = 3  # logger ticks after the import; sinks must not flush this early
+    max_ms: float | None = None  # import plus ticks
+    max_rss_mib: float | None = None  # peak through the ticks
+    heavy: list[str] = field(
+        default_factory=lambda: ["pandas", "matplotlib", "pyarrow", "envelope"]
+    )
+
+
+def main(cfg: Config) -> None:
+    runs = [run_once(cfg.heavy, cfg.ticks) for _ in range(cfg.repeat)]
+    best = min(runs, key=lambda r: r.import_ms + r.ticks_ms)
+
+    table = Table(title=f"import main: slowest modules (best of {cfg.repeat})")
+    table.add_column("module", style="cyan")
+    table.add_column("cumulative (ms)", justify="right")
+    top = sorted(best.cumulative.items(), key=lambda kv: kv[1], reverse=True)
+    for name, us in top[: cfg.top]:
+        table.add_row(name, f"{us / 1000:.1f}")
+    console.print(table)
+
+    phases = Table(title="cold start")
+    phases.add_column("phase", style="cyan")
+    phases.add_column("time (ms)", justify="right", style="green")
+    phases.add_column("peak RSS (MiB)", justify="right")
+    phases.add_column("heavy modules loaded")
+    phases.add_row("import main", f"{best.import_ms:.0f}", f"{best.import_rss_mib:.0f}",
+                   ", ".join(best.import_heavy))
+    phases.add_row(f"+ {cfg.ticks} logger ticks", f"{best.ticks_ms:.0f}", f"{best.ticks_rss_mib:.0f}",
+                   ", ".join(best.ticks_heavy))
+    console.print(phases)
+
+    total_ms = best.import_ms + best.ticks_ms
+    peak_rss = min(r.ticks_rss_mib for r in runs)
+    failures = []
+    if best.ticks_heavy:
+        failures.append(f"heavy modules imported by startup or the first ticks: {', '.join(best.ticks_heavy)}")
+    if cfg.max_ms is not None and total_ms > cfg.max_ms:
+        failures.append(f"import and first ticks took {total_ms:.0f} ms > {cfg.max_ms:.0f} ms")
+    if cfg.max_rss_mib is not None and peak_rss > cfg.max_rss_mib:
+        failures.append(f"peak RSS {peak_rss:.0f} MiB > {cfg.max_rss_mib:.0f} MiB")
+    for msg in failures:
+        console.print(f"[red]FAIL[/] {msg}")
+    if failures:
+        sys.exit(1)
+    console.print("[green]OK[/]")
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Benchmark the host probes a report makes, serially and concurrently.
+
+    uv run scripts/bench_subproc.py --repeat 20
+
+* ``hostname``: forking ``hostname`` through :func:`mysmtp.subproc.do` (the
+  previous report code) against the cached :func:`mysmtp.subproc.hostname`.
+* probes: ``--probes`` run one after another with ``do`` against
+  :func:`mysmtp.subproc.run_all`, with ``--slow`` stuck probes that are
+  killed after ``--timeout`` seconds instead of stalling the report.
+"""
+
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+from mysmtp.subproc import do, hostname, lines, parse, run_all
+
+console = Console()
+
+
+def timed(fn, repeat: int) -> np.ndarray:
+    ts = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        ts.append(time.perf_counter() - t0)
+    return np.array(ts) * 1000
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+
+@dataclass
+class Config:
+    probes: list[str] = field(default_factory=lambda: [
+        "nvidia-smi -L", "last -n 20", "df -h", "uptime", "who", "free -m", "uname -a", "nproc",
+    ])
+    slow: int = 2  # stand-ins for a hung probe (``sleep 60``)
+    timeout: float = 2.0
+    concurrency: int = 4
+    repeat: int = 5
+
+
+def main(cfg: Config) -> None:
+    commands = [parse(p) for p in cfg.probes if shutil.which(parse(p)[0])]
+    skipped = len(cfg.probes) - len(commands)
+
+    table = Table(title=f"{len(commands)} probes ({skipped} not installed), {cfg.slow} hung")
+    table.add_column("run", style="cyan")
+    table.add_column("median (ms)", justify="right", style="green")
+    table.add_column("max (ms)", justify="right")
+
+    def legacy_hostname():
+        return lines(do(parse("hostname"), echo=False)[0])[0]
+
+    assert legacy_hostname() == hostname()
+    for name, fn in (("hostname: do()", legacy_hostname), ("hostname: cached", hostname)):
+        ms = timed(fn, cfg.repeat * 10)
+        table.add_row(name, f"{np.median(ms):.3f}", f"{ms.max():.3f}")
+
+    def serial(slow):
+        for args in commands:
+            do(args, echo=False)
+        for _ in range(slow):
+            try:  # the previous code had no timeout; cap it here so the run ends
+                do(["sleep", "60"], echo=False, timeout=cfg.timeout)
+            except subprocess.TimeoutExpired:
+                pass
+
+    def concurrent(slow):
+        results = run_all(commands + [["sleep", "60"]] * slow, cfg.concurrency, cfg.timeout)
+        assert sum(r.timed_out for r in results) == slow
+
+    for slow in sorted({0, cfg.slow}):
+        for name, fn in (("serial do()", serial), (f"run_all x{cfg.concurrency}", concurrent)):
+            ms = timed(lambda: fn(slow), cfg.repeat)
+            table.add_row(f"probes, {slow} hung: {name}", f"{np.median(ms):.1f}", f"{ms.max():.1f}")
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Benchmark the 15-minute login block engine used by ``time-user.py``.
+
+Synthetic ``last`` sessions (short ssh logins, workday sessions and a few
+long-lived tmux sessions over several months) are generated and the per-user
+totals of both implementations are compared::
+
+    uv run scripts/bench_time_user.py --sessions 100000
+
+* ``legacy``: the previous ``make_15min_blocks`` (``iterrows`` and a
+  ``pd.Timestamp`` stepped 15 minutes at a time into a per-user set).
+* ``vectorized``: :func:`mysmtp.logins.block_totals` and the expanded
+  :func:`mysmtp.logins.make_15min_blocks`.
+"""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+from mysmtp.logins import BLOCK, block_totals, make_15min_blocks
+
+console = Console()
+
+
+def make_sessions(n: int, users: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """``n`` sessions of ``users`` users spread over ``days`` days."""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("2026-01-01")
+    span = pd.Timedelta(days=days).value
+    start = end.value - rng.integers(0, span, n)
+    minutes = rng.lognormal(3.5, 1.2, n)  # median ~30 min
+    long = rng.random(n) < 0.001  # forgotten tmux sessions, days to weeks
+    minutes[long] = rng.uniform(1, 21, long.sum()) * 24 * 60
+    stop = start + (minutes * 60e9).astype(np.int64)
+    return pd.DataFrame(
+        {
+            "user": np.char.add("user", rng.zipf(1.5, n).clip(max=users).astype(str)),
+            "start": pd.to_datetime(start),
+            "end": pd.to_datetime(stop),
+        }
+    )
+
+
+def legacy_blocks(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df["start"] = pd.to_datetime(df["start"])
+    df["end"] = pd.to_datetime(df["end"])
+    blocks = []
+    for user, g in df.groupby("user"):
+        bins = set()
+        for _, row in g.iterrows():
+            s, e = row["start"], row["end"]
+            t = s.floor("15min")
+            while t <= e:
+                bins.add(t)
+                t += pd.Timedelta(minutes=15)
+        for b in bins:
+            blocks.append({"user": user, "start": b})
+    return pd.DataFrame(blocks).sort_values(["user", "start"]).reset_index(drop=True)
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+
+@dataclass
+class Config:
+    sessions: int = 100_000
+    users: int = 200
+    days: int = 120
+    legacy: bool = True  # minutes for 100k sessions
+    legacy_sessions: int = 0  # run legacy on the first N sessions only (0: all)
+
+
+def main(cfg: Config) -> None:
+    df = make_sessions(cfg.sessions, cfg.users, cfg.days)
+    table = Table(title=f"{len(df):,} sessions, {df['user'].nunique()} users, {cfg.days} days")
+    table.add_column("implementation", style="cyan")
+    table.add_column("sessions", justify="right")
+    table.add_column("blocks", justify="right")
+    table.add_column("time (s)", justify="right", style="green")
+
+    totals, t = timed(block_totals, df)
+    table.add_row("vectorized totals", f"{len(df):,}", f"{int(totals.sum() // 900):,}", f"{t:.4f}")
+    blocks, t = timed(make_15min_blocks, df)
+    table.add_row("vectorized blocks", f"{len(df):,}", f"{len(blocks):,}", f"{t:.4f}")
+
+    if cfg.legacy:
+        sub = df.iloc[: cfg.legacy_sessions] if cfg.legacy_sessions else df
+        expected, t = timed(legacy_blocks, sub)
+        table.add_row("legacy", f"{len(sub):,}", f"{len(expected):,}", f"{t:.2f}")
+    console.print(table)
+
+    if cfg.legacy:
+        legacy_totals = (expected.groupby("user").size() * BLOCK.total_seconds()).astype(float)
+        same = block_totals(sub).equals(legacy_totals.rename("duration_seconds"))
+        same &= make_15min_blocks(sub).equals(expected)
+        console.print("identical to legacy" if same else "[red]differs from legacy[/red]")
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Write a synthetic ``wtmp`` and benchmark reading login sessions from it.
+
+The fixture has ssh/tmux logins of ``--users`` users on ``pts/N`` lines,
+occasional reboots and shutdowns that end every open session, and a few
+sessions still open at the end (owned by this process, so ``last`` reports
+them as still logged in)::
+
+    uv run scripts/bench_wtmp.py --days 365 --users 50
+    uv run scripts/bench_wtmp.py --only-fixture --path /tmp/wtmp
+
+Compared:
+
+* ``last -aF``: the previous pipeline, ``last`` plus ``parse_last_line``
+  from ``time-user.py``.
+* ``WtmpReader``: a full read, then an incremental read after one more
+  day is appended, then a read after the file is rotated to ``wtmp.1``.
+"""
+
+import importlib.util
+import os
+import subprocess
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import tyro
+from rich.console import Console
+from rich.table import Table
+
+from mysmtp.wtmp import (
+    BOOT_TIME,
+    DEAD_PROCESS,
+    LOGIN_PROCESS,
+    RUN_LVL,
+    USER_PROCESS,
+    WtmpReader,
+    pack_record,
+)
+
+console = Console()
+
+
+# -------------------------------------------------------------------------
+# Fixture
+# -------------------------------------------------------------------------
+
+def fixture_records(t0: float, days: int, users: int, per_day: int, rng, open_at_end: int = 3) -> list[bytes]:
+    """Records for ``days`` days from ``t0`` (epoch seconds), in time order."""
+    events = []  # (time, order, record)
+    free_lines = list(range(64))
+    busy: list[tuple[float, int]] = []  # (logout time, line)
+    end = t0 + days * 86_400
+    for day in range(days):
+        base = t0 + day * 86_400
+        if day and day % 30 == 0:
+            # monthly maintenance: shutdown then boot, ending every session
+            events.append((base + 3 * 3600, 0, pack_record(RUN_LVL, "~~", "shutdown", time=base + 3 * 3600)))
+            events.append((base + 3 * 3600 + 60, 0, pack_record(BOOT_TIME, "~", "reboot", time=base + 3 * 3600 + 60)))
+        elif day and day % 45 == 0:
+            events.append((base + 5 * 3600, 0, pack_record(BOOT_TIME, "~", "reboot", time=base + 5 * 3600)))
+        for start in np.sort(rng.uniform(base, base + 86_400, per_day)):
+            busy.sort()
+            while busy and busy[0][0] <= start:
+                free_lines.append(busy.pop(0)[1])
+            line = free_lines.pop(0) if free_lines else 64 + len(busy)
+            user = f"user{int(rng.zipf(1.6)) % users}"
+            host = f"10.0.{int(rng.integers(0, 4))}.{int(rng.integers(1, 255))}"
+            dur = float(rng.lognormal(7.5, 1.3))  # median ~30 min
+            if start + dur >= end:
+                continue  # would still be open, but its process does not exist
+            pid = int(rng.integers(1000, 4_000_000))
+            tty = f"pts/{line}"
+            events.append((start - 1, 1, pack_record(LOGIN_PROCESS, tty, "LOGIN", time=start - 1, pid=pid)))
+            events.append((start, 1, pack_record(USER_PROCESS, tty, user, host, start, pid)))
+            events.append((start + dur, 2, pack_record(DEAD_PROCESS, tty, "", "", start + dur, pid)))
+            busy.append((start + dur, line))
+    # a few sessions still open, on lines not used by the fixture
+    for i in range(open_at_end):
+        t = end - 600 * (i + 1)
+        events.append((t, 1, pack_record(USER_PROCESS, f"pts/{1000 + i}", "user0", "10.9.9.9", t, os.getpid())))
+    events.sort(key=lambda e: (e[0], e[1]))
+    return [e[2] for e in events]
+
+
+def write_fixture(path: Path, records: list[bytes], mode: str = "wb") -> None:
+    with open(path, mode) as fh:
+        fh.write(b"".join(records))
+
+
+# -------------------------------------------------------------------------
+# Pipelines
+# -------------------------------------------------------------------------
+
+def _time_user():
+    spec = importlib.util.spec_from_file_location("time_user", Path(__file__).with_name("time-user.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def legacy(path: Path) -> list[tuple]:
+    parse_last_line = _time_user().parse_last_line
+    out = subprocess.run(["last", "-aF", "-f", str(path)], capture_output=True, text=True).stdout
+    rows = []
+    for line in out.splitlines():
+        entry = parse_last_line(line)
+        if entry:
+            rows.append((entry["user"], entry["tty"], entry["start"], entry["end"]))
+    return rows
+
+
+def key(sessions) -> set[tuple]:
+    """Comparable (user, tty, start, end) with ``last``'s one-second precision."""
+    def sec(t):
+        return None if t is None else t.replace(microsecond=0)
+
+    return {(s.user, s.line, sec(s.start), sec(s.end)) for s in sessions}
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t0
+
+
+# -------------------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------------------
+
+
+@dataclass
+class Config:
+    days: int = 365
+    users: int = 50
+    per_day: int = 200
+    path: Path | None = None  # default: a temporary directory
+    only_fixture: bool = False
+    seed: int = 0
+
+
+def main(cfg: Config) -> None:
+    rng = np.random.default_rng(cfg.seed)
+    t0 = datetime(2025, 1, 1).timestamp()
+    tmp = tempfile.TemporaryDirectory()
+    path = cfg.path or Path(tmp.name) / "wtmp"
+    write_fixture(path, fixture_records(t0, cfg.days, cfg.users, cfg.per_day, rng))
+    console.print(f"{path}: {path.stat().st_size / 2**20:,.1f} MiB")
+    if cfg.only_fixture:
+        return
+
+    table = Table(title=f"{cfg.days} days x {cfg.per_day} logins/day")
+    table.add_column("pipeline", style="cyan")
+    table.add_column("sessions", justify="right")
+    table.add_column("time (s)", justify="right", style="green")
+
+    rows, t = timed(legacy, path)
+    table.add_row("last -aF + parse_last_line", f"{len(rows):,}", f"{t:.3f}")
+
+    reader = WtmpReader(path, state_path=Path(tmp.name) / "state.json")
+    sessions, t = timed(reader.sessions)
+    table.add_row("WtmpReader, full", f"{len(sessions):,}", f"{t:.3f}")
+
+    # one more day appended, read by a fresh reader from the saved state
+    day = fixture_records(t0 + cfg.days * 86_400, 1, cfg.users, cfg.per_day, rng, open_at_end=0)
+    write_fixture(path, day, "ab")
+    reader = WtmpReader(path, state_path=Path(tmp.name) / "state.json")
+    new, t = timed(reader.read)
+    table.add_row("WtmpReader, +1 day", f"{len(new):,}", f"{t:.4f}")
+
+    # rotation: the rest of wtmp.1 is read, then the new file
+    os.replace(path, path.with_name(path.name + ".1"))
+    write_fixture(path.with_name(path.name + ".1"), day[:10], "ab")  # written just before rotating
+    write_fixture(path, day[10:20])
+    rotated, t = timed(reader.read)
+    table.add_row("WtmpReader, rotated", f"{len(rotated):,}", f"{t:.4f}")
+    console.print(table)
+
+    # ``last`` prints "crash"/"down" instead of an end time (parsed as None),
+    # and open sessions of unknown users as "gone - no logout" (dropped)
+    expected = set(rows)
+    ended_by_boot = {(u, tty, s) for u, tty, s, e in expected if e is None}
+    got = {(u, tty, s, None if (u, tty, s) in ended_by_boot else e) for u, tty, s, e in key(sessions)}
+    still_open = key(reader_open := [s for s in sessions if s.end is None])
+    if got - (still_open - expected) == expected:
+        console.print(f"sessions match last -aF ({len(reader_open)} still open)")
+    else:
+        console.print(f"[red]{len(got ^ expected)} sessions differ from last -aF[/red]")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Migrate legacy ``gpu_metrics.csv``/``gpu_processes.csv`` into the Parquet store."""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import tyro
+from rich import print
+
+from mysmtp.store import import_csv, open_store
+
+
+@dataclass
+class Config:
+    gpu_csv: Path = Path("gpu_metrics.csv")
+    processes_csv: Path = Path("gpu_processes.csv")
+    root: Path = Path("metrics")
+    chunksize: int = 1_000_000
+
+
+def main(cfg: Config) -> None:
+    for table, csv_path in (("gpu", cfg.gpu_csv), ("gpu_processes", cfg.processes_csv)):
+        if not csv_path.exists():
+            print(f"[yellow]skip[/yellow] {csv_path} (not found)")
+            continue
+        store = open_store(cfg.root, table)
+        n = import_csv(csv_path, store, chunksize=cfg.chunksize)
+        print(f"imported {n} rows from {csv_path} into {store.root}")
+
+
+if __name__ == "__main__":
+    main(tyro.cli(Config))
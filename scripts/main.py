@@ -2,7 +2,7 @@ from dotenv import load_dotenv
 from pathlib import Path
 from mysmtp.task.plot import plot_gpu_day
 from mysmtp.email import Mailer
-from mysmtp.subproc import do, parse, lines
+from mysmtp.subproc import hostname
 from mysmtp.tasks import log_gpu_metrics
 
 from rocketry import Rocketry
@@ -44,9 +44,9 @@ def do_send_plot():
 
 
 
-    hostname = lines(do(parse("hostname"))[0])[0]
-    subject = f'[auto smtp] {hostname}'
-    msg = f"GPU metrics plot from {hostname}"
+    host = hostname()
+    subject = f'[auto smtp] {host}'
+    msg = f"GPU metrics plot from {host}"
     M = Mailer()
     (
         M.compose(subject=subject, message=msg)
@@ -1,17 +1,20 @@
 from pathlib import Path
 from rich import print
 from mysmtp.task.plot import plot_gpu_day
+from mysmtp.tasks import metrics_root
 import matplotlib.pyplot as plt
 
 def main():
 
     d = Path(".").resolve()
-    f = list(d.glob("*metric*.csv"))[0]
+    f = metrics_root().resolve() / "gpu"
+    if not f.exists():
+        f = list(d.glob("*metric*.csv"))[0]
     print(f)
     fig, ax = plot_gpu_day(f)
     # plt.show()
     # save to file
-    out_png = f.with_suffix(".png")
+    out_png = d / "gpu_metrics.png"
     fig.savefig(out_png)
     print(f"Saved plot to {out_png}")
 
@@ -1,5 +1,4 @@
 #!/usr/bin/env python3
-from tqdm import tqdm
 import subprocess
 import re
 
@@ -9,14 +8,16 @@ import tyro
 
 import subprocess
 import pandas as pd
-from datetime import datetime
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from collections import defaultdict
 from rich.console import Console
 from rich.table import Table
 from rich import print
 
-from mysmtp.subproc import do, parse, lines
+from mysmtp.logins import LoginStore, block_totals
+from mysmtp.subproc import run_all
+from mysmtp.wtmp import WTMP
 
 console = Console()
 
@@ -130,14 +131,19 @@ def parse_last_line(line):
 # MAIN: run last, parse, compute durations
 # -------------------------------------------------------------------------
 
-def collect_usage_df():
+def collect_usage_df_last(paths=(WTMP,), timeout: float = 60.0):
     """
     Returns a pandas DataFrame with columns:
     user, tty, remote, start, end, duration_seconds
     """
-    # Run last -aF
-    p = subprocess.run(["last", "-aF"], capture_output=True, text=True)
-    lines = p.stdout.splitlines()
+    # Run last -aF on each file (e.g. wtmp and the rotated wtmp.1) concurrently
+    results = run_all([["last", "-aF", "-f", str(p)] for p in paths], timeout=timeout)
+    lines = []
+    for r in results:
+        if not r.ok:
+            reason = "timed out" if r.timed_out else r.stderr.strip()
+            print(f"[yellow]{' '.join(r.args)}: {reason}[/yellow]")
+        lines += r.stdout.splitlines()
 
     rows = []
     now = datetime.now()
@@ -209,79 +215,36 @@ def print_items_table(items):
     console.print(table)
 
 
-import pandas as pd
-import numpy as np
-
-def make_15min_blocks(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Input columns:
-        user, start (datetime), end (datetime)
-    Output:
-        user, block_start (datetime)  -- one row per 15-min block of activity
-    """
-
-    # Ensure datetime
-    df = df.copy()
-    df["start"] = pd.to_datetime(df["start"])
-    df["end"]   = pd.to_datetime(df["end"])
-
-    blocks = []
-
-    for user, g in tqdm(df.groupby("user")):
-        # Collect all 15-min bins from all sessions
-        bins = set()
-
-        nrows = len(g)
-        for _, row in tqdm(g.iterrows(), total=nrows, desc=f"User {user}"):
-            s, e = row["start"], row["end"]
-
-            # Snap start downward to nearest 15-min mark
-            start_block = s.floor("15min")
-
-            # Generate 15-min ticks until end
-            t = start_block
-            while t <= e:
-                bins.add(t)
-                t += pd.Timedelta(minutes=15)
-
-        # Store
-        for b in bins:
-            blocks.append({"user": user, "start": b
-                           })
-
-    blocks_df = pd.DataFrame(blocks)
-    return blocks_df.sort_values(["user", "start"]).reset_index(drop=True)
-
-
 @dataclass 
 class Config:
-    pass
+    days: int = 3  # report the last N days, today included
+    top: int = 0  # only the N most active users
+    db: str | None = None  # default: MYSMTP_LOGINS or logins.sqlite3
+    wtmp: str = WTMP
+    last: bool = False  # recompute from `last -aF` instead of the login store
 
 def main(cfg: Config) -> None:
 
-    df = collect_usage_df()
-
-    # filter by start in the last 7 days
     now = datetime.now()
-    week_ago = now - pd.Timedelta(days=3)
-    df = df[df["start"] >= week_ago]
-
-    print(df.columns)
-    blocks = make_15min_blocks(df)
-    # blocks = blocks.drop(columns=["tty", "remote"])
-    blocks["duration_seconds"] = 15 * 60  # each block is 15 minutes
-    print(blocks.columns)
-
-    # group by user and sum durations
-    totals = blocks.groupby("user")["duration_seconds"].sum().reset_index()
+    if cfg.last:
+        rotated = Path(cfg.wtmp + ".1")
+        df = collect_usage_df_last([cfg.wtmp, rotated] if rotated.exists() else [cfg.wtmp])
+        df = df[df["start"] >= now - pd.Timedelta(days=cfg.days)]
+        # distinct active 15-min blocks per user, overlapping sessions counted once
+        totals = block_totals(df).sort_values(ascending=False)
+    else:
+        # only wtmp records added since the previous run are read
+        with LoginStore(cfg.db, cfg.wtmp) as store:
+            store.update(now)
+            totals = store.totals(start=date.today() - timedelta(days=cfg.days - 1))
+
+    if cfg.top:
+        totals = totals.head(cfg.top)
+    totals = totals.reset_index()
     # convert duration_seconds to DD:HH:MM format
     totals["duration"] = totals["duration_seconds"].apply(duration_str)
     totals = totals.drop(columns=["duration_seconds"])
     print_items_table(totals)
 
-    quit()
-    # .groupby("user")["duration_seconds"].agg(['sum', 'count']).reset_index()
-    # .to_dict(orient='records'), collect_usage_df().to_dict(orient='records')
-
 if __name__ == "__main__":
     main(tyro.cli(Config))
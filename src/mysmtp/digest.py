@@ -0,0 +1,306 @@
+"""Fleet digest: one HTML email for the GPU reports of every host.
+
+Each host calls :func:`submit_report` to drop its plot and summary stats
+into a shared spool directory (e.g. on NFS)::
+
+    <spool>/<YYYY-MM-DD>/<hostname>.json
+    <spool>/<YYYY-MM-DD>/<hostname>.png
+
+A single aggregator then calls :func:`send_digest`, which renders every
+report of the day into one HTML message with the plots inlined as CID
+images and a summary table, so the number of emails does not grow with
+the fleet. The spool defaults to ``MYSMTP_DIGEST_DIR`` (or ``digest``).
+Once the digest is sent (or queued), the reports it consumed are removed,
+and day folders older than ``keep_days`` left by late submissions go too.
+
+Templates are :class:`string.Template` files. They are compiled once per
+file version and cached for the life of the service; pass ``template_dir``
+containing ``digest.html`` and ``digest_row.html`` to override the
+built-in ones.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import os
+import re
+import shutil
+from dataclasses import dataclass
+from datetime import date, timedelta
+from email.message import EmailMessage
+from email.utils import make_msgid
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+
+import pandas as pd
+
+from mysmtp.email import Mailer
+from mysmtp.rollup import read_metrics
+
+DIGEST_HTML = """\
+<html>
+<body style="font-family: sans-serif">
+<h2>GPU usage digest for $day</h2>
+<p>$n_hosts hosts reported.</p>
+<table border="1" cellpadding="4" cellspacing="0" style="border-collapse: collapse">
+<tr><th>Host</th><th>GPUs</th><th>Mean util %</th><th>Peak util %</th><th>Mean mem %</th><th>Samples</th></tr>
+$rows
+</table>
+$images
+</body>
+</html>
+"""
+
+DIGEST_ROW_HTML = """\
+<tr><td>$host</td><td>$gpus</td><td>$util_mean</td><td>$util_max</td><td>$mem_mean</td><td>$samples</td></tr>"""
+
+DIGEST_IMAGE_HTML = """\
+<h3>$host</h3>
+<img src="cid:$cid" alt="$host GPU usage" style="max-width: 100%">
+"""
+
+_BUILTIN = {
+    "digest.html": DIGEST_HTML,
+    "digest_row.html": DIGEST_ROW_HTML,
+    "digest_image.html": DIGEST_IMAGE_HTML,
+}
+
+
+@dataclass
+class HostReport:
+    host: str
+    stats: dict
+    image: Path | None = None
+    source: Path | None = None  # the spooled JSON
+    mtime_ns: int = 0  # of ``source`` when read, to spot a newer submission
+
+
+def spool_dir(spool: str | Path | None = None) -> Path:
+    return Path(spool or os.environ.get("MYSMTP_DIGEST_DIR", "digest"))
+
+
+# --------------------
+# PER-HOST
+# --------------------
+def summarize_gpu(path: str | Path, start: pd.Timestamp, end: pd.Timestamp) -> dict:
+    """Summary stats for a GPU metrics CSV or store table over ``[start, end)``."""
+    path = Path(path)
+    columns = ["timestamp", "index", "util_percent", "memory_used_MiB", "memory_total_MiB"]
+    if path.is_dir():
+        df = read_metrics(path.parent, start, end, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+        ts = pd.to_datetime(df["timestamp"], utc=True)
+        df = df[(ts >= pd.Timestamp(start, tz="UTC")) & (ts < pd.Timestamp(end, tz="UTC"))]
+    if df.empty:
+        return {"gpus": 0, "util_mean": None, "util_max": None, "mem_mean": None, "samples": 0}
+    mem_pct = df["memory_used_MiB"] / df["memory_total_MiB"] * 100
+    return {
+        "gpus": int(df["index"].nunique()),
+        "util_mean": round(float(df["util_percent"].mean()), 1),
+        "util_max": round(float(df["util_percent"].max()), 1),
+        "mem_mean": round(float(mem_pct.mean()), 1),
+        "samples": int(len(df)),
+    }
+
+
+def submit_report(
+    host: str,
+    stats: dict,
+    image: str | Path | None = None,
+    day: date | None = None,
+    spool: str | Path | None = None,
+) -> Path:
+    """Write ``host``'s report for ``day`` into the spool, replacing an older one."""
+    day = day or date.today()
+    out = spool_dir(spool) / day.isoformat()
+    out.mkdir(parents=True, exist_ok=True)
+    name = _safe_name(host)
+
+    if image is not None:
+        _atomic_write(out / f"{name}.png", Path(image).read_bytes())
+    payload = {"host": host, "stats": stats, "image": f"{name}.png" if image else None}
+    target = out / f"{name}.json"
+    _atomic_write(target, json.dumps(payload).encode())
+    return target
+
+
+def _safe_name(host: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", host)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+# --------------------
+# AGGREGATOR
+# --------------------
+def collect_reports(day: date | None = None, spool: str | Path | None = None) -> list[HostReport]:
+    """Read every host report submitted for ``day``, sorted by host."""
+    folder = spool_dir(spool) / (day or date.today()).isoformat()
+    reports = []
+    for f in sorted(folder.glob("*.json")):
+        try:
+            mtime_ns = f.stat().st_mtime_ns
+            payload = json.loads(f.read_text())
+        except (OSError, ValueError):
+            continue  # half-written by an old client or unreadable; skip it
+        image = folder / payload["image"] if payload.get("image") else None
+        reports.append(
+            HostReport(payload["host"], payload.get("stats", {}), image if image and image.exists() else None,
+                       f, mtime_ns)
+        )
+    return reports
+
+
+def remove_reports(reports: list[HostReport]) -> None:
+    """Delete the spooled files of ``reports``, then their day folder if empty.
+
+    A report resubmitted since it was read is kept for the next digest.
+    """
+    folders = set()
+    for report in reports:
+        if report.source is None:
+            continue
+        folders.add(report.source.parent)
+        try:
+            if report.source.stat().st_mtime_ns != report.mtime_ns:
+                continue
+            report.source.unlink()
+            if report.image is not None:
+                report.image.unlink(missing_ok=True)
+        except FileNotFoundError:
+            continue
+    for folder in folders:
+        try:
+            folder.rmdir()
+        except OSError:
+            pass  # late or resubmitted reports are still in it
+
+
+def prune_spool(spool: str | Path | None = None, keep_days: int = 7, today: date | None = None) -> int:
+    """Remove day folders older than ``keep_days``; returns how many went."""
+    root = spool_dir(spool)
+    if not root.is_dir():
+        return 0
+    cutoff = (today or date.today()) - timedelta(days=keep_days)
+    removed = 0
+    for folder in root.iterdir():
+        try:
+            day = date.fromisoformat(folder.name)
+        except ValueError:
+            continue  # not a day folder
+        if day < cutoff and folder.is_dir():
+            shutil.rmtree(folder, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+@lru_cache(maxsize=None)
+def _compile(name: str, source: str | None, mtime_ns: int) -> Template:
+    # source is None for the built-in templates; mtime_ns invalidates edited files
+    return Template(_BUILTIN[name] if source is None else Path(source).read_text())
+
+
+def load_template(name: str, template_dir: str | Path | None = None) -> Template:
+    """Return the compiled template ``name``, from ``template_dir`` if it has one."""
+    if template_dir is not None:
+        path = Path(template_dir) / name
+        if path.exists():
+            return _compile(name, str(path), path.stat().st_mtime_ns)
+    return _compile(name, None, 0)
+
+
+def render_digest(
+    reports: list[HostReport], day: date, template_dir: str | Path | None = None
+) -> tuple[str, list[tuple[str, bytes]]]:
+    """Render the digest HTML.
+
+    Returns
+    -------
+    (str, list of (str, bytes))
+        The HTML and the ``(content-id, png)`` pairs it references.
+    """
+    row_t = load_template("digest_row.html", template_dir)
+    image_t = load_template("digest_image.html", template_dir)
+    page_t = load_template("digest.html", template_dir)
+
+    def cell(value) -> str:
+        return "&ndash;" if value is None else html.escape(str(value))
+
+    rows, blocks, images = [], [], []
+    for report in reports:
+        stats = {k: cell(report.stats.get(k)) for k in ("gpus", "util_mean", "util_max", "mem_mean", "samples")}
+        rows.append(row_t.safe_substitute(host=cell(report.host), **stats))
+        if report.image is not None:
+            cid = make_msgid(domain="digest")[1:-1]
+            images.append((cid, report.image.read_bytes()))
+            blocks.append(image_t.safe_substitute(host=cell(report.host), cid=cid))
+
+    page = page_t.safe_substitute(
+        day=day.isoformat(), n_hosts=len(reports), rows="\n".join(rows), images="\n".join(blocks)
+    )
+    return page, images
+
+
+def build_digest(
+    mailer: Mailer,
+    reports: list[HostReport],
+    day: date | None = None,
+    to: str | None = None,
+    template_dir: str | Path | None = None,
+) -> EmailMessage:
+    """Compose the digest email: plain-text summary plus HTML with inline plots."""
+    day = day or date.today()
+    lines = [f"GPU usage digest for {day.isoformat()} ({len(reports)} hosts)", ""]
+    for r in reports:
+        s = r.stats
+        lines.append(
+            f"{r.host}: {s.get('gpus')} GPUs, util mean {s.get('util_mean')}% "
+            f"peak {s.get('util_max')}%, mem mean {s.get('mem_mean')}%"
+        )
+    subject = f"[auto smtp] GPU digest {day.isoformat()} ({len(reports)} hosts)"
+    msg = mailer.compose(subject=subject, message="\n".join(lines), to=to).as_message()
+
+    page, images = render_digest(reports, day, template_dir)
+    msg.add_alternative(page, subtype="html")
+    html_part = msg.get_payload()[-1]
+    for cid, png in images:
+        html_part.add_related(png, "image", "png", cid=f"<{cid}>")
+    return msg
+
+
+def send_digest(
+    mailer: Mailer,
+    day: date | None = None,
+    spool: str | Path | None = None,
+    outbox=None,
+    template_dir: str | Path | None = None,
+    keep_days: int = 7,
+) -> int:
+    """Send one digest for every report of ``day``; returns the number of hosts.
+
+    With an :class:`mysmtp.email.Outbox` the message is queued instead of
+    sent inline. Nothing is sent when no host has reported. Once the
+    message is delivered or queued, the reports in it are removed from the
+    spool (see :func:`remove_reports`) and so are day folders older than
+    ``keep_days`` (see :func:`prune_spool`); if sending raises, they stay.
+    """
+    day = day or date.today()
+    reports = collect_reports(day, spool)
+    if not reports:
+        prune_spool(spool, keep_days, day)
+        return 0
+    msg = build_digest(mailer, reports, day, template_dir=template_dir)
+    if outbox is not None:
+        outbox.enqueue(msg)
+    else:
+        mailer.deliver(msg)
+    remove_reports(reports)
+    prune_spool(spool, keep_days, day)
+    return len(reports)
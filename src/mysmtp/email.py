@@ -1,9 +1,41 @@
 """Utilities for composing SMTP messages."""
 
+from __future__ import annotations
+
+import asyncio
+import copy
+import gzip
+import hashlib
+import json
+import mimetypes
 import os
-from typing import Mapping
+import random
+import smtplib
+import sqlite3
+import ssl
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email import message_from_bytes, policy
+from email.message import EmailMessage, Message
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Mapping, Sequence, TypeVar
+
+if TYPE_CHECKING:
+    from envelope import Envelope  # imported on first compose(); it is slow to load
+
+T = TypeVar("T")
+
 
-from envelope import Envelope
+class PartialDelivery(smtplib.SMTPRecipientsRefused):
+    """The server accepted a message for some recipients and refused the rest.
+
+    ``recipients`` maps each refused address to its ``(code, reply)``, like
+    :class:`smtplib.SMTPRecipientsRefused`; the others already have the message.
+    """
 
 
 class Mailer:
@@ -21,13 +53,26 @@ class Mailer:
 
     If required values are missing, a clear :class:`EnvironmentError` is
     raised immediately.
+
+    :meth:`send`, :meth:`deliver` and :meth:`send_many` share one
+    authenticated SMTP session that is opened on first use and kept until
+    :meth:`close`. A session idle for more than ``KEEPALIVE_INTERVAL``
+    seconds is probed with ``NOOP`` before reuse, and a message that fails
+    because the server dropped the connection is retried once on a fresh one.
+    The mailer can be used as a context manager to close the session.
     """
 
     DEFAULT_SMTP_SERVER = "smtp.gmail.com"
     DEFAULT_SMTP_PORT = 587
+    KEEPALIVE_INTERVAL = 60.0
+    # Gmail rejects messages over 25 MB including base64 overhead.
+    MAX_MESSAGE_BYTES = 24 * 2**20
 
-    def __init__(self, env: Mapping[str, str] | None = None) -> None:
+    def __init__(self, env: Mapping[str, str] | None = None, timeout: float = 30.0) -> None:
         self._env = env or os.environ
+        self.timeout = timeout
+        self._smtp: smtplib.SMTP | None = None
+        self._last_used = 0.0
 
         self.smtp_server = self._env.get("SMTP_SERVER", self.DEFAULT_SMTP_SERVER)
         self.smtp_port = int(self._env.get("SMTP_PORT", str(self.DEFAULT_SMTP_PORT)))
@@ -68,6 +113,8 @@ class Mailer:
     def compose(self, *, subject: str, message: str, to: str | None = None) -> Envelope:
         """Build an :class:`~envelope.Envelope` with the configured SMTP settings."""
 
+        from envelope import Envelope
+
         recipient = to or self.default_to
         if not recipient:
             raise ValueError("Recipient email address not provided")
@@ -82,10 +129,696 @@ class Mailer:
         envelope.smtp(self.smtp_server, self.smtp_port, self.username, self.password)
         return envelope
 
+    def with_attachments(
+        self,
+        envelope: Envelope | Message,
+        attachments: Iterable["str | Path | bytes | Attachment"],
+        max_total_bytes: int | None = None,
+    ) -> EmailMessage:
+        """Return ``envelope`` as a message with cached, size-capped attachments.
+
+        Unlike :meth:`Envelope.attach`, each attachment is MIME-encoded once
+        per content and reused from :data:`attachment_cache` for every later
+        message, e.g. when the same plot goes to many recipients. Large
+        compressible files are gzipped (see :class:`AttachmentCache`). An
+        attachment that would push the encoded message past
+        ``max_total_bytes`` (default ``MAX_MESSAGE_BYTES``) is left out and
+        listed, with its link if one is given, in a short text part instead.
+        """
+
+        msg = copy.deepcopy(envelope) if isinstance(envelope, Message) else envelope.as_message()
+        budget = self.MAX_MESSAGE_BYTES if max_total_bytes is None else max_total_bytes
+        budget -= len(msg.as_bytes())
+        omitted = []
+        for item in attachments:
+            item = item if isinstance(item, Attachment) else Attachment(item)
+            part, encoded_size = attachment_cache.part(item)
+            if encoded_size > budget:
+                omitted.append(f"- {part.get_filename()} ({encoded_size / 2**20:.1f} MiB)"
+                               + (f": {item.url}" if item.url else ""))
+                continue
+            budget -= encoded_size
+            if not msg.is_multipart():
+                msg.make_mixed()
+            msg.attach(copy.copy(part))  # shares the encoded payload
+
+        if omitted:
+            note = EmailMessage()
+            note.set_content(
+                "Attachments left out to stay under the size limit:\n" + "\n".join(omitted) + "\n",
+                disposition="inline",
+            )
+            if not msg.is_multipart():
+                msg.make_mixed()
+            msg.attach(note)
+        return msg
+
     def send(self, *, subject: str, message: str, to: str | None = None) -> None:
-        """Compose and immediately send a message."""
+        """Compose and immediately send a message over the pooled connection."""
+
+        self.deliver(self.compose(subject=subject, message=message, to=to))
+
+    # --------------------
+    # CONNECTION
+    # --------------------
+    def _connect(self) -> smtplib.SMTP:
+        context = ssl.create_default_context()
+        if self.smtp_port == 465:
+            smtp = smtplib.SMTP_SSL(
+                self.smtp_server, self.smtp_port, timeout=self.timeout, context=context
+            )
+        else:
+            smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+            smtp.ehlo()
+            if self.smtp_port == 587 or smtp.has_extn("starttls"):
+                smtp.starttls(context=context)
+                smtp.ehlo()
+        try:
+            smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        return smtp
+
+    def connection(self) -> smtplib.SMTP:
+        """Return the live SMTP session, (re)connecting if needed."""
+
+        smtp = self._smtp
+        if smtp is not None and time.monotonic() - self._last_used > self.KEEPALIVE_INTERVAL:
+            if not self.keepalive():
+                smtp = None
+        if smtp is None:
+            self._smtp = smtp = self._connect()
+        self._last_used = time.monotonic()
+        return smtp
+
+    def keepalive(self) -> bool:
+        """Probe the session with ``NOOP``; drop it if the server stopped answering.
+
+        Returns whether a usable session is still open.
+        """
+
+        if self._smtp is None:
+            return False
+        try:
+            ok = self._smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            ok = False
+        if ok:
+            self._last_used = time.monotonic()
+        else:
+            self._discard()
+        return ok
+
+    def _discard(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.close()
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """Say ``QUIT`` and close the pooled session, if any."""
+
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def __enter__(self) -> "Mailer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --------------------
+    # DELIVERY
+    # --------------------
+    def deliver(self, envelope: Envelope | Message, to_addrs: Sequence[str] | None = None) -> None:
+        """Send an already composed envelope over the pooled connection.
+
+        Parameters
+        ----------
+        envelope : Envelope or email.message.Message
+            Typically from :meth:`compose`, possibly with attachments added.
+        to_addrs : sequence of str, optional
+            Envelope recipients, instead of the message's To/Cc/Bcc headers.
+
+        Raises
+        ------
+        PartialDelivery
+            If the server refused some of the recipients but not all.
+        smtplib.SMTPException
+            If the server rejects the message.
+        OSError
+            If the server cannot be reached even after reconnecting.
+        """
+
+        msg = envelope if isinstance(envelope, Message) else envelope.as_message()
+        try:
+            refused = self.connection().send_message(msg, to_addrs=to_addrs)
+        except OSError as e:
+            if isinstance(e, smtplib.SMTPException) and not isinstance(
+                e, smtplib.SMTPServerDisconnected
+            ):
+                raise  # rejected by the server; a new session would not help
+            # Stale session (server-side idle timeout, network blip): retry once.
+            self._discard()
+            refused = self.connection().send_message(msg, to_addrs=to_addrs)
+        self._last_used = time.monotonic()
+        if refused:
+            raise PartialDelivery(refused)
+
+    def send_many(self, envelopes: Iterable[Envelope]) -> list[Exception | None]:
+        """Deliver a batch of envelopes over a single SMTP session.
+
+        A failure only affects its own message; the rest of the batch is
+        still attempted.
+
+        Returns
+        -------
+        list of Exception or None
+            One entry per envelope, in order: ``None`` if it was accepted,
+            otherwise the exception raised while sending it.
+        """
+
+        results: list[Exception | None] = []
+        for envelope in envelopes:
+            try:
+                self.deliver(envelope)
+            except (OSError, ValueError) as e:  # SMTPException is an OSError
+                results.append(e)
+            else:
+                results.append(None)
+        return results
+
+
+@dataclass(frozen=True)
+class Attachment:
+    """A file (path) or in-memory content (bytes) to attach.
+
+    ``filename`` defaults to the name of the path; ``url`` is shown in place
+    of the attachment if it has to be left out for size.
+    """
+
+    source: str | Path | bytes
+    filename: str | None = None
+    url: str | None = None
+
+
+class AttachmentCache:
+    """LRU cache of MIME-encoded attachment parts keyed by content hash.
+
+    Files are hashed only when their size or mtime changed since the last
+    lookup. Content larger than ``compress_threshold`` bytes whose type is not
+    already compressed (images, archives, ...) is gzipped and sent as
+    ``<name>.gz`` when that saves at least 10%.
+    """
+
+    # Formats that do not shrink further with gzip.
+    PRECOMPRESSED = {
+        "image/png", "image/jpeg", "image/gif", "image/webp",
+        "application/zip", "application/gzip", "application/x-gzip",
+        "application/x-bzip2", "application/x-xz", "application/pdf",
+        "application/vnd.apache.parquet",
+    }
+
+    def __init__(self, max_entries: int = 32, compress_threshold: int = 256 * 2**10) -> None:
+        self.max_entries = max_entries
+        self.compress_threshold = compress_threshold
+        self._parts: OrderedDict[tuple, tuple[EmailMessage, int]] = OrderedDict()
+        self._file_digests: dict[Path, tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def part(self, item: Attachment) -> tuple[EmailMessage, int]:
+        """Return the encoded MIME part for ``item`` and its encoded size in bytes."""
+
+        if isinstance(item.source, bytes):
+            data = item.source
+            filename = item.filename or "attachment"
+            digest = hashlib.sha256(data).hexdigest()
+        else:
+            path = Path(item.source)
+            filename = item.filename or path.name
+            data, digest = self._read(path)
+
+        key = (digest, filename)
+        with self._lock:
+            if key in self._parts:
+                self._parts.move_to_end(key)
+                return self._parts[key]
+
+        if data is None:
+            data = Path(item.source).read_bytes()
+        entry = self._encode(data, filename)
+        with self._lock:
+            self._parts[key] = entry
+            while len(self._parts) > self.max_entries:
+                self._parts.popitem(last=False)
+        return entry
+
+    def _read(self, path: Path) -> tuple[bytes | None, str]:
+        st = path.stat()
+        cached = self._file_digests.get(path)
+        if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+            return None, cached[2]  # unchanged; only read again if not encoded yet
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        self._file_digests[path] = (st.st_size, st.st_mtime_ns, digest)
+        return data, digest
+
+    def _encode(self, data: bytes, filename: str) -> tuple[EmailMessage, int]:
+        ctype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if len(data) > self.compress_threshold and ctype not in self.PRECOMPRESSED:
+            packed = gzip.compress(data, compresslevel=6, mtime=0)
+            if len(packed) < 0.9 * len(data):
+                data, filename, ctype = packed, filename + ".gz", "application/gzip"
+
+        maintype, subtype = ctype.split("/", 1)
+        part = EmailMessage()
+        part.set_content(data, maintype, subtype, filename=filename, cte="base64")
+        return part, len(part.as_bytes())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._parts.clear()
+            self._file_digests.clear()
+
+
+attachment_cache = AttachmentCache()
+
+
+class AsyncMailer:
+    """asyncio counterpart of :class:`Mailer` for fanning out many messages.
+
+    Up to ``concurrency`` messages are in flight at once, each over one of a
+    pool of persistent :class:`Mailer` sessions that are opened on demand
+    and reused across calls. SMTP itself stays on :mod:`smtplib`, run on a
+    dedicated thread pool of the same size, so no extra dependency is needed.
+    Settings come from ``env`` exactly as for :class:`Mailer`.
+
+    Examples
+    --------
+    >>> async with AsyncMailer(concurrency=16) as mailer:
+    ...     results = await mailer.send_to(
+    ...         ["a@example.com", "b@example.com"],
+    ...         subject="Weekly usage",
+    ...         message=lambda to: render_report(to),
+    ...     )
+    """
+
+    def __init__(
+        self,
+        env: Mapping[str, str] | None = None,
+        *,
+        concurrency: int = 8,
+        timeout: float = 30.0,
+    ) -> None:
+        self._env = env
+        self.timeout = timeout
+        self.concurrency = concurrency
+        # Validates the environment up front and composes messages.
+        self._mailer = Mailer(env, timeout=timeout)
+        self._idle: list[Mailer] = []
+        self._slots = asyncio.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="smtp")
+
+    async def _run(self, fn: Callable[[Mailer], T]) -> T:
+        async with self._slots:
+            mailer = self._idle.pop() if self._idle else Mailer(self._env, timeout=self.timeout)
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, fn, mailer)
+            finally:
+                self._idle.append(mailer)
+
+    async def compose(self, *, subject: str, message: str, to: str | None = None) -> Envelope:
+        """Build an envelope; see :meth:`Mailer.compose`."""
+
+        return self._mailer.compose(subject=subject, message=message, to=to)
+
+    async def deliver(self, envelope: Envelope | Message) -> None:
+        """Send a composed message over a pooled session; see :meth:`Mailer.deliver`."""
+
+        await self._run(lambda mailer: mailer.deliver(envelope))
+
+    async def send(self, *, subject: str, message: str, to: str | None = None) -> None:
+        await self.deliver(await self.compose(subject=subject, message=message, to=to))
+
+    async def send_many(self, envelopes: Iterable[Envelope | Message]) -> list[Exception | None]:
+        """Deliver envelopes concurrently.
+
+        Returns
+        -------
+        list of Exception or None
+            One entry per envelope, in order: ``None`` if it was accepted,
+            otherwise the exception raised while sending it.
+        """
+
+        results = await asyncio.gather(
+            *(self.deliver(envelope) for envelope in envelopes), return_exceptions=True
+        )
+        return [_send_result(r) for r in results]
+
+    async def send_to(
+        self,
+        recipients: Iterable[str],
+        *,
+        subject: str | Callable[[str], str],
+        message: str | Callable[[str], str],
+    ) -> list[tuple[str, Exception | None]]:
+        """Send one message per recipient and report the outcome of each.
+
+        ``subject`` and ``message`` may be callables taking the recipient
+        address, to personalize each message.
+
+        Returns
+        -------
+        list of (str, Exception or None)
+            One ``(address, error)`` pair per recipient, in order, so an
+            address listed twice gets two messages and two entries.
+        """
+
+        recipients = list(recipients)
+        envelopes = [
+            await self.compose(
+                subject=subject(to) if callable(subject) else subject,
+                message=message(to) if callable(message) else message,
+                to=to,
+            )
+            for to in recipients
+        ]
+        return list(zip(recipients, await self.send_many(envelopes)))
+
+    async def aclose(self) -> None:
+        """Close every pooled session and the thread pool."""
+
+        idle, self._idle = self._idle, []
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(self._executor, m.close) for m in idle),
+            return_exceptions=True,
+        )
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> "AsyncMailer":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+
+def _send_result(result: object) -> Exception | None:
+    if isinstance(result, Exception):
+        return result
+    if isinstance(result, BaseException):
+        raise result  # cancellation, KeyboardInterrupt: not a per-message failure
+    return None
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` events per second with bursts of ``burst``."""
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+
+    def delay(self) -> float:
+        """Seconds to wait before the next event is allowed (0 if allowed now)."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self) -> None:
+        self.delay()
+        self._tokens -= 1
+
+
+class Outbox:
+    """Durable SQLite-backed queue of outgoing mail with a delivery worker.
+
+    :meth:`enqueue` only writes the serialized message to the database and
+    returns, so a slow or unreachable SMTP server never blocks the caller and
+    queued mail survives restarts of the service. A background thread started
+    with :meth:`start` delivers due messages through one pooled
+    :class:`Mailer` session, at most ``rate`` messages per second.
+
+    A failed delivery is rescheduled with exponential backoff (``base_delay``
+    doubling per attempt, capped at ``max_delay``, with jitter). When the
+    server cannot be reached or refuses the session (e.g. login), the whole
+    queue waits for that backoff instead of trying every message in turn.
+    Messages whose sender, recipients or content the server rejects
+    permanently (5xx), or that failed ``max_attempts`` times, are kept with
+    status ``failed`` for inspection. When only some recipients are
+    refused, the message is kept for the refused ones alone (``recipients``),
+    so retries do not send it again to those who already have it. Delivery is at-least-once: a
+    message being sent when the process is killed is sent again after the
+    restart.
+
+    Parameters
+    ----------
+    path : str or Path
+        SQLite database file, created if missing. Defaults to
+        ``MYSMTP_OUTBOX`` or ``outbox.sqlite3`` in the working directory.
+    mailer : Mailer, optional
+        Used for delivery. Created from the environment on first use, so an
+        outbox can be opened before SMTP settings are loaded.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created REAL NOT NULL,
+            next_attempt REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            last_error TEXT,
+            message BLOB NOT NULL,
+            recipients TEXT  -- JSON list overriding the message headers, after a partial delivery
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        mailer: Mailer | None = None,
+        *,
+        rate: float = 1.0,
+        burst: int = 5,
+        base_delay: float = 30.0,
+        max_delay: float = 3600.0,
+        max_attempts: int = 12,
+        poll_interval: float = 10.0,
+    ) -> None:
+        self.path = Path(path or os.environ.get("MYSMTP_OUTBOX", "outbox.sqlite3"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.mailer = mailer
+        self.limiter = RateLimiter(rate, burst)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(self.SCHEMA)
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(outbox)")]
+        if "recipients" not in columns:  # queue created by an older version
+            self._db.execute("ALTER TABLE outbox ADD COLUMN recipients TEXT")
+
+        self._resume_at = 0.0  # set when the server was unreachable
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --------------------
+    # QUEUE
+    # --------------------
+    def enqueue(self, envelope: Envelope | Message) -> int:
+        """Persist a message for delivery and return its queue id."""
+
+        msg = envelope if isinstance(envelope, Message) else envelope.as_message()
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT INTO outbox (created, next_attempt, message) VALUES (?, ?, ?)",
+                (now, now, msg.as_bytes()),
+            )
+        self._wake.set()
+        return cur.lastrowid
+
+    def counts(self) -> dict[str, int]:
+        """Number of queued messages per status (``pending``/``failed``)."""
+
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+            return dict(rows.fetchall())
+
+    def retry_failed(self) -> int:
+        """Move every ``failed`` message back to the queue; returns how many."""
+
+        with self._lock:
+            cur = self._db.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt = ? "
+                "WHERE status = 'failed'",
+                (time.time(),),
+            )
+        self._wake.set()
+        return cur.rowcount
+
+    def _next_due(self, now: float) -> tuple[int, int, bytes, str | None] | None:
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, attempts, message, recipients FROM outbox "
+                "WHERE status = 'pending' AND next_attempt <= ? "
+                "ORDER BY next_attempt, id LIMIT 1",
+                (now,),
+            ).fetchone()
+
+    def _seconds_until_due(self) -> float | None:
+        with self._lock:
+            (when,) = self._db.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        return None if when is None else max(0.0, when - time.time())
+
+    # --------------------
+    # DELIVERY
+    # --------------------
+    def deliver_due(self, limit: int | None = None) -> int:
+        """Deliver messages that are due, honouring the rate limit.
+
+        Runs in the caller's thread; the worker calls this in a loop.
+        Returns the number of messages delivered.
+        """
+
+        sent = 0
+        while limit is None or sent < limit:
+            if self._stop.is_set() or time.time() < self._resume_at:
+                break
+            row = self._next_due(time.time())
+            if row is None:
+                break
+            wait = self.limiter.delay()
+            if wait and self._stop.wait(wait):
+                break
+            self.limiter.take()
+
+            msg_id, attempts, raw, recipients = row
+            try:
+                if self.mailer is None:
+                    self.mailer = Mailer()
+                self.mailer.deliver(
+                    message_from_bytes(raw, policy=policy.SMTP),
+                    json.loads(recipients) if recipients else None,
+                )
+            except (OSError, ValueError) as e:  # SMTPException is an OSError
+                if isinstance(e, PartialDelivery):
+                    # the others have it: only the refused ones are left to try
+                    with self._lock:
+                        self._db.execute(
+                            "UPDATE outbox SET recipients = ? WHERE id = ?",
+                            (json.dumps(sorted(e.recipients)), msg_id),
+                        )
+                retry_at = self._failed(msg_id, attempts + 1, e)
+                if not isinstance(e, MESSAGE_ERRORS):
+                    self._resume_at = retry_at  # connection-level: back off the queue
+                    break
+            else:
+                with self._lock:
+                    self._db.execute("DELETE FROM outbox WHERE id = ?", (msg_id,))
+                sent += 1
+        return sent
+
+    def _failed(self, msg_id: int, attempts: int, error: Exception) -> float:
+        if _permanent(error) or attempts >= self.max_attempts:
+            status, next_attempt = "failed", time.time()
+        else:
+            backoff = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            status, next_attempt = "pending", time.time() + backoff * random.uniform(0.8, 1.2)
+        with self._lock:
+            self._db.execute(
+                "UPDATE outbox SET attempts = ?, status = ?, next_attempt = ?, last_error = ? "
+                "WHERE id = ?",
+                (attempts, status, next_attempt, f"{type(error).__name__}: {error}", msg_id),
+            )
+        return next_attempt
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.deliver_due()
+            except Exception:
+                # keep the worker alive; try again after the base delay
+                print("outbox: delivery failed")
+                traceback.print_exc()
+                self._resume_at = time.time() + self.base_delay
+            due = self._seconds_until_due()
+            if due is not None:
+                due = max(due, self._resume_at - time.time())
+            wait = self.poll_interval if due is None else min(due, self.poll_interval)
+            self._wake.wait(wait)
+        if self.mailer is not None:
+            self.mailer.close()
+
+    def start(self) -> "Outbox":
+        """Start the background delivery thread (idempotent)."""
+
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = 10.0) -> None:
+        """Stop the worker after the message in flight; queued mail stays on disk."""
+
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self) -> None:
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "Outbox":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Refusals of one message (recipient, sender, content): the session is
+# fine, so the rest of the queue goes on. Anything else pauses the queue.
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+    ValueError,
+)
+
+
+def _permanent(error: Exception) -> bool:
+    """Whether the server refused the message for good (5xx), not just for now."""
 
-        self.compose(subject=subject, message=message, to=to).send()
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and min(codes) >= 500  # any 4xx recipient: try again
+    return isinstance(error, MESSAGE_ERRORS) and getattr(error, "smtp_code", 0) >= 500
 
 
 def main() -> None:
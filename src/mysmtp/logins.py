@@ -0,0 +1,273 @@
+"""Login usage as active 15-minute blocks per user.
+
+A session ``[start, end]`` makes its user active in every block from the
+one containing ``start`` through the one containing ``end``. Overlapping
+sessions of the same user (several terminals, tmux, ssh) count once, so
+usage is the size of the union of those block ranges.
+
+Blocks are integer indices (``timestamp // freq``). Each session becomes
+an inclusive ``[first, last]`` range, and the ranges of each user are
+merged with one sort and a running maximum. Totals come straight from the
+merged ranges. :func:`make_15min_blocks` expands them into one row per
+block with :func:`numpy.repeat` only when block rows are actually needed.
+
+:class:`LoginStore` keeps the blocks, and per-user daily counts of them,
+in SQLite. It is updated incrementally from ``wtmp``, so weekly or monthly
+totals are answered from the daily counts without re-reading history.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mysmtp.wtmp import WTMP, WtmpReader, sessions_frame
+
+BLOCK = pd.Timedelta(minutes=15)
+
+
+def block_ranges(df: pd.DataFrame, freq: pd.Timedelta = BLOCK) -> pd.DataFrame:
+    """Inclusive ``[first, last]`` block index of every session.
+
+    Parameters
+    ----------
+    df:
+        Sessions with columns ``user``, ``start`` and ``end`` (datetimes).
+        Sessions ending before their start block are dropped.
+
+    Returns
+    -------
+    pandas.DataFrame
+        ``user``, ``first`` and ``last`` (int64 block indices), sorted by
+        user and ``first``.
+    """
+    step = pd.Timedelta(freq).value
+    start = pd.to_datetime(df["start"]).to_numpy("datetime64[ns]").view("int64")
+    end = pd.to_datetime(df["end"]).to_numpy("datetime64[ns]").view("int64")
+    out = pd.DataFrame({"user": df["user"].to_numpy(), "first": start // step, "last": end // step})
+    out = out[out["last"] >= out["first"]]
+    return out.sort_values(["user", "first"], kind="stable", ignore_index=True)
+
+
+def merge_ranges(ranges: pd.DataFrame) -> pd.DataFrame:
+    """Union of each user's block ranges as disjoint ``[first, last]`` spans.
+
+    ``ranges`` must be sorted by user and ``first`` (see
+    :func:`block_ranges`). A range starts a new span when it begins after
+    every earlier range of the same user has ended.
+    """
+    if ranges.empty:
+        return ranges.copy()
+    user = ranges["user"].to_numpy()
+    first = ranges["first"].to_numpy()
+    last = ranges["last"].to_numpy()
+
+    new_user = np.ones(len(user), dtype=bool)
+    new_user[1:] = user[1:] != user[:-1]
+    # running max of ``last`` within each user: offset users apart so a
+    # single global maximum.accumulate never carries across them
+    group = np.cumsum(new_user)
+    shift = (group - 1) * (last.max() - first.min() + 2)
+    reach = np.maximum.accumulate(last - first.min() + shift) - shift + first.min()
+
+    starts = new_user.copy()
+    starts[1:] |= first[1:] > reach[:-1]
+    ends = np.append(starts[1:], True)
+    return pd.DataFrame({"user": user[starts], "first": first[starts], "last": reach[ends]})
+
+
+def block_spans(df: pd.DataFrame, freq: pd.Timedelta = BLOCK) -> pd.DataFrame:
+    """Merged per-user spans of active blocks for sessions ``df``."""
+    return merge_ranges(block_ranges(df, freq))
+
+
+def block_totals(df: pd.DataFrame, freq: pd.Timedelta = BLOCK) -> pd.Series:
+    """Active seconds per user (distinct blocks times the block length)."""
+    spans = block_spans(df, freq)
+    n = (spans["last"] - spans["first"] + 1).groupby(spans["user"]).sum()
+    return (n * pd.Timedelta(freq).total_seconds()).rename("duration_seconds")
+
+
+def expand_spans(spans: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """``(user, block)`` arrays with one entry per block of every span."""
+    counts = (spans["last"] - spans["first"] + 1).to_numpy()
+    # position of every block within its span, without a Python loop
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    index = np.repeat(spans["first"].to_numpy(), counts) + offsets
+    return np.repeat(spans["user"].to_numpy(), counts), index
+
+
+def make_15min_blocks(df: pd.DataFrame, freq: pd.Timedelta = BLOCK) -> pd.DataFrame:
+    """One row per active block: ``user`` and block ``start``, sorted."""
+    users, index = expand_spans(block_spans(df, freq))
+    return pd.DataFrame({"user": users, "start": pd.to_datetime(index * pd.Timedelta(freq).value)})
+
+
+# --------------------
+# STORE
+# --------------------
+BLOCKS_PER_DAY = pd.Timedelta(days=1) // BLOCK
+
+
+def _day(value: date | str | pd.Timestamp | None) -> str | None:
+    return None if value is None else pd.Timestamp(value).date().isoformat()
+
+
+class LoginStore:
+    """Per-user, per-day active 15-minute blocks in SQLite, fed from ``wtmp``.
+
+    :meth:`update` reads the ``wtmp`` records appended since the previous
+    update (see :class:`mysmtp.wtmp.WtmpReader`) and adds the blocks of the
+    sessions they close, plus those of sessions still open up to now. The
+    reader position is saved in the same transaction, so a crash never
+    skips or double counts a session. Blocks are stored once per user
+    (sessions overlapping earlier ones add nothing), and the ``daily`` table
+    keeps the number of blocks per user and day. Range queries read only
+    ``daily``::
+
+        store = LoginStore()
+        store.update()
+        store.totals(start=date.today() - timedelta(days=30))  # last 30 days
+        store.top(10, start=date.today() - timedelta(days=date.today().weekday()))
+
+    Days are local calendar days, like the times in ``wtmp``.
+
+    Parameters
+    ----------
+    path : str or Path
+        SQLite database file, created if missing. Defaults to
+        ``MYSMTP_LOGINS`` or ``logins.sqlite3`` in the working directory.
+    wtmp : str or Path
+        Login records to read, ``/var/log/wtmp`` by default.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS blocks (
+            block INTEGER NOT NULL,
+            user TEXT NOT NULL,
+            PRIMARY KEY (block, user)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS daily (
+            day TEXT NOT NULL,
+            user TEXT NOT NULL,
+            blocks INTEGER NOT NULL,
+            PRIMARY KEY (day, user)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: str | Path | None = None, wtmp: str | Path = WTMP) -> None:
+        self.path = Path(path or os.environ.get("MYSMTP_LOGINS", "logins.sqlite3"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.wtmp = Path(wtmp)
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(self.SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self) -> "LoginStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --------------------
+    # UPDATE
+    # --------------------
+    def update(self, now: datetime | None = None) -> int:
+        """Add sessions from new ``wtmp`` records; return the number of new blocks."""
+        reader = WtmpReader(self.wtmp)
+        row = self._db.execute("SELECT value FROM state WHERE key = 'wtmp'").fetchone()
+        if row is not None:
+            reader.set_state(json.loads(row[0]))
+        sessions = reader.read() + list(reader.open.values())
+        with self._db:
+            added = self._add(sessions_frame(sessions, now))
+            self._db.execute(
+                "INSERT OR REPLACE INTO state VALUES ('wtmp', ?)", (json.dumps(reader.get_state()),)
+            )
+        return added
+
+    def add_sessions(self, sessions: pd.DataFrame) -> int:
+        """Add sessions (``user``, ``start``, ``end``) from another source."""
+        with self._db:
+            return self._add(sessions)
+
+    def _add(self, sessions: pd.DataFrame) -> int:
+        users, blocks = expand_spans(block_spans(sessions))
+        if not len(blocks):
+            return 0
+        before = self._db.total_changes
+        self._db.executemany(
+            "INSERT OR IGNORE INTO blocks VALUES (?, ?)", zip(blocks.tolist(), users.tolist())
+        )
+        added = self._db.total_changes - before
+
+        # recount the days touched, from the blocks of each day
+        lo, hi = int(blocks.min()) // BLOCKS_PER_DAY, int(blocks.max()) // BLOCKS_PER_DAY + 1
+        self._db.execute(
+            "DELETE FROM daily WHERE day >= date(? * 86400, 'unixepoch') AND day < date(? * 86400, 'unixepoch')",
+            (lo, hi),
+        )
+        self._db.execute(
+            """
+            INSERT INTO daily
+            SELECT date((block / ?) * 86400, 'unixepoch'), user, COUNT(*)
+            FROM blocks WHERE block >= ? AND block < ?
+            GROUP BY 1, 2
+            """,
+            (BLOCKS_PER_DAY, lo * BLOCKS_PER_DAY, hi * BLOCKS_PER_DAY),
+        )
+        return added
+
+    # --------------------
+    # QUERIES
+    # --------------------
+    def daily(self, start=None, end=None) -> pd.DataFrame:
+        """Active blocks per user and day for days in ``[start, end)``.
+
+        ``start`` and ``end`` are dates (or anything :class:`pandas.Timestamp`
+        accepts); either may be omitted. Returns ``day``, ``user``,
+        ``blocks`` and ``duration_seconds``.
+        """
+        df = pd.read_sql_query(
+            """
+            SELECT day, user, blocks FROM daily
+            WHERE (? IS NULL OR day >= ?) AND (? IS NULL OR day < ?)
+            ORDER BY day, user
+            """,
+            self._db,
+            params=(_day(start), _day(start), _day(end), _day(end)),
+        )
+        df["day"] = pd.to_datetime(df["day"])
+        df["duration_seconds"] = df["blocks"] * BLOCK.total_seconds()
+        return df
+
+    def totals(self, start=None, end=None) -> pd.Series:
+        """Active seconds per user for days in ``[start, end)``, largest first."""
+        rows = self._db.execute(
+            """
+            SELECT user, SUM(blocks) FROM daily
+            WHERE (? IS NULL OR day >= ?) AND (? IS NULL OR day < ?)
+            GROUP BY user ORDER BY SUM(blocks) DESC, user
+            """,
+            (_day(start), _day(start), _day(end), _day(end)),
+        ).fetchall()
+        index = pd.Index([u for u, _ in rows], name="user")
+        return pd.Series([n * BLOCK.total_seconds() for _, n in rows], index=index,
+                         dtype=float, name="duration_seconds")
+
+    def top(self, n: int = 10, start=None, end=None) -> pd.Series:
+        """The ``n`` users with the most active time in ``[start, end)``."""
+        return self.totals(start, end).head(n)
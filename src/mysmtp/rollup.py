@@ -0,0 +1,174 @@
+"""Downsampled GPU metric tiers with per-tier retention.
+
+Raw 1 Hz samples in the ``gpu`` table are aggregated per GPU into
+``gpu_1m`` and ``gpu_15m`` with min/mean/max/p95 of each metric in
+:data:`mysmtp.store.ROLLUP_METRICS`. Rollups are incremental: each run
+continues from the newest bucket already stored and only aggregates
+complete buckets.
+
+Retention is configured per tier, in days, through environment variables:
+
+* ``MYSMTP_RETAIN_RAW_DAYS`` (default: ``7``)
+* ``MYSMTP_RETAIN_1M_DAYS`` (default: ``90``)
+* ``MYSMTP_RETAIN_15M_DAYS`` (default: ``730``)
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+
+from mysmtp.store import ROLLUP_METRICS, PartitionedStore, open_store
+
+# Default cap on buckets per GPU for :func:`choose_tier`: an hour of raw 1 Hz
+# samples still fits, a day goes to ``gpu_1m`` and a week to ``gpu_15m``.
+MAX_POINTS = 4000
+
+# Rows reach the raw store in batches (see :class:`mysmtp.sink.ParquetSink`), so only buckets
+# that ended at least this long ago are considered complete.
+SETTLE = pd.Timedelta(minutes=10)
+
+
+@dataclass(frozen=True)
+class Tier:
+    table: str
+    freq: pd.Timedelta
+    retention_days: int
+
+
+def default_tiers() -> list[Tier]:
+    """Return the tiers from finest to coarsest with retention from the environment."""
+    env = os.environ
+    return [
+        Tier("gpu", pd.Timedelta(seconds=1), int(env.get("MYSMTP_RETAIN_RAW_DAYS", "7"))),
+        Tier("gpu_1m", pd.Timedelta(minutes=1), int(env.get("MYSMTP_RETAIN_1M_DAYS", "90"))),
+        Tier("gpu_15m", pd.Timedelta(minutes=15), int(env.get("MYSMTP_RETAIN_15M_DAYS", "730"))),
+    ]
+
+
+def aggregate(df: pd.DataFrame, freq: pd.Timedelta) -> pd.DataFrame:
+    """Aggregate raw samples into ``freq`` buckets per GPU."""
+    keys = [df["timestamp"].dt.floor(freq), df["index"]]
+    grouped = df.groupby(keys, observed=True, sort=True)
+
+    metrics = list(ROLLUP_METRICS)
+    stats = grouped[metrics].agg(["mean", "min", "max"])
+    stats.columns = [m if s == "mean" else f"{m}_{s}" for m, s in stats.columns]
+    p95 = grouped[metrics].quantile(0.95)
+    p95.columns = [f"{m}_p95" for m in metrics]
+
+    out = pd.concat(
+        [
+            grouped.size().rename("samples"),
+            grouped["memory_total_MiB"].max(),
+            stats,
+            p95,
+        ],
+        axis=1,
+    )
+    return out.reset_index()
+
+
+def rollup(raw: PartitionedStore, tier: PartitionedStore, freq: pd.Timedelta,
+           now: pd.Timestamp | None = None) -> int:
+    """Append every complete ``freq`` bucket newer than ``tier``'s last one.
+
+    Raw data is processed one day at a time to keep memory bounded.
+    Returns the number of rollup rows written.
+    """
+    now = pd.Timestamp.now(tz="UTC") if now is None else now
+    end = (now - SETTLE).floor(freq)
+
+    last = tier.last_time()
+    if last is not None:
+        start = last + freq
+    else:
+        days = raw.days()
+        if not days:
+            return 0
+        start = pd.Timestamp(days[0], tz="UTC")
+
+    written = 0
+    columns = ["timestamp", "index", "memory_total_MiB", *ROLLUP_METRICS]
+    day = start.floor("D")
+    while day < end:
+        lo = max(start, day)
+        hi = min(end, day + pd.Timedelta(days=1))
+        df = raw.read(lo, hi, columns=columns)
+        if not df.empty:
+            out = aggregate(df, freq)
+            tier.append(out)
+            written += len(out)
+        day += pd.Timedelta(days=1)
+    return written
+
+
+def apply_retention(store: PartitionedStore, days: int, today: date | None = None) -> list[date]:
+    """Drop partitions of ``store`` older than ``days`` days."""
+    today = today or pd.Timestamp.now(tz="UTC").date()
+    return store.drop_before(today - timedelta(days=days))
+
+
+def rollup_all(root: str | Path = "metrics", tiers: Iterable[Tier] | None = None) -> dict[str, int]:
+    """Update every rollup tier under ``root`` and enforce retention.
+
+    Returns the number of rows written per rollup table.
+    """
+    tiers = list(tiers or default_tiers())
+    raw = open_store(root, tiers[0].table)
+    written = {}
+    for tier in tiers[1:]:
+        written[tier.table] = rollup(raw, open_store(root, tier.table), tier.freq)
+    for tier in tiers:
+        apply_retention(open_store(root, tier.table), tier.retention_days)
+    # Tables without rollups follow the raw retention.
+    for table in ("gpu_processes", "user_cpu", "gpu_users"):
+        apply_retention(open_store(root, table), tiers[0].retention_days)
+    return written
+
+
+def choose_tier(
+    root: str | Path,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    max_points: int = MAX_POINTS,
+    tiers: Iterable[Tier] | None = None,
+) -> str:
+    """Pick the table to read for ``[start, end)``.
+
+    Only tiers whose stored data reaches back to ``start`` are candidates.
+    Among those the finest one with at most ``max_points`` buckets per GPU
+    wins; if none is that coarse, the coarsest covering tier is used. The raw
+    table is the fallback when no rollup covers the window yet.
+    """
+    tiers = list(tiers or default_tiers())
+    covering = []
+    for tier in tiers:
+        days = open_store(root, tier.table).days()
+        if days and days[0] <= pd.Timestamp(start).date():
+            covering.append(tier)
+    if not covering:
+        return tiers[0].table
+
+    span = pd.Timestamp(end) - pd.Timestamp(start)
+    for tier in covering:
+        if span / tier.freq <= max_points:
+            return tier.table
+    return covering[-1].table
+
+
+def read_metrics(
+    root: str | Path,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    columns: Iterable[str] | None = None,
+    max_points: int = MAX_POINTS,
+) -> pd.DataFrame:
+    """Read GPU metrics for ``[start, end)`` from the tier picked by :func:`choose_tier`."""
+    table = choose_tier(root, start, end, max_points=max_points)
+    return open_store(root, table).read(start, end, columns=columns)
@@ -0,0 +1,203 @@
+"""Buffered, batched writers for metric rows.
+
+Rows are kept in memory and written in batches through a single open file
+handle instead of building a DataFrame and reopening the file per tick.
+Every open sink is flushed at interpreter exit and on ``SIGTERM`` (which is
+how systemd stops ``mysmtp.service``), so a restart loses at most the rows
+of a process that was killed outright.
+"""
+
+from __future__ import annotations
+
+import atexit
+import csv
+import signal
+import time
+import weakref
+from collections import deque
+from pathlib import Path
+from typing import Mapping, Sequence
+
+_open_sinks: "weakref.WeakSet[BufferedSink]" = weakref.WeakSet()
+_signal_installed = False
+
+
+class BufferedSink:
+    """Collect rows in a ring buffer and hand them to :meth:`_write_batch`.
+
+    Parameters
+    ----------
+    max_rows:
+        Flush once this many rows are buffered.
+    max_age:
+        Flush on the next write once the oldest buffered row is older than
+        this many seconds.
+    capacity:
+        Size of the ring buffer. If flushing keeps failing (e.g. a full
+        disk) the oldest rows are dropped instead of growing without bound.
+    """
+
+    def __init__(
+        self, max_rows: int = 300, max_age: float = 30.0, capacity: int = 100_000
+    ) -> None:
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self._buffer: deque[Mapping] = deque(maxlen=capacity)
+        self._first_buffered: float | None = None
+        _open_sinks.add(self)
+        _install_flush_hooks()
+
+    def write(self, row: Mapping) -> None:
+        self.write_many((row,))
+
+    def write_many(self, rows: Sequence[Mapping]) -> None:
+        if not rows:
+            return
+        if self._first_buffered is None:
+            self._first_buffered = time.monotonic()
+        self._buffer.extend(rows)
+        if (
+            len(self._buffer) >= self.max_rows
+            or time.monotonic() - self._first_buffered >= self.max_age
+        ):
+            self.flush()
+
+    def _write_batch(self, rows: Sequence[Mapping]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        # Swap the buffer out first: the SIGTERM handler may flush again while
+        # _write_batch runs, and must not see (and write) the same rows.
+        rows, first = self._buffer, self._first_buffered
+        self._buffer = deque(maxlen=rows.maxlen)
+        self._first_buffered = None
+        try:
+            self._write_batch(rows)
+        except Exception:
+            # e.g. a full disk: keep the rows for the next flush, ahead of any
+            # buffered meanwhile (not on SystemExit, which may have cut a
+            # write short after part of it reached the file)
+            rows.extend(self._buffer)
+            self._buffer = rows
+            self._first_buffered = first
+            raise
+
+    def close(self) -> None:
+        self.flush()
+        _open_sinks.discard(self)
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CsvSink(BufferedSink):
+    """Append rows to a CSV file in batches through one open handle.
+
+    ``fieldnames`` fixes the column order and defaults to the keys of the
+    first row written. A header is written only when the file is empty; an
+    existing file keeps its own header, so columns added later are left out
+    of it rather than shifting its rows. Remaining keyword arguments are
+    passed to :class:`BufferedSink`.
+    """
+
+    def __init__(
+        self, path: str | Path, fieldnames: Sequence[str] | None = None, **kwargs
+    ) -> None:
+        self.path = Path(path)
+        self.fieldnames = list(fieldnames) if fieldnames else None
+        self._file = None
+        self._writer = None
+        super().__init__(**kwargs)
+
+    def _open(self, first: Mapping) -> None:
+        if self.fieldnames is None:
+            self.fieldnames = list(first.keys())
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, newline="") as f:
+                self.fieldnames = next(csv.reader(f), self.fieldnames)
+        self._file = open(self.path, "a", newline="")
+        self._writer = csv.DictWriter(
+            self._file, fieldnames=self.fieldnames, extrasaction="ignore"
+        )
+        if self._file.tell() == 0:
+            self._writer.writeheader()
+
+    def _write_batch(self, rows: Sequence[Mapping]) -> None:
+        if self._file is None:
+            self._open(rows[0])
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self) -> None:
+        super().close()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+class ParquetSink(BufferedSink):
+    """Buffer rows and append them to the ``table`` store under ``root``.
+
+    The :class:`mysmtp.store.PartitionedStore` (and pyarrow with it) is only
+    opened at the first flush, not when the sink is created. Parquet parts
+    have per-file overhead, so the defaults flush less often than
+    :class:`CsvSink`.
+    """
+
+    def __init__(
+        self, root: str | Path, table: str, max_rows: int = 5000, max_age: float = 300.0, **kwargs
+    ) -> None:
+        self.root = Path(root)
+        self.table = table
+        self.store = None
+        super().__init__(max_rows=max_rows, max_age=max_age, **kwargs)
+
+    def _write_batch(self, rows: Sequence[Mapping]) -> None:
+        if self.store is None:
+            from mysmtp.store import open_store
+
+            self.store = open_store(self.root, self.table)
+        self.store.append(rows)
+
+
+def flush_all() -> None:
+    """Flush every open sink."""
+    for sink in list(_open_sinks):
+        try:
+            sink.flush()
+        except OSError:
+            pass
+
+
+def _install_flush_hooks() -> None:
+    global _signal_installed
+    if _signal_installed:
+        return
+    _signal_installed = True
+    atexit.register(flush_all)
+
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def _on_sigterm(signum, frame):
+            flush_all()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                raise SystemExit(128 + signum)
+
+        signal.signal(signal.SIGTERM, _on_sigterm)
+    except ValueError:
+        # signal handlers can only be installed from the main thread;
+        # atexit still covers normal shutdown.
+        pass
@@ -0,0 +1,316 @@
+"""Date-partitioned Parquet storage for metric tables.
+
+Each table lives in its own directory with one sub-directory per UTC day::
+
+    metrics/gpu/date=2025-12-10/part-1733841076000000000.parquet
+
+Parts are written atomically (temporary file + rename) with a fixed,
+compact schema and zstd compression. Once a day is over, its parts are
+compacted into a single file. Readers only open the partitions that overlap
+the requested window, only decode the requested columns, and push the
+timestamp filter down to Parquet row-group statistics.
+
+Writing needs pyarrow only: pandas and :mod:`pyarrow.dataset` are imported
+by the readers. The logger writes through :class:`mysmtp.sink.ParquetSink`,
+which opens its store (and imports this module) at its first flush.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Mapping, Sequence
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+_category = pa.dictionary(pa.int32(), pa.string())
+_utc = pa.timestamp("us", tz="UTC")
+
+GPU_SCHEMA = pa.schema(
+    [
+        ("timestamp", _utc),
+        ("driver_version", _category),
+        ("cuda_version", _category),
+        ("index", pa.int16()),
+        ("name", _category),
+        ("bus_id", _category),
+        ("temperature_C", pa.int16()),
+        ("power_usage_W", pa.float32()),
+        ("power_cap_W", pa.float32()),
+        ("memory_used_MiB", pa.int32()),
+        ("memory_total_MiB", pa.int32()),
+        ("util_percent", pa.int16()),
+    ]
+)
+
+PROCESS_SCHEMA = pa.schema(
+    [
+        ("timestamp", _utc),
+        ("gpu", pa.int16()),
+        ("pid", pa.int32()),
+        ("type", _category),
+        ("process_name", _category),
+        ("gpu_memory_MiB", pa.int32()),
+        ("uid", pa.int32()),  # added later: null in older parts
+    ]
+)
+
+GPU_USER_SCHEMA = pa.schema(
+    [
+        ("timestamp", _utc),
+        ("uid", pa.int32()),
+        ("user", _category),
+        ("processes", pa.int32()),
+        ("gpus", pa.int16()),
+        ("gpu_memory_MiB", pa.int32()),
+        ("gpu_seconds", pa.float32()),
+    ]
+)
+
+USER_CPU_SCHEMA = pa.schema(
+    [
+        ("timestamp", _utc),
+        ("uid", pa.int32()),
+        ("user", _category),
+        ("processes", pa.int32()),
+        ("cpu_percent", pa.float32()),
+        ("rss_bytes", pa.int64()),
+    ]
+)
+
+# Rollup tiers keep the plain metric name for the bucket mean so readers can
+# treat every tier like the raw table.
+ROLLUP_METRICS = ("util_percent", "memory_used_MiB", "temperature_C", "power_usage_W")
+ROLLUP_SCHEMA = pa.schema(
+    [
+        ("timestamp", _utc),
+        ("index", pa.int16()),
+        ("samples", pa.int32()),
+        ("memory_total_MiB", pa.int32()),
+    ]
+    + [
+        (f"{m}{suffix}", pa.float32())
+        for m in ROLLUP_METRICS
+        for suffix in ("", "_min", "_max", "_p95")
+    ]
+)
+
+SCHEMAS = {
+    "gpu": GPU_SCHEMA,
+    "gpu_processes": PROCESS_SCHEMA,
+    "user_cpu": USER_CPU_SCHEMA,
+    "gpu_users": GPU_USER_SCHEMA,
+    "gpu_1m": ROLLUP_SCHEMA,
+    "gpu_15m": ROLLUP_SCHEMA,
+}
+
+
+class PartitionedStore:
+    """A table of rows partitioned by the UTC date of their ``timestamp``."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        schema: pa.Schema,
+        time_col: str = "timestamp",
+        compression: str = "zstd",
+    ) -> None:
+        self.root = Path(root)
+        self.schema = schema
+        self.time_col = time_col
+        self.compression = compression
+        self._last_day: date | None = None
+
+    # --------------------
+    # WRITING
+    # --------------------
+    def partition(self, day: date) -> Path:
+        return self.root / f"date={day.isoformat()}"
+
+    def days(self) -> list[date]:
+        if not self.root.exists():
+            return []
+        return sorted(
+            date.fromisoformat(p.name[len("date=") :])
+            for p in self.root.glob("date=*")
+            if p.is_dir()
+        )
+
+    def parts(self, day: date) -> list[Path]:
+        return sorted(self.partition(day).glob("part-*.parquet"))
+
+    def append(self, rows: Sequence[Mapping] | pa.Table | pd.DataFrame) -> None:
+        """Write ``rows`` as one new part per day they cover."""
+        table = self._to_table(rows)
+        if table.num_rows == 0:
+            return
+
+        days = pc.cast(table[self.time_col], pa.date32())
+        unique_days = sorted(d.as_py() for d in pc.unique(days))
+        for day in unique_days:
+            part = table
+            if len(unique_days) > 1:
+                part = table.filter(pc.equal(days, pa.scalar(day, pa.date32())))
+            self._write_part(self.partition(day), part)
+
+        newest = unique_days[-1]
+        if self._last_day != newest:
+            # A new day started (or this is the first write since startup):
+            # finished days will not receive live rows anymore.
+            self.compact(before=newest)
+            self._last_day = newest
+
+    def _to_table(self, rows) -> pa.Table:
+        if isinstance(rows, pa.Table):
+            return rows.select(self.schema.names).cast(self.schema)
+        pd = sys.modules.get("pandas")  # rows cannot be a DataFrame if pandas is not loaded
+        if pd is not None and isinstance(rows, pd.DataFrame):
+            return pa.Table.from_pandas(
+                rows[self.schema.names], schema=self.schema, preserve_index=False
+            )
+        return pa.Table.from_pylist(list(rows), schema=self.schema)
+
+    def _write_part(self, directory: Path, table: pa.Table, name: str | None = None) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        name = name or f"part-{time.time_ns()}.parquet"
+        final = directory / name
+        tmp = directory / f".{name}.tmp"
+        pq.write_table(table, tmp, compression=self.compression)
+        os.replace(tmp, final)
+        return final
+
+    def compact(self, before: date | None = None) -> None:
+        """Merge the parts of every day earlier than ``before`` into one file."""
+        for day in self.days():
+            if before is not None and day >= before:
+                continue
+            parts = self.parts(day)
+            if len(parts) <= 1:
+                continue
+            table = pq.read_table(parts, schema=self.schema)
+            table = table.sort_by(self.time_col)
+            self._write_part(self.partition(day), table)
+            for p in parts:
+                p.unlink()
+
+    def drop_before(self, day: date) -> list[date]:
+        """Delete every partition older than ``day`` and return their dates."""
+        dropped = []
+        for d in self.days():
+            if d >= day:
+                break
+            shutil.rmtree(self.partition(d))
+            dropped.append(d)
+        return dropped
+
+    # --------------------
+    # READING
+    # --------------------
+    def last_time(self) -> pd.Timestamp | None:
+        """Return the newest timestamp in the store, reading only the last day."""
+        import pandas as pd
+
+        for day in reversed(self.days()):
+            parts = self.parts(day)
+            if not parts:
+                continue
+            col = pq.read_table(parts, columns=[self.time_col])[self.time_col]
+            if len(col):
+                return pd.Timestamp(pc.max(col).as_py())
+        return None
+
+    def read(
+        self,
+        start: datetime | pd.Timestamp | None = None,
+        end: datetime | pd.Timestamp | None = None,
+        columns: Iterable[str] | None = None,
+    ) -> pd.DataFrame:
+        """Load rows with ``start <= timestamp < end`` as a DataFrame.
+
+        Naive ``start``/``end`` are taken to be UTC. Only partitions that
+        overlap the window are opened, and only ``columns`` are decoded.
+        """
+        import pyarrow.dataset as ds
+
+        start = _as_utc(start)
+        end = _as_utc(end)
+
+        files: list[Path] = []
+        for day in self.days():
+            if start is not None and day < start.date():
+                continue
+            if end is not None and day > (end - timedelta(microseconds=1)).date():
+                continue
+            files.extend(self.parts(day))
+
+        columns = list(columns) if columns is not None else self.schema.names
+        if not files:
+            return self.schema.empty_table().select(columns).to_pandas()
+
+        dataset = ds.dataset([str(f) for f in files], schema=self.schema, format="parquet")
+        field = ds.field(self.time_col)
+        expr = None
+        if start is not None:
+            expr = field >= pa.scalar(start.to_pydatetime(), _utc)
+        if end is not None:
+            upper = field < pa.scalar(end.to_pydatetime(), _utc)
+            expr = upper if expr is None else expr & upper
+        return dataset.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def open_store(root: str | Path, table: str) -> PartitionedStore:
+    """Open ``root/<table>`` with the schema registered for ``table``."""
+    return PartitionedStore(Path(root) / table, SCHEMAS[table])
+
+
+def import_csv(
+    csv_path: str | Path, store: PartitionedStore, chunksize: int = 1_000_000
+) -> int:
+    """Copy an existing metric CSV into ``store`` chunk by chunk.
+
+    Returns the number of rows imported. Days are compacted afterwards so
+    the result is one file per day regardless of the chunk size.
+    """
+    import pandas as pd
+
+    total = 0
+    text_cols = {
+        f.name: str for f in store.schema if pa.types.is_dictionary(f.type)
+    }
+    chunks = pd.read_csv(
+        csv_path,
+        usecols=lambda c: c in store.schema.names,
+        dtype=text_cols,
+        chunksize=chunksize,
+    )
+    for chunk in chunks:
+        chunk[store.time_col] = pd.to_datetime(
+            chunk[store.time_col], utc=True, format="ISO8601"
+        )
+        for name in store.schema.names:
+            if name not in chunk.columns:
+                chunk[name] = None
+        store.append(chunk)
+        total += len(chunk)
+    store.compact()
+    return total
+
+
+def _as_utc(value) -> pd.Timestamp | None:
+    if value is None:
+        return None
+    import pandas as pd
+
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        return ts.tz_localize(timezone.utc)
+    return ts.tz_convert(timezone.utc)
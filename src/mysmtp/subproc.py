@@ -1,16 +1,193 @@
+"""Small helpers for running commands.
+
+:func:`do` runs one command and blocks. :func:`run` and :func:`run_many`
+run commands with asyncio, each with its own timeout and at most
+``concurrency`` at a time, e.g. to probe ``nvidia-smi``, ``last`` and
+``df`` together instead of one after another::
+
+    results = run_all([["nvidia-smi", "-L"], ["df", "-h"], ["uptime"]], timeout=5)
+
+Probes whose answer does not change while the service runs go through
+:func:`probe` (memoized); :func:`hostname` needs no process at all.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import socket
 import subprocess
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Sequence
+
 from rich import print
 
+
 def parse(str) -> list[str]:
     return [x.strip() for x in str.split(" ") if x.strip()]
 
-def do(args: list[str]) -> None:
-    p = subprocess.run(args, capture_output=True, text=True)
+def do(args: list[str], echo: bool = True, timeout: float | None = None) -> tuple[str, str]:
+    p = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
     out = p.stdout
     err = p.stderr
 
-    print(out, err)
+    if echo:
+        print(out, err)
     return (out, err)
 
 def lines(out: str) -> list[str]:
     return [x.strip() for x in out.split("\n") if x.strip()]
+
+
+# --------------------
+# ASYNC
+# --------------------
+@dataclass
+class Result:
+    args: Sequence[str]
+    returncode: int | None  # None if the command timed out or could not start
+    stdout: str = ""
+    stderr: str = ""
+    elapsed: float = 0.0
+    timed_out: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+
+async def run(
+    args: Sequence[str],
+    timeout: float | None = None,
+    capture: bool = True,
+    echo: bool = False,
+) -> Result:
+    """Run ``args`` without blocking the event loop.
+
+    The process is killed after ``timeout`` seconds, and also when the
+    awaiting task is cancelled, so no child outlives its caller. With
+    ``capture=False`` its output is discarded. Nothing is printed unless
+    ``echo`` is set. Never raises for a failing command: see
+    :attr:`Result.returncode`.
+    """
+    pipe = asyncio.subprocess.PIPE if capture else asyncio.subprocess.DEVNULL
+    t0 = time.monotonic()
+    # the child exists before create_subprocess_exec returns, so a
+    # cancellation in between must still wait for it in order to kill it
+    spawn = asyncio.ensure_future(asyncio.create_subprocess_exec(*args, stdout=pipe, stderr=pipe))
+    try:
+        proc = await asyncio.shield(spawn)
+    except OSError as e:  # not found, not executable
+        return Result(args, None, stderr=str(e), elapsed=time.monotonic() - t0)
+    except asyncio.CancelledError:
+        await _settle(spawn)
+        if not spawn.cancelled() and spawn.exception() is None:
+            await _kill(spawn.result())
+        raise
+
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        return Result(args, None, elapsed=time.monotonic() - t0, timed_out=True)
+    finally:
+        await _kill(proc)  # timed out or cancelled
+
+    result = Result(
+        args,
+        proc.returncode,
+        (out or b"").decode(errors="replace"),
+        (err or b"").decode(errors="replace"),
+        time.monotonic() - t0,
+    )
+    if echo:
+        print(result.stdout, result.stderr)
+    return result
+
+
+async def _settle(fut: asyncio.Future) -> bool:
+    """Wait for ``fut`` to finish even if cancelled meanwhile.
+
+    Returns whether a cancellation was swallowed, for the caller to re-raise
+    once the cleanup is done.
+    """
+    cancelled = False
+    while not fut.done():
+        try:
+            await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            cancelled = True
+        except Exception:
+            pass  # left on ``fut`` for the caller
+    return cancelled
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    """Kill ``proc`` if it is still running and reap it."""
+    if proc.returncode is not None:
+        return
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass  # exited just now
+    cancelled = await _settle(asyncio.ensure_future(proc.wait()))
+    # Close the pipes now: their reader may be gone, and the loop with it soon,
+    # leaving "Event loop is closed" warnings when they are collected later.
+    # asyncio.subprocess.Process has no public close, and the stdout/stderr
+    # StreamReaders cannot close their transports, so reach for the private
+    # subprocess transport, and skip it if an asyncio version drops the name.
+    transport = getattr(proc, "_transport", None)
+    if transport is not None:
+        transport.close()
+    if cancelled:
+        raise asyncio.CancelledError
+
+
+async def run_many(
+    commands: Iterable[Sequence[str]],
+    concurrency: int = 4,
+    timeout: float | None = None,
+    capture: bool = True,
+) -> list[Result]:
+    """Run ``commands`` with at most ``concurrency`` at a time, results in order."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(args):
+        async with sem:
+            return await run(args, timeout, capture)
+
+    # return_exceptions: on cancellation, wait until every child is killed
+    results = await asyncio.gather(*(one(args) for args in commands), return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException):
+            raise r
+    return results
+
+
+def run_all(
+    commands: Iterable[Sequence[str]],
+    concurrency: int = 4,
+    timeout: float | None = None,
+    capture: bool = True,
+) -> list[Result]:
+    """Blocking :func:`run_many` for code that is not already in an event loop."""
+    return asyncio.run(run_many(commands, concurrency, timeout, capture))
+
+
+# --------------------
+# PROBES
+# --------------------
+@lru_cache(maxsize=None)
+def probe(*args: str, timeout: float = 10.0) -> str:
+    """Stripped stdout of an idempotent command, run once per process.
+
+    Raises :class:`subprocess.CalledProcessError` (not cached) if it fails.
+    """
+    p = subprocess.run(args, capture_output=True, text=True, timeout=timeout, check=True)
+    return p.stdout.strip()
+
+
+@lru_cache(maxsize=None)
+def hostname() -> str:
+    """This machine's host name, without forking ``hostname``."""
+    return socket.gethostname()
@@ -0,0 +1,34 @@
+"""Column names accepted in GPU metric CSVs.
+
+Older loggers and hand-made exports name the timestamp and percentage
+columns differently; readers pick the first candidate present.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Tuple
+
+TIMESTAMP_COLUMNS: Tuple[str, ...] = ("timestamp", "time", "datetime")
+UTIL_COLUMNS: Tuple[str, ...] = (
+    "gpu_util_percent",
+    "gpu_util_pct",
+    "util_percent",
+    "util_pct",
+    "gpu_util",
+)
+MEM_COLUMNS: Tuple[str, ...] = (
+    "gpu_mem_percent",
+    "gpu_mem_pct",
+    "mem_percent",
+    "mem_pct",
+    "memory_util_percent",
+    "memory_util_pct",
+)
+
+
+def pick_column(columns: Iterable[str], candidates: Iterable[str], label: str) -> str:
+    """The first of ``candidates`` found in ``columns``; ``KeyError`` if none is."""
+    for col in candidates:
+        if col in columns:
+            return col
+    raise KeyError(f"CSV must include a {label} column (tried: {', '.join(candidates)}).")
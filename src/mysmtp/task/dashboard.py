@@ -0,0 +1,176 @@
+"""Small-multiples GPU dashboard for many hosts in one figure.
+
+:class:`Dashboard` lays out one panel per host (one line pair per GPU) on a
+single :class:`~matplotlib.figure.Figure` that is created once and reused:
+every :meth:`Dashboard.render` only swaps the data of the existing artists
+(``set_data``) and hides unused panels, so rendering a fleet repeatedly
+neither leaks figures nor rebuilds axes. The figure is not registered with
+:mod:`matplotlib.pyplot` and is released by :meth:`Dashboard.close`.
+
+Series are downsampled to the panel's pixel width as they are added (see
+:mod:`mysmtp.task.downsample`), so only one host's raw data is in memory at
+a time::
+
+    with Dashboard(ncols=6) as dash:
+        dash.render_hosts({"node01": "/nfs/node01/metrics/gpu", ...}, "fleet.png")
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Mapping
+
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+
+from mysmtp.task.downsample import lttb, minmax_envelope
+from mysmtp.task.plot import gpu_series
+
+# (gpu, time, util_peak, mem_pct) as returned by gpu_series
+Series = tuple[int, np.ndarray, np.ndarray, np.ndarray]
+
+
+class Dashboard:
+    """Render GPU utilization and memory of many hosts as small multiples.
+
+    Parameters
+    ----------
+    ncols:
+        Panels per row.
+    max_gpus:
+        GPU line pairs allocated per panel; extra GPUs are not drawn.
+    panel_size:
+        Width and height of one panel in inches.
+    dpi:
+        Resolution of the saved image; also sets the downsampling width.
+    """
+
+    def __init__(self, ncols: int = 5, max_gpus: int = 8,
+                 panel_size: tuple[float, float] = (3.2, 1.8), dpi: int = 100) -> None:
+        self.ncols = ncols
+        self.max_gpus = max_gpus
+        self.panel_size = panel_size
+        self.dpi = dpi
+        self.fig: Figure | None = None
+        self._axes: list = []
+        self._nrows = 0
+        self._lines: list[list[tuple]] = []  # per panel, per GPU: (util line, mem line)
+        cmap = colormaps["tab10"]
+        self._colors = [cmap(i % 10) for i in range(max_gpus)]
+
+    def _build(self, n_panels: int) -> None:
+        """(Re)create the figure with room for ``n_panels`` panels."""
+        self.close()
+        nrows = self._rows_for(n_panels)
+        w, h = self.panel_size
+        fig = Figure(figsize=(w * self.ncols, h * nrows + 0.6), dpi=self.dpi)
+        axes = fig.subplots(nrows, self.ncols, sharex=True, sharey=True, squeeze=False).ravel()
+        self._lines = []
+        for ax in axes:
+            pairs = []
+            for color in self._colors:
+                (util,) = ax.plot([], [], drawstyle="steps-post", color=color, linewidth=0.8)
+                (mem,) = ax.plot([], [], linestyle="--", color=color, linewidth=0.8, alpha=0.8)
+                pairs.append((util, mem))
+            self._lines.append(pairs)
+            ax.set_ylim(0, 100)
+            ax.tick_params(labelsize=6, labelbottom=True)  # bottom row may be partly hidden
+            locator = mdates.AutoDateLocator(maxticks=5)
+            ax.xaxis.set_major_locator(locator)
+            ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator, show_offset=False))
+        height = fig.get_figheight()
+        fig.subplots_adjust(left=0.03, right=0.99, bottom=0.25 / height, top=1 - 0.8 / height,
+                            wspace=0.08, hspace=0.45)
+        self.fig = fig
+        self._axes = list(axes)
+        self._nrows = nrows
+
+    def _rows_for(self, n_panels: int) -> int:
+        return max(1, math.ceil(n_panels / self.ncols))
+
+    def _panel_pixels(self) -> int:
+        return int(self.panel_size[0] * self.dpi)
+
+    def set_panel(self, i: int, title: str, series: Iterable[Series]) -> None:
+        """Show ``series`` in panel ``i``; GPUs beyond ``max_gpus`` are dropped."""
+        ax = self._axes[i]
+        ax.set_visible(True)
+        ax.set_title(title, fontsize=8, pad=2)
+        width = self._panel_pixels()
+        used = 0
+        for (_, t, util, mem), (util_line, mem_line) in zip(series, self._lines[i]):
+            tu, _, umax = minmax_envelope(t, util, width)
+            keep = lttb(t, mem, width)
+            util_line.set_data(tu, umax)
+            mem_line.set_data(t[keep], mem[keep])
+            util_line.set_visible(True)
+            mem_line.set_visible(True)
+            used += 1
+        for util_line, mem_line in self._lines[i][used:]:
+            util_line.set_visible(False)
+            mem_line.set_visible(False)
+
+    def render(self, panels: Mapping[str, Iterable[Series]], path: str | Path,
+               start: pd.Timestamp, end: pd.Timestamp, title: str | None = None) -> Path:
+        """Render ``{host: series}`` for ``[start, end)`` into ``path``.
+
+        ``series`` may be a lazy iterable (e.g. a generator loading one host
+        at a time); each is consumed and downsampled as its panel is set.
+        """
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        if self.fig is None or self._rows_for(len(panels)) != self._nrows:
+            self._build(len(panels))  # same-sized fleets keep reusing the figure
+
+        i = -1
+        for i, (host, series) in enumerate(panels.items()):
+            self.set_panel(i, host, series)
+        for ax in self._axes[i + 1:]:
+            ax.set_visible(False)
+
+        self._axes[0].set_xlim(start, end)
+        self.fig.suptitle(title or f"GPU usage {start:%Y-%m-%d} to {end:%Y-%m-%d}", fontsize=10)
+        self.fig.savefig(path)
+        return Path(path)
+
+    def render_hosts(self, sources: Mapping[str, str | Path], path: str | Path,
+                     start: pd.Timestamp | None = None, end: pd.Timestamp | None = None,
+                     cache_root: str | Path | None = None) -> Path:
+        """Load each host's metrics (CSV or store table) and render the fleet.
+
+        The window defaults to the last week, like :func:`plot_gpu_day`. With
+        ``cache_root``, CSV sources use an incremental plot cache in
+        ``cache_root/<host>``.
+        """
+        if end is None:
+            end = pd.Timestamp(datetime.now().date()) + pd.Timedelta(days=1)
+        if start is None:
+            start = end - pd.Timedelta(days=8)
+
+        def load(host, src):
+            cache = Path(cache_root) / host if cache_root is not None else None
+            try:
+                yield from gpu_series(src, start, end, cache)
+            except (FileNotFoundError, KeyError, ValueError):
+                return  # host without usable data: empty panel
+
+        return self.render({h: load(h, s) for h, s in sources.items()}, path, start, end)
+
+    def close(self) -> None:
+        """Release the figure and its artists."""
+        if self.fig is not None:
+            self.fig.clear()
+        self.fig = None
+        self._axes = []
+        self._lines = []
+        self._nrows = 0
+
+    def __enter__(self) -> "Dashboard":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
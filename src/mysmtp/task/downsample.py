@@ -0,0 +1,81 @@
+"""Visual downsampling of long time series before plotting.
+
+A plot cannot show more distinct x positions than it has pixels, so series
+are reduced to about the pixel width of the axes first:
+
+* :func:`minmax_envelope` keeps the minimum and maximum of every pixel
+  bucket, so spikes survive (used for utilization).
+* :func:`lttb` picks the visually most significant point per bucket with
+  Largest-Triangle-Three-Buckets (used for smooth lines like memory).
+
+Both expect ``x`` sorted ascending and accept ``datetime64`` or numeric
+arrays.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def _as_float(x: np.ndarray) -> np.ndarray:
+    if np.issubdtype(x.dtype, np.datetime64) or np.issubdtype(x.dtype, np.timedelta64):
+        return x.view("int64").astype(np.float64)
+    return x.astype(np.float64, copy=False)
+
+
+def bucket_starts(x: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Index of the first sample in each non-empty equal-width ``x`` bucket."""
+    xf = _as_float(x)
+    edges = np.linspace(xf[0], xf[-1], n_buckets + 1)[:-1]
+    return np.unique(np.searchsorted(xf, edges, side="left"))
+
+
+def minmax_envelope(
+    x: np.ndarray, y: np.ndarray, n_buckets: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Reduce ``(x, y)`` to the min and max of ``y`` in ``n_buckets`` time buckets.
+
+    Returns
+    -------
+    (ndarray, ndarray, ndarray)
+        The ``x`` of the first sample in each bucket, and the bucket's
+        minimum and maximum ``y``. Series that are already short enough are
+        returned unchanged (with ``min == max == y``).
+    """
+    if len(x) <= n_buckets:
+        return x, y, y
+    starts = bucket_starts(x, n_buckets)
+    return x[starts], np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the ``n_out`` points chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept. For each bucket in between,
+    the point forming the largest triangle with the previously selected
+    point and the mean of the next bucket is selected.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xf = _as_float(x)
+    yf = y.astype(np.float64, copy=False)
+    # n_out - 2 buckets over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], edges[i + 2]
+            cx, cy = xf[nlo:nhi].mean(), yf[nlo:nhi].mean()
+        else:
+            cx, cy = xf[-1], yf[-1]
+        ax, ay = xf[prev], yf[prev]
+        area = np.abs((ax - cx) * (yf[lo:hi] - ay) - (ax - xf[lo:hi]) * (cy - ay))
+        prev = lo + int(np.argmax(area))
+        out[i + 1] = prev
+    return out
@@ -6,56 +6,256 @@ percentage columns for GPU utilization and GPU memory utilization.
 """
 
 from __future__ import annotations
-from mysmtp.subproc import do, parse, lines
+from mysmtp.rollup import read_metrics
+from mysmtp.task.columns import TIMESTAMP_COLUMNS, UTIL_COLUMNS, pick_column
+from mysmtp.task.downsample import lttb, minmax_envelope
+from mysmtp.task.plot_cache import PlotCache
+from mysmtp.subproc import hostname
 import numpy as np
 
+import csv
+import os
 from datetime import datetime
 from pathlib import Path
 from typing import Iterable, Tuple
 
+import matplotlib
+
+if "MPLBACKEND" not in os.environ:
+    # headless: plots are only written to PNG, so skip GUI backend discovery
+    matplotlib.use("Agg")
+
 import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
+from matplotlib import colormaps
+from matplotlib.figure import Figure
 import pandas as pd
-
-# Candidate column names to keep the loader flexible
-TIMESTAMP_COLUMNS: Tuple[str, ...] = ("timestamp", "time", "datetime")
-UTIL_COLUMNS: Tuple[str, ...] = (
-    "gpu_util_percent",
-    "gpu_util_pct",
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+# Columns read from a partitioned metric store
+STORE_COLUMNS: Tuple[str, ...] = (
+    "timestamp",
+    "index",
     "util_percent",
-    "util_pct",
-    "gpu_util",
-)
-MEM_COLUMNS: Tuple[str, ...] = (
-    "gpu_mem_percent",
-    "gpu_mem_pct",
-    "mem_percent",
-    "mem_pct",
-    "memory_util_percent",
-    "memory_util_pct",
+    "memory_used_MiB",
+    "memory_total_MiB",
 )
 
 
-def _pick_column(df: pd.DataFrame, candidates: Iterable[str], label: str) -> str:
-    for col in candidates:
-        if col in df.columns:
-            return col
-    raise KeyError(f"CSV must include a {label} column (tried: {', '.join(candidates)}).")
+# Compact dtypes for the columns the plot needs (and ``name`` if requested)
+PLOT_DTYPES = {
+    "index": "int16",
+    "util_percent": "float32",
+    "memory_used_MiB": "float32",
+    "memory_total_MiB": "float32",
+    "name": "category",
+}
+_ARROW_TYPES = {
+    "index": pa.int16(),
+    "util_percent": pa.float32(),
+    "memory_used_MiB": pa.float32(),
+    "memory_total_MiB": pa.float32(),
+    "name": pa.dictionary(pa.int32(), pa.string()),
+}
+
+
+def _seek_time(fh, time_idx: int, start: pd.Timestamp, data_start: int) -> int:
+    """Byte offset of a line at or shortly before the first row at ``start``.
+
+    The logger appends rows in time order, so the offset is found by
+    bisecting the file instead of parsing everything before the window.
+    """
+    lo, hi = data_start, fh.seek(0, 2)
+    while hi - lo > 1 << 16:
+        mid = (lo + hi) // 2
+        fh.seek(mid)
+        fh.readline()  # skip the partial line
+        line = fh.readline()
+        try:
+            ts = pd.Timestamp(line.split(b",")[time_idx].decode())
+        except (IndexError, ValueError):
+            break
+        if ts.tzinfo is not None:
+            ts = ts.tz_convert("UTC").tz_localize(None)
+        if ts < start:
+            lo = mid
+        else:
+            hi = mid
+    if lo == data_start:
+        return lo
+    fh.seek(lo)
+    fh.readline()
+    return fh.tell()
+
+
+def _read_csv_window(path: Path, start: pd.Timestamp, end: pd.Timestamp,
+                     columns: Iterable[str]) -> pd.DataFrame:
+    """Stream ``path`` in blocks, keeping only ``columns`` and rows in the window.
+
+    Parsing starts near the window (see :func:`_seek_time`), so reading the
+    last week of a long file only parses that week. Timestamp and util
+    columns may use any of the candidate names; they are returned as
+    ``timestamp`` and ``util_percent``.
+    """
+    with open(path, "rb") as fh:
+        header_line = fh.readline()
+        header = next(csv.reader([header_line.decode()]), [])
+        time_col = pick_column(header, TIMESTAMP_COLUMNS, "timestamp")
+        util_col = pick_column(header, UTIL_COLUMNS, "GPU utilization percent")
+        # a minute of slack for rows written slightly out of order
+        offset = _seek_time(fh, header.index(time_col), start - pd.Timedelta(minutes=1),
+                            len(header_line))
+    rename = {time_col: "timestamp", util_col: "util_percent"}
+    source = {v: k for k, v in rename.items()}
+    wanted = [source.get(c, c) for c in columns]
+
+    lo = pa.scalar(start.to_pydatetime(), pa.timestamp("us"))
+    hi = pa.scalar(end.to_pydatetime(), pa.timestamp("us"))
+
+    def read(time_type):
+        types = {source.get(c, c): t for c, t in _ARROW_TYPES.items()}
+        types[time_col] = time_type
+        with open(path, "rb") as fh:
+            fh.seek(offset)
+            reader = pacsv.open_csv(
+                fh,
+                # small single-threaded blocks bound the parser's working set
+                read_options=pacsv.ReadOptions(column_names=header, block_size=4 << 20,
+                                               use_threads=False),
+                convert_options=pacsv.ConvertOptions(include_columns=wanted, column_types=types),
+            )
+            batches = []
+            for batch in reader:
+                # Compare on naive UTC, matching how the window is expressed.
+                ts = batch.column(time_col).cast(pa.timestamp("us"))
+                mask = pc.and_(pc.greater_equal(ts, lo), pc.less(ts, hi))
+                batches.append(batch.filter(mask))
+                if len(ts) and pc.greater_equal(ts[0], hi).as_py():
+                    break  # past the window
+            return pa.Table.from_batches(batches, schema=reader.schema)
+
+    try:
+        table = read(pa.timestamp("us", tz="UTC"))
+    except pa.ArrowInvalid:
+        table = read(pa.timestamp("us"))  # older files without a UTC offset
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    pa.default_memory_pool().release_unused()
+    return df.rename(columns=rename)
+
+
+def load_gpu_metrics(path: str | Path, start: pd.Timestamp, end: pd.Timestamp,
+                     columns: Iterable[str] = STORE_COLUMNS) -> pd.DataFrame:
+    """Load ``columns`` of the GPU metrics in ``[start, end)`` with compact dtypes.
+
+    Parameters
+    ----------
+    path:
+        A ``gpu.csv`` file or the ``gpu`` table directory of a
+        :mod:`mysmtp.store` metric store (read through
+        :func:`mysmtp.rollup.read_metrics`).
+    start, end:
+        Naive UTC bounds of the window.
+
+    Returns
+    -------
+    pandas.DataFrame
+        ``timestamp`` as naive UTC ``datetime64``, metrics as ``int16`` /
+        ``float32`` and ``name`` (if requested) as ``category``.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(path)
+    columns = list(columns)
+    if path.is_dir():
+        df = read_metrics(path.parent, start.tz_localize("UTC"), end.tz_localize("UTC"),
+                          columns=columns)
+    else:
+        df = _read_csv_window(path, start, end, columns)
+
+    ts = df["timestamp"]
+    if getattr(ts.dtype, "tz", None) is not None:
+        df["timestamp"] = ts.dt.tz_localize(None)
+    return df.astype({c: t for c, t in PLOT_DTYPES.items() if c in df.columns}, copy=False)
 
 
-def plot_gpu_day(csv_path: str | Path):
-    """Load ``gpu.csv`` and plot GPU utilization for the current day.
+def change_points(df: pd.DataFrame, columns: Iterable[str] = ("util_percent", "memory_used_MiB")
+                  ) -> pd.DataFrame:
+    """Sort by GPU and time and drop rows where none of ``columns`` changed.
 
-    The plot shows GPU utilization (bars) and GPU memory utilization
-    (line) over the course of the current day. The function filters rows
-    to the current date based on the timestamp column.
+    The first sample of every GPU is always kept. Only the kept rows are
+    copied.
+    """
+    order = np.lexsort((df["timestamp"].to_numpy(), df["index"].to_numpy()))
+    idx = df["index"].to_numpy()[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = idx[1:] != idx[:-1]
+    for col in columns:
+        values = df[col].to_numpy()[order]
+        keep[1:] |= values[1:] != values[:-1]
+    return df.take(order[keep])
+
+
+def split_by_gpu(df: pd.DataFrame) -> list[tuple[int, pd.DataFrame]]:
+    """Split a frame sorted by ``index`` into ``(gpu, rows)`` slices without copying."""
+    idx = df["index"].to_numpy()
+    bounds = np.flatnonzero(idx[1:] != idx[:-1]) + 1
+    starts = np.r_[0, bounds]
+    ends = np.r_[bounds, len(df)]
+    return [(int(idx[a]), df.iloc[a:b]) for a, b in zip(starts, ends) if b > a]
+
+
+def gpu_series(csv_path: str | Path, start: pd.Timestamp, end: pd.Timestamp,
+               cache_dir: str | Path | None = None) -> list[tuple[int, np.ndarray, np.ndarray, np.ndarray]]:
+    """Per-GPU ``(gpu, time, util_peak, mem_pct)`` arrays for ``[start, end)``.
+
+    Without ``cache_dir`` these are the raw change points. With it, a CSV
+    source goes through a :class:`mysmtp.task.plot_cache.PlotCache` in that
+    directory: only rows appended since the last call are parsed, and the
+    series are the cached per-minute peak utilization and mean memory.
+    """
+    path = Path(csv_path)
+    if cache_dir is not None and path.is_file():
+        cache = PlotCache(path, cache_dir)
+        cache.update()
+        df = cache.read(start, end)
+        return [
+            (k, gf["timestamp"].to_numpy(), gf["util_max"].to_numpy(), gf["mem_pct"].to_numpy())
+            for k, gf in split_by_gpu(df)
+        ]
+
+    # keep only samples where utilization or memory changed
+    gpus = split_by_gpu(change_points(load_gpu_metrics(path, start, end)))
+    return [
+        (
+            k,
+            gf["timestamp"].to_numpy(),
+            gf["util_percent"].to_numpy(),
+            gf["memory_used_MiB"].to_numpy() / gf["memory_total_MiB"].to_numpy() * 100,
+        )
+        for k, gf in gpus
+    ]
+
+
+def plot_gpu_day(csv_path: str | Path, cache_dir: str | Path | None = None):
+    """Load ``gpu.csv`` and plot GPU utilization for the last week.
+
+    The plot shows GPU utilization (filled area of the per-pixel peak) and
+    GPU memory utilization (line) per GPU from seven days ago through
+    today. Both are downsampled to the figure's pixel width first, see
+    :mod:`mysmtp.task.downsample`.
 
     Parameters
     ----------
     csv_path:
-        Path to the ``gpu.csv`` file. The CSV must include a timestamp
+        Path to the ``gpu.csv`` file, or to the ``gpu`` table directory of a
+        :mod:`mysmtp.store` metric store (the coarsest suitable rollup tier
+        next to it is read, see :func:`mysmtp.rollup.choose_tier`). The data must include a timestamp
         column and percentage columns for GPU utilization and memory
         utilization.
+    cache_dir:
+        Optional directory for an incremental per-(GPU, day) plot cache of
+        a CSV source, see :func:`gpu_series`.
 
     Returns
     -------
@@ -63,87 +263,44 @@ def plot_gpu_day(csv_path: str | Path):
         The created figure and axis for further customization or saving.
     """
 
-    path = Path(csv_path)
-    if not path.exists():
-        raise FileNotFoundError(path)
-
-    df = pd.read_csv(path)
-    print(df)
-    if df.empty:
-        raise ValueError("The GPU metrics file is empty.")
-
-    time_col = _pick_column(df, TIMESTAMP_COLUMNS, "timestamp")
-    util_col = _pick_column(df, UTIL_COLUMNS, "GPU utilization percent")
-    # mem_col = _pick_column(df, MEM_COLUMNS, "GPU memory utilization percent")
-
-    mem_used = "memory_used_MiB"
-    mem_total = "memory_total_MiB"
-
-    df[time_col] = pd.to_datetime(df[time_col])
     today = pd.Timestamp(datetime.now().date())
     tweek = today - pd.Timedelta(days=7)
     tomorrow = today + pd.Timedelta(days=1)
 
-# Invalid comparison between dtype=datetime64[ns, UTC] and Timestamp
-    df[time_col] = df[time_col].dt.tz_localize(None)
-    df = df[(df[time_col] >= tweek) & (df[time_col] < tomorrow)].copy()
-    
-    if df.empty:
+    gpus = gpu_series(csv_path, tweek, tomorrow, cache_dir)
+    if not gpus:
         raise ValueError("No GPU metrics found for the current day.")
 
-    # df = df.head(50) # select n rows for testing
-
-    ids = set(df['index'].values)
-    colors = plt.cm.get_cmap('tab10', len(ids)) # rgba
-    colors = [np.array(colors(i)).round(2) for i in range(len(ids))]
-
-    print(ids)
-    print(colors)
-
-    # group by index and plot each gpu separately
-    fig, ax = plt.subplots(figsize=(12, 6))
-    for k, gf in df.groupby('index'):
-
-        gf.sort_values(time_col, inplace=True)
-
-        # print(gf[util_col, mem_used, mem_total ])
-        print(gf[[ util_col, mem_used, mem_total ]])
-
-        # filter out values that did not change from previous row
-        gf = gf.loc[(gf[util_col].shift() != gf[util_col]) | (gf[mem_used].shift() != gf[mem_used])]
-        # print len
-        print(f"GPU{k} rows after filtering: {len(gf)}")
+    cmap = colormaps["tab10"].resampled(len(gpus))
+    # not registered with pyplot, so the figure is freed with its last reference
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
 
-        # Estimate a reasonable bar width from the median sampling interval.
-        color = colors[k ]
-        if k==0:
-            spacing = gf[time_col].diff().median()
+    # No more points per series than the axes have pixels, so render time
+    # does not grow with the window.
+    width_px = int(fig.get_figwidth() * fig.dpi)
 
-            if pd.isna(spacing) or spacing == pd.Timedelta(0):
-                spacing = pd.Timedelta(minutes=5)
-            bar_width = spacing / pd.Timedelta(days=1)
+    for i, (k, t, util, mem_pct) in enumerate(gpus):
+        color = np.array(cmap(i)).round(2)
 
-        ax.bar(gf[time_col], gf[util_col], width=bar_width, alpha=0.6, label=f"GPU{k} util %"
-                , color=color   
-               )
+        # per-pixel peak utilization as a filled step area
+        tu, _, umax = minmax_envelope(t, util, width_px)
+        ax.fill_between(tu, 0, umax, step="post", alpha=0.3, color=color, linewidth=0,
+                        label=f"GPU{k} util %")
+        ax.step(tu, umax, where="post", color=color, linewidth=0.8)
 
-        mem_pct = (gf[mem_used] / gf[mem_total]) * 100
-        ax.plot(gf[time_col],
-                mem_pct,
-                linestyle='--',
-                color=color, linewidth=2, label=f"GPU{k} mem %")
+        keep = lttb(t, mem_pct, width_px)
+        ax.plot(t[keep], mem_pct[keep], linestyle='--', color=color, linewidth=2,
+                label=f"GPU{k} mem %")
 
-    print('plotting')
-    hostname = lines(do(parse("hostname"))[0])[0]
-    ax.set_title(f"{hostname} GPU usage today")
+    ax.set_title(f"{hostname()} GPU usage today")
     ax.set_xlabel("Time of day")
     ax.set_ylabel("Percent")
     ax.set_ylim(0, 100)
-                      
 
     ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
     fig.autofmt_xdate()
-    ax.legend()
+    ax.legend(loc="upper left")
     fig.tight_layout()
 
     return fig, ax
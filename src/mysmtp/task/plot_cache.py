@@ -0,0 +1,195 @@
+"""Incremental per-(GPU, day) cache of plot aggregates for a metric CSV.
+
+The logger only ever appends to ``gpu.csv``, so re-parsing the whole file
+for every daily plot repeats almost all the work. :class:`PlotCache` keeps
+one-minute aggregates per GPU and day as small Parquet files next to a
+``state.json`` that records how far into the CSV it has read::
+
+    <cache>/state.json
+    <cache>/gpu<k>_<YYYY-MM-DD>.parquet
+
+Each :meth:`PlotCache.update` parses only the bytes appended since the
+last call and merges them into the (GPU, day) files they touch; every
+other day is reused as is. If the file was replaced or truncated (e.g.
+rotated), the cache starts over.
+
+Aggregates hold ``util_min``/``util_max`` and the sum and count of memory
+percent, so partial minutes merge exactly across updates. Metric stores
+(:mod:`mysmtp.store`) already provide rollup tiers and do not need this.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from mysmtp.task.columns import TIMESTAMP_COLUMNS, UTIL_COLUMNS, pick_column
+
+BUCKET = pd.Timedelta(minutes=1)
+AGG_COLUMNS = ["timestamp", "index", "util_min", "util_max", "mem_sum", "count"]
+
+
+def aggregate_minutes(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate raw samples (naive UTC ``timestamp``) into per-GPU minute buckets."""
+    mem_pct = df["memory_used_MiB"] / df["memory_total_MiB"] * 100
+    keys = [df["index"], df["timestamp"].dt.floor(BUCKET)]
+    grouped = pd.DataFrame({"util": df["util_percent"], "mem": mem_pct}).groupby(keys, sort=False)
+    out = grouped.agg(
+        util_min=("util", "min"), util_max=("util", "max"), mem_sum=("mem", "sum"), count=("mem", "size")
+    )
+    return out.reset_index()[AGG_COLUMNS]
+
+
+def merge_minutes(parts: list[pd.DataFrame]) -> pd.DataFrame:
+    """Combine aggregates that may overlap on the same (GPU, minute)."""
+    df = pd.concat(parts, ignore_index=True)
+    out = df.groupby(["index", "timestamp"], sort=True).agg(
+        util_min=("util_min", "min"),
+        util_max=("util_max", "max"),
+        mem_sum=("mem_sum", "sum"),
+        count=("count", "sum"),
+    )
+    return out.reset_index()[AGG_COLUMNS]
+
+
+class PlotCache:
+    """Minute aggregates of ``source`` (a logger CSV) kept under ``root``."""
+
+    CHUNK = 32 << 20  # bytes of new CSV parsed at a time
+
+    def __init__(self, source: str | Path, root: str | Path) -> None:
+        self.source = Path(source)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._state_path = self.root / "state.json"
+
+    # --------------------
+    # STATE
+    # --------------------
+    def _load_state(self) -> dict:
+        try:
+            return json.loads(self._state_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state: dict) -> None:
+        tmp = self._state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state))
+        os.replace(tmp, self._state_path)
+
+    def _part_path(self, gpu: int, day) -> Path:
+        return self.root / f"gpu{gpu}_{pd.Timestamp(day).date().isoformat()}.parquet"
+
+    def clear(self) -> None:
+        for f in self.root.glob("gpu*_*.parquet"):
+            f.unlink()
+        self._state_path.unlink(missing_ok=True)
+
+    # --------------------
+    # UPDATE
+    # --------------------
+    def update(self) -> list[tuple[int, str]]:
+        """Parse rows appended since the last update; return the (GPU, day) keys rewritten."""
+        st = self.source.stat()
+        state = self._load_state()
+        if (
+            state.get("source") != str(self.source.resolve())
+            or state.get("inode") != st.st_ino
+            or st.st_size < state.get("offset", 0)
+        ):
+            self.clear()  # new, replaced or truncated file
+            state = {}
+
+        with open(self.source, "rb") as fh:
+            header_line = fh.readline()
+            header = next(csv.reader([header_line.decode()]), [])
+            time_col = pick_column(header, TIMESTAMP_COLUMNS, "timestamp")
+            util_col = pick_column(header, UTIL_COLUMNS, "GPU utilization percent")
+            offset = state.get("offset") or len(header_line)
+            fh.seek(offset)
+            parts, consumed = [], 0
+            pending = b""
+            while chunk := fh.read(self.CHUNK):
+                chunk = pending + chunk
+                cut = chunk.rfind(b"\n") + 1
+                pending = chunk[cut:]  # a line still being written waits for next time
+                if cut:
+                    parts.append(self._aggregate(chunk[:cut], header, time_col, util_col))
+                    consumed += cut
+        if not consumed:
+            return []
+        new = merge_minutes(parts)
+
+        touched = []
+        for (gpu, day), part in new.groupby(["index", new["timestamp"].dt.floor("D")]):
+            path = self._part_path(gpu, day)
+            parts = [part]
+            if path.exists():
+                parts.insert(0, pd.read_parquet(path))
+            merged = merge_minutes(parts)
+            tmp = path.with_suffix(".tmp")
+            merged.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+            touched.append((int(gpu), pd.Timestamp(day).date().isoformat()))
+
+        self._save_state(
+            {"source": str(self.source.resolve()), "inode": st.st_ino, "offset": offset + consumed}
+        )
+        return touched
+
+    def _aggregate(self, data: bytes, header: list[str], time_col: str,
+                   util_col: str) -> pd.DataFrame:
+        columns = [time_col, "index", util_col, "memory_used_MiB", "memory_total_MiB"]
+        types = {
+            "index": pa.int16(),
+            util_col: pa.float32(),
+            "memory_used_MiB": pa.float32(),
+            "memory_total_MiB": pa.float32(),
+        }
+
+        def read(time_type):
+            return pacsv.read_csv(
+                pa.BufferReader(data),
+                read_options=pacsv.ReadOptions(column_names=header, use_threads=False),
+                convert_options=pacsv.ConvertOptions(
+                    include_columns=columns, column_types={**types, time_col: time_type}
+                ),
+            )
+
+        try:
+            table = read(pa.timestamp("us", tz="UTC"))
+        except pa.ArrowInvalid:
+            table = read(pa.timestamp("us"))  # older files without a UTC offset
+        df = table.to_pandas().rename(columns={time_col: "timestamp", util_col: "util_percent"})
+        ts = df["timestamp"]
+        if ts.dt.tz is not None:
+            df["timestamp"] = ts.dt.tz_convert("UTC").dt.tz_localize(None)
+        return aggregate_minutes(df)
+
+    # --------------------
+    # READ
+    # --------------------
+    def read(self, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+        """Minute aggregates for ``[start, end)`` (naive UTC), sorted by GPU and time.
+
+        Adds ``mem_pct`` (the mean memory percent of each minute).
+        """
+        days = {d.date().isoformat() for d in pd.date_range(start.floor("D"), end, freq="D")}
+        parts = [
+            pd.read_parquet(f)
+            for f in sorted(self.root.glob("gpu*_*.parquet"))
+            if f.stem.split("_", 1)[1] in days
+        ]
+        if not parts:
+            return pd.DataFrame(columns=[*AGG_COLUMNS, "mem_pct"])
+        df = pd.concat(parts, ignore_index=True)
+        df = df[(df["timestamp"] >= start) & (df["timestamp"] < end)]
+        df = df.sort_values(["index", "timestamp"], ignore_index=True)
+        df["mem_pct"] = df["mem_sum"] / df["count"]
+        return df
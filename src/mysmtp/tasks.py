@@ -1,50 +1,119 @@
+import atexit
+import os
+from datetime import datetime, timezone
 from pathlib import Path
 from rich import print
-import subprocess
 
-import pandas as pd
+from mysmtp.sink import BufferedSink, CsvSink, ParquetSink
+from mysmtp.top.gpu import has_nvidia_gpu_dev
+from mysmtp.top.gpu_sampler import GpuSampler, make_sampler
+from mysmtp.top.gpu_users import GpuUserSampler
+from mysmtp.top.usage import UserCpuSampler, user_directory
 
-from mysmtp.top.gpu import has_nvidia_gpu_dev, parse_nvidia_smi
+GPU_FIELDS = [
+    "timestamp",
+    "driver_version",
+    "cuda_version",
+    "index",
+    "name",
+    "bus_id",
+    "temperature_C",
+    "power_usage_W",
+    "power_cap_W",
+    "memory_used_MiB",
+    "memory_total_MiB",
+    "util_percent",
+]
+PROCESS_FIELDS = ["timestamp", "gpu", "pid", "type", "process_name", "gpu_memory_MiB", "uid"]
+USER_CPU_FIELDS = ["timestamp", "uid", "user", "processes", "cpu_percent", "rss_bytes"]
+GPU_USER_FIELDS = ["timestamp", "uid", "user", "processes", "gpus", "gpu_memory_MiB", "gpu_seconds"]
 
+# table name -> (columns, legacy CSV file)
+TABLES = {
+    "gpu": (GPU_FIELDS, "gpu_metrics.csv"),
+    "gpu_processes": (PROCESS_FIELDS, "gpu_processes.csv"),
+    "user_cpu": (USER_CPU_FIELDS, "user_cpu.csv"),
+    "gpu_users": (GPU_USER_FIELDS, "gpu_users.csv"),
+}
 
-def log_gpu_metrics() -> None:
-    """Collect GPU metrics via ``nvidia-smi`` and append them to CSV files.
+_sampler: GpuSampler | None = None
+_cpu_sampler: UserCpuSampler | None = None
+_gpu_user_sampler: GpuUserSampler | None = None
+_sinks: dict[str, BufferedSink] = {}
+_backend_error: str | None = None  # last GPU backend failure printed
 
-    The function exits early when no NVIDIA GPU devices are present or when
-    ``nvidia-smi`` cannot be executed.
+
+def get_sampler() -> GpuSampler:
+    """Return the process-wide GPU sampler, creating it on first use.
+
+    The backend is chosen by ``MYSMTP_GPU_BACKEND`` (``auto``, ``nvml``,
+    ``smi`` or the path of a recorded ``nvidia-smi`` capture to replay).
     """
-    if not has_nvidia_gpu_dev():
-        return
+    global _sampler
+    if _sampler is None:
+        _sampler = make_sampler(os.environ.get("MYSMTP_GPU_BACKEND", "auto"))
+        atexit.register(_sampler.close)
+    return _sampler
 
-    try:
-        result = subprocess.run(
-            ["nvidia-smi"], capture_output=True, text=True, check=True
-        )
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return
 
-    parsed = parse_nvidia_smi(result.stdout)
-    timestamp = pd.Timestamp.utcnow()
-
-    cmd = "nvidia-smi --query-gpu=index,name,temperature.gpu,power.draw,power.limit,memory.used,memory.total,utilization.gpu --format=csv,noheader,nounits"
-    result = subprocess.run(cmd.split(), capture_output=True, text=True, check=True)
-    gpu_info_lines = result.stdout.strip().splitlines()
-    gpu_info_map = {
-            'index': (0, int),
-            'name': (1, str),
-            'temperature_C': (2, int),
-            'power_usage_W': (3, float),
-            'power_cap_W': (4, float),
-            'memory_used_MiB': (5, int),
-            'memory_total_MiB': (6, int),
-            'util_percent': (7, int),
-    }
-    gpu_info_list = []
-    for line in gpu_info_lines:
-        parts = [part.strip() for part in line.split(',')]
-        gpu_info = {key: dtype(parts[idx]) for key, (idx, dtype) in gpu_info_map.items()}
-        gpu_info_list.append(gpu_info)
-    parsed['gpus'] = gpu_info_list
+def _warn_backend(error: Exception) -> None:
+    """Print why the GPU backend could not start, once per distinct error."""
+    global _backend_error
+    message = f"GPU backend unavailable: {error}"
+    if message != _backend_error:
+        print(f"[yellow]{message}[/yellow]")
+        _backend_error = message
+
+
+def metrics_root() -> Path:
+    """Root of the Parquet metric store: ``MYSMTP_METRICS_DIR`` or ``metrics/``."""
+    return Path(os.environ.get("MYSMTP_METRICS_DIR", "metrics"))
+
+
+def get_sink(name: str) -> BufferedSink:
+    """Return the buffered sink for one of the :data:`TABLES`.
+
+    By default rows go to the date-partitioned Parquet store under
+    ``MYSMTP_METRICS_DIR`` (``metrics/``). ``MYSMTP_METRIC_FORMAT=csv`` keeps
+    the legacy CSV files (``gpu_metrics.csv`` etc.) instead.
+    """
+    if name not in _sinks:
+        fields, csv_name = TABLES[name]
+        if os.environ.get("MYSMTP_METRIC_FORMAT", "parquet") == "csv":
+            _sinks[name] = CsvSink(csv_name, fields)
+        else:
+            _sinks[name] = ParquetSink(metrics_root(), name)
+    return _sinks[name]
+
+
+def log_gpu_metrics(sampler: GpuSampler | None = None) -> None:
+    """Collect GPU metrics from a resident sampler and buffer them for storage.
+
+    Rows are written in batches by the sinks from :func:`get_sink`; pending
+    rows are flushed on shutdown. GPU processes are attributed to their
+    owners in the same tick (``uid`` on each process row, plus per-user
+    memory and GPU-seconds in ``gpu_users``), see
+    :class:`~mysmtp.top.gpu_users.GpuUserSampler`. Processes of a replayed
+    capture are not this machine's and are logged with ``uid=None``.
+
+    The function exits early when no NVIDIA GPU devices are present (unless
+    ``MYSMTP_GPU_BACKEND`` names a backend explicitly, e.g. a replay file),
+    when no sampler backend can be started, or when no new frame is available.
+    """
+    if sampler is None:
+        backend = os.environ.get("MYSMTP_GPU_BACKEND", "auto")
+        if _sampler is None and backend == "auto" and not has_nvidia_gpu_dev():
+            return
+        try:
+            sampler = get_sampler()
+        except (FileNotFoundError, ImportError, RuntimeError, ValueError) as e:
+            _warn_backend(e)
+            return
+
+    parsed = sampler.sample()
+    if parsed is None:
+        return
+    timestamp = datetime.now(timezone.utc)
 
     gpu_rows = []
     for gpu in parsed.get("gpus", []):
@@ -65,16 +134,62 @@ def log_gpu_metrics() -> None:
             }
         )
 
-    if gpu_rows:
-        gpu_df = pd.DataFrame(gpu_rows)
-        gpu_path = Path("gpu_metrics.csv")
-        gpu_df.to_csv(gpu_path, mode="a", header=not gpu_path.exists(), index=False)
+    get_sink("gpu").write_many(gpu_rows)
+
+    global _gpu_user_sampler
+    if _gpu_user_sampler is None:
+        _gpu_user_sampler = GpuUserSampler()
+    processes = parsed.get("processes", [])
+    owned = _gpu_user_sampler.sample(processes, live=sampler.live)
 
     process_rows = []
-    for proc in parsed.get("processes", []):
-        process_rows.append({"timestamp": timestamp, **proc})
+    for proc in processes:
+        process_rows.append({"timestamp": timestamp, **proc, "uid": owned.owners[proc["pid"]]})
+    get_sink("gpu_processes").write_many(process_rows)
+
+    names = user_directory().resolve(uid for uid in owned.users if uid is not None)
+    get_sink("gpu_users").write_many(
+        [
+            {
+                "timestamp": timestamp,
+                "uid": u.uid,
+                "user": names.get(u.uid, "unknown"),
+                "processes": u.processes,
+                "gpus": u.gpus,
+                "gpu_memory_MiB": u.gpu_memory_MiB,
+                "gpu_seconds": round(u.gpu_seconds, 3),
+            }
+            for u in owned.users.values()
+        ]
+    )
+
 
-    if process_rows:
-        proc_df = pd.DataFrame(process_rows)
-        proc_path = Path("gpu_processes.csv")
-        proc_df.to_csv(proc_path, mode="a", header=not proc_path.exists(), index=False)
+def log_user_cpu() -> None:
+    """Record per-user CPU%, process count and RSS since the previous call.
+
+    Uses a resident :class:`~mysmtp.top.usage.UserCpuSampler`, so the call
+    does not sleep; the first call only establishes the baseline. User names
+    come from the cached :func:`~mysmtp.top.usage.user_directory`.
+    """
+    global _cpu_sampler
+    if _cpu_sampler is None:
+        _cpu_sampler = UserCpuSampler()
+    sample = _cpu_sampler.sample()
+    if sample.elapsed == 0.0:
+        return
+
+    timestamp = datetime.now(timezone.utc)
+    names = user_directory().resolve(sample.users)
+    get_sink("user_cpu").write_many(
+        [
+            {
+                "timestamp": timestamp,
+                "uid": u.uid,
+                "user": names[u.uid],
+                "processes": u.processes,
+                "cpu_percent": round(u.cpu_percent, 2),
+                "rss_bytes": u.rss_bytes,
+            }
+            for u in sample.users.values()
+        ]
+    )
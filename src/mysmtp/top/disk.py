@@ -1,72 +1,239 @@
+import threading
+import time
+from dataclasses import asdict
+
 import psutil
-import shutil
 
-def get_system_stats():
-    stats = {}
-
-    # --------------------
-    # MEMORY
-    # --------------------
-    vm = psutil.virtual_memory()
-    sm = psutil.swap_memory()
-
-    stats["memory"] = {
-        "total": vm.total,
-        "used": vm.used,
-        "free": vm.free,
-        "available": vm.available,
-        "cached": vm.cached if hasattr(vm, "cached") else None,
-        "percent": vm.percent,
-    }
+from mysmtp.top.usage import shared_cpu_sampler
 
-    stats["swap"] = {
-        "total": sm.total,
-        "used": sm.used,
-        "free": sm.free,
-        "percent": sm.percent,
-    }
+SECTIONS = ("cpu", "memory", "swap", "disks", "disk_io_global", "disk_io_perdisk")
 
-    # --------------------
-    # DISK USAGE PER MOUNT
-    # --------------------
-    disk_info = {}
-    for part in psutil.disk_partitions(all=False):
-        try:
-            usage = psutil.disk_usage(part.mountpoint)
-        except PermissionError:
-            continue
-
-        disk_info[part.mountpoint] = {
-            "device": part.device,
-            "fstype": part.fstype,
-            "total": usage.total,
-            "used": usage.used,
-            "free": usage.free,
-            "percent": usage.percent,
-        }
+# statvfs on these can block indefinitely when the server is gone, so they
+# are queried on a helper thread with a timeout.
+NETWORK_FSTYPES = {
+    "nfs",
+    "nfs4",
+    "cifs",
+    "smb3",
+    "smbfs",
+    "fuse.sshfs",
+    "lustre",
+    "gpfs",
+    "ceph",
+    "glusterfs",
+    "beegfs",
+}
+
+# Skipped outright: kernel and in-memory filesystems with no disk behind
+# them. ``disk_partitions(all=False)`` would also drop every network mount,
+# so partitions are enumerated with ``all=True`` and filtered here.
+PSEUDO_FSTYPES = {
+    "autofs",
+    "binfmt_misc",
+    "bpf",
+    "cgroup",
+    "cgroup2",
+    "configfs",
+    "debugfs",
+    "devpts",
+    "devtmpfs",
+    "efivarfs",
+    "fusectl",
+    "hugetlbfs",
+    "mqueue",
+    "nsfs",
+    "overlay",
+    "proc",
+    "pstore",
+    "ramfs",
+    "rpc_pipefs",
+    "securityfs",
+    "selinuxfs",
+    "sysfs",
+    "tmpfs",
+    "tracefs",
+}
+
+
+def _is_network(fstype):
+    # any FUSE filesystem may sit on a remote end (sshfs, gvfs, rclone ...)
+    return fstype in NETWORK_FSTYPES or fstype.startswith("fuse")
 
-    stats["disks"] = disk_info
-
-    # --------------------
-    # DISK IO COUNTERS (GLOBAL AND PER-DISK)
-    # --------------------
-    io_global = psutil.disk_io_counters()
-    stats["disk_io_global"] = {
-        "read_bytes": io_global.read_bytes,
-        "write_bytes": io_global.write_bytes,
-        "read_count": io_global.read_count,
-        "write_count": io_global.write_count,
+
+def _io_dict(io):
+    return {
+        "read_bytes": io.read_bytes,
+        "write_bytes": io.write_bytes,
+        "read_count": io.read_count,
+        "write_count": io.write_count,
     }
 
-    stats["disk_io_perdisk"] = {}
-    per_disk = psutil.disk_io_counters(perdisk=True)
-    for disk, io in per_disk.items():
-        stats["disk_io_perdisk"][disk] = {
-            "read_bytes": io.read_bytes,
-            "write_bytes": io.write_bytes,
-            "read_count": io.read_count,
-            "write_count": io.write_count,
+
+def _io_rates(cur, prev, elapsed):
+    if prev is None or elapsed <= 0:
+        return {
+            "read_bytes_per_s": None,
+            "write_bytes_per_s": None,
+            "read_iops": None,
+            "write_iops": None,
         }
+    return {
+        "read_bytes_per_s": (cur.read_bytes - prev.read_bytes) / elapsed,
+        "write_bytes_per_s": (cur.write_bytes - prev.write_bytes) / elapsed,
+        "read_iops": (cur.read_count - prev.read_count) / elapsed,
+        "write_iops": (cur.write_count - prev.write_count) / elapsed,
+    }
+
+
+class SystemStatsCollector:
+    """Collect only the requested sections of :func:`get_system_stats`.
+
+    Network mounts are queried with a per-mount ``mount_timeout``; a mount
+    that does not answer in time is reported in ``stats["stale_mounts"]``
+    and skipped (no new query is started while the previous one is still
+    hanging). IO counters from the previous call are kept, so the IO
+    sections also carry bytes-per-second and IOPS since then. The CPU
+    section reads the process-wide :func:`mysmtp.top.usage.shared_cpu_sampler`,
+    so it shares one ``/proc/stat`` read per tick with other consumers.
+    """
+
+    def __init__(self, sections=SECTIONS, mount_timeout=1.0):
+        unknown = set(sections) - set(SECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown sections: {', '.join(sorted(unknown))}")
+        self.sections = tuple(sections)
+        self.mount_timeout = mount_timeout
+        self._pending = {}  # mountpoint -> thread still stuck in disk_usage
+        self._prev_io = None
+        self._prev_perdisk = {}
+        self._prev_time = None
+
+    def collect(self):
+        stats = {}
+        now = time.monotonic()
+        elapsed = now - self._prev_time if self._prev_time is not None else 0.0
 
-    return stats
+        # --------------------
+        # CPU (SHARED SNAPSHOT)
+        # --------------------
+        if "cpu" in self.sections:
+            snap = shared_cpu_sampler().sample()
+            stats["cpu"] = {
+                **asdict(snap.total),
+                "per_core": [c.busy for c in snap.cores],
+                "interval": snap.elapsed,
+            }
 
+        # --------------------
+        # MEMORY
+        # --------------------
+        if "memory" in self.sections:
+            vm = psutil.virtual_memory()
+            stats["memory"] = {
+                "total": vm.total,
+                "used": vm.used,
+                "free": vm.free,
+                "available": vm.available,
+                "cached": vm.cached if hasattr(vm, "cached") else None,
+                "percent": vm.percent,
+            }
+
+        if "swap" in self.sections:
+            sm = psutil.swap_memory()
+            stats["swap"] = {
+                "total": sm.total,
+                "used": sm.used,
+                "free": sm.free,
+                "percent": sm.percent,
+            }
+
+        # --------------------
+        # DISK USAGE PER MOUNT
+        # --------------------
+        if "disks" in self.sections:
+            stats["disks"], stats["stale_mounts"] = self._disk_usage()
+
+        # --------------------
+        # DISK IO COUNTERS (GLOBAL AND PER-DISK)
+        # --------------------
+        if "disk_io_global" in self.sections:
+            io_global = psutil.disk_io_counters()
+            if io_global is not None:
+                stats["disk_io_global"] = {
+                    **_io_dict(io_global),
+                    **_io_rates(io_global, self._prev_io, elapsed),
+                }
+            self._prev_io = io_global
+
+        if "disk_io_perdisk" in self.sections:
+            per_disk = psutil.disk_io_counters(perdisk=True) or {}
+            stats["disk_io_perdisk"] = {
+                disk: {**_io_dict(io), **_io_rates(io, self._prev_perdisk.get(disk), elapsed)}
+                for disk, io in per_disk.items()
+            }
+            self._prev_perdisk = per_disk
+
+        self._prev_time = now
+        return stats
+
+    def _disk_usage(self):
+        disk_info = {}
+        stale = []
+        seen = set()
+        for part in psutil.disk_partitions(all=True):
+            mount = part.mountpoint
+            if part.fstype in PSEUDO_FSTYPES or not part.device or mount in seen:
+                continue
+            seen.add(mount)
+            try:
+                if _is_network(part.fstype):
+                    usage = self._disk_usage_with_timeout(mount)
+                    if usage is None:
+                        stale.append(mount)
+                        continue
+                else:
+                    usage = psutil.disk_usage(mount)
+            except (PermissionError, FileNotFoundError):
+                continue
+
+            disk_info[mount] = {
+                "device": part.device,
+                "fstype": part.fstype,
+                "total": usage.total,
+                "used": usage.used,
+                "free": usage.free,
+                "percent": usage.percent,
+            }
+        return disk_info, stale
+
+    def _disk_usage_with_timeout(self, mount):
+        thread = self._pending.get(mount)
+        if thread is not None and thread.is_alive():
+            return None  # still hanging since an earlier call
+
+        result = {}
+
+        def query():
+            try:
+                result["usage"] = psutil.disk_usage(mount)
+            except OSError:
+                pass
+
+        thread = threading.Thread(target=query, daemon=True)
+        thread.start()
+        thread.join(self.mount_timeout)
+        if thread.is_alive():
+            self._pending[mount] = thread
+            return None
+        self._pending.pop(mount, None)
+        return result.get("usage")  # None on e.g. ESTALE
+
+
+_collector = None
+
+
+def get_system_stats():
+    global _collector
+    if _collector is None:
+        _collector = SystemStatsCollector()
+    return _collector.collect()
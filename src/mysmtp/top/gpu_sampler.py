@@ -0,0 +1,276 @@
+"""Long-lived GPU samplers.
+
+Forking ``nvidia-smi`` every second costs far more than the measurement
+itself, so the samplers here stay resident between ticks. Every backend
+returns the same dict as :func:`mysmtp.top.gpu.parse_nvidia_smi`::
+
+    {"driver_version": ..., "cuda_version": ..., "gpus": [...], "processes": [...]}
+
+* :class:`NvmlSampler` talks to the driver through NVML (``nvidia-ml-py``).
+* :class:`SmiStreamSampler` keeps a single ``nvidia-smi --loop-ms`` child
+  running and parses its stdout frame by frame on a reader thread with
+  :class:`mysmtp.top.smi_parser.SmiParser`.
+* :class:`ReplaySampler` replays recorded ``nvidia-smi`` output, so the
+  logger can be exercised on machines without a GPU.
+"""
+
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Protocol
+
+from mysmtp.top.smi_parser import iter_frames
+
+
+class GpuSampler(Protocol):
+    live: bool  # frames describe processes running on this machine now
+
+    def sample(self) -> dict | None: ...
+
+    def close(self) -> None: ...
+
+
+class NvmlSampler:
+    """Sample GPUs through NVML without spawning any process.
+
+    Static properties (names, bus ids, memory totals, versions) are read once
+    at construction; each :meth:`sample` only queries the volatile counters.
+    """
+
+    live = True
+
+    def __init__(self) -> None:
+        try:
+            import pynvml
+        except ImportError as e:
+            raise ImportError(
+                "NvmlSampler requires nvidia-ml-py (pip install nvidia-ml-py)"
+            ) from e
+
+        self._nvml = pynvml
+        try:
+            pynvml.nvmlInit()
+        except pynvml.NVMLError as e:
+            raise RuntimeError(f"NVML initialization failed: {e}") from e
+
+        cuda = pynvml.nvmlSystemGetCudaDriverVersion()
+        self.driver_version = _text(pynvml.nvmlSystemGetDriverVersion())
+        self.cuda_version = f"{cuda // 1000}.{cuda % 1000 // 10}"
+
+        self._handles = []
+        self._static = []
+        for i in range(pynvml.nvmlDeviceGetCount()):
+            h = pynvml.nvmlDeviceGetHandleByIndex(i)
+            self._handles.append(h)
+            self._static.append(
+                {
+                    "index": i,
+                    "name": _text(pynvml.nvmlDeviceGetName(h)),
+                    "bus_id": _text(pynvml.nvmlDeviceGetPciInfo(h).busId),
+                    "memory_total_MiB": pynvml.nvmlDeviceGetMemoryInfo(h).total >> 20,
+                }
+            )
+        self._proc_names: dict[int, str] = {}
+
+    def sample(self) -> dict | None:
+        nvml = self._nvml
+        gpus = []
+        processes = []
+        live_pids = set()
+        try:
+            for h, static in zip(self._handles, self._static):
+                gpus.append(
+                    {
+                        **static,
+                        "temperature_C": nvml.nvmlDeviceGetTemperature(
+                            h, nvml.NVML_TEMPERATURE_GPU
+                        ),
+                        "power_usage_W": nvml.nvmlDeviceGetPowerUsage(h) / 1000,
+                        "power_cap_W": nvml.nvmlDeviceGetEnforcedPowerLimit(h) / 1000,
+                        "memory_used_MiB": nvml.nvmlDeviceGetMemoryInfo(h).used >> 20,
+                        "util_percent": nvml.nvmlDeviceGetUtilizationRates(h).gpu,
+                    }
+                )
+                for ptype, query in (
+                    ("C", nvml.nvmlDeviceGetComputeRunningProcesses),
+                    ("G", nvml.nvmlDeviceGetGraphicsRunningProcesses),
+                ):
+                    for p in query(h):
+                        live_pids.add(p.pid)
+                        processes.append(
+                            {
+                                "gpu": static["index"],
+                                "pid": p.pid,
+                                "type": ptype,
+                                "process_name": self._process_name(p.pid),
+                                "gpu_memory_MiB": (p.usedGpuMemory or 0) >> 20,
+                            }
+                        )
+        except nvml.NVMLError:
+            return None
+
+        # Forget names of exited processes so reused pids get looked up again.
+        for pid in self._proc_names.keys() - live_pids:
+            del self._proc_names[pid]
+
+        return {
+            "driver_version": self.driver_version,
+            "cuda_version": self.cuda_version,
+            "gpus": gpus,
+            "processes": processes,
+        }
+
+    def _process_name(self, pid: int) -> str:
+        name = self._proc_names.get(pid)
+        if name is None:
+            try:
+                name = _text(self._nvml.nvmlSystemGetProcessName(pid))
+            except self._nvml.NVMLError:
+                name = "N/A"
+            self._proc_names[pid] = name
+        return name
+
+    def close(self) -> None:
+        try:
+            self._nvml.nvmlShutdown()
+        except self._nvml.NVMLError:
+            pass
+
+
+class SmiStreamSampler:
+    """Keep one ``nvidia-smi --loop-ms`` child alive and stream its frames.
+
+    A daemon thread parses each frame as it arrives; :meth:`sample` never
+    blocks and returns the newest frame it has not returned before, or
+    ``None`` if no new frame arrived since the previous call. The child is
+    restarted if it exits, or if it has not produced a frame for
+    ``stale_after`` seconds (default: five periods, at least 5 s), which
+    covers a hung ``nvidia-smi`` as well as a dead reader thread.
+    """
+
+    live = True
+
+    def __init__(
+        self, loop_ms: int = 1000, cmd: str = "nvidia-smi", stale_after: float | None = None
+    ) -> None:
+        self.args = [cmd, f"--loop-ms={loop_ms}"]
+        self.stale_after = stale_after if stale_after is not None else max(5 * loop_ms / 1000, 5.0)
+        self._lock = threading.Lock()
+        self._latest: dict | None = None
+        self._seq = 0  # frames received so far
+        self._returned = 0  # sequence number of the last frame returned
+        self._received = 0.0  # monotonic time of the last frame (or of the start)
+        self._proc: subprocess.Popen | None = None
+        self._closed = False
+        self._start()
+
+    def _start(self) -> None:
+        proc = subprocess.Popen(
+            self.args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1,
+        )
+        with self._lock:
+            self._proc = proc
+            self._received = time.monotonic()
+        threading.Thread(target=self._read, args=(proc,), daemon=True).start()
+
+    def _read(self, proc: subprocess.Popen) -> None:
+        for frame in iter_frames(proc.stdout):
+            with self._lock:
+                if proc is not self._proc:
+                    return  # replaced by a restart
+                self._latest = frame
+                self._seq += 1
+                self._received = time.monotonic()
+
+    def _stop(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.wait()
+
+    def sample(self) -> dict | None:
+        if self._closed:
+            return None
+        with self._lock:
+            frame, seq, age = self._latest, self._seq, time.monotonic() - self._received
+        if self._proc.poll() is not None or age > self.stale_after:
+            self._stop()
+            self._start()
+        if age > self.stale_after or seq == self._returned:
+            return None
+        self._returned = seq
+        return frame
+
+    def close(self) -> None:
+        self._closed = True
+        self._stop()
+
+
+class ReplaySampler:
+    """Replay recorded ``nvidia-smi`` output one frame per :meth:`sample`.
+
+    ``source`` is either the captured text itself or a path to a file, e.g.
+    one written with ``nvidia-smi --loop-ms=1000 > capture.txt``. Frames are
+    replayed in order; with ``loop=True`` replay wraps around, otherwise
+    :meth:`sample` returns ``None`` once the recording is exhausted. The
+    recorded pids are not this machine's, so ``live`` is false.
+    """
+
+    live = False
+
+    def __init__(self, source: str | Path, loop: bool = True) -> None:
+        if isinstance(source, Path) or "\n" not in source:
+            source = Path(source).read_text()
+        self.frames = list(iter_frames(source.splitlines()))
+        if not self.frames:
+            raise ValueError("No complete nvidia-smi frames found in recording.")
+        self.loop = loop
+        self._pos = 0
+
+    def sample(self) -> dict | None:
+        if self._pos >= len(self.frames):
+            if not self.loop:
+                return None
+            self._pos = 0
+        frame = self.frames[self._pos]
+        self._pos += 1
+        return frame
+
+    def close(self) -> None:
+        pass
+
+
+def make_sampler(backend: str = "auto") -> GpuSampler:
+    """Create a sampler for ``backend`` (``auto``, ``nvml``, ``smi`` or a replay path).
+
+    ``auto`` prefers NVML and falls back to a streaming ``nvidia-smi`` child
+    when the bindings or the driver library are unavailable.
+    """
+    if backend == "nvml":
+        return NvmlSampler()
+    if backend == "smi":
+        return SmiStreamSampler()
+    if backend == "auto":
+        try:
+            return NvmlSampler()
+        except (ImportError, RuntimeError):
+            return SmiStreamSampler()
+    if not Path(backend).is_file():
+        raise ValueError(
+            f"Unknown GPU backend {backend!r}: expected auto, nvml, smi or a recorded capture file"
+        )
+    return ReplaySampler(Path(backend))
+
+
+def _text(value: str | bytes) -> str:
+    return value.decode() if isinstance(value, bytes) else value
@@ -0,0 +1,165 @@
+"""Attribute GPU processes to users.
+
+GPU samplers report the pid and GPU memory of every process on a GPU (see
+:mod:`mysmtp.top.gpu_sampler`), but not who owns it. :class:`PidOwners`
+maps pids to uids from ``/proc`` and keeps the answer for as long as the
+same process holds the pid on a GPU, so a steady tick touches ``/proc``
+only for new processes and for the periodic start time checks. :class:`GpuUserSampler` sums each tick's processes per
+user into memory and GPU-seconds.
+
+The driver reports pids as the host sees them. Inside a container (a
+nested pid namespace) those numbers name unrelated local processes, if
+any, so processes are left unattributed there.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+
+def host_pid_namespace(proc_root: str = "/proc") -> bool:
+    """Whether this process sees host pids (is not in a nested pid namespace).
+
+    ``NSpid`` in ``/proc/self/status`` lists the pid in every namespace from
+    the host down; a single entry means there is no nesting. Kernels older
+    than 4.1 lack the field and are assumed not to be containerized.
+    """
+    try:
+        with open(f"{proc_root}/self/status") as f:
+            for line in f:
+                if line.startswith("NSpid:"):
+                    return len(line.split()) == 2
+    except OSError:
+        pass
+    return True
+
+
+class PidOwners:
+    """Cached ``pid -> uid`` lookups for GPU processes.
+
+    :meth:`lookup` stats ``/proc/<pid>`` only for pids it did not return on
+    the previous call, and forgets pids that are gone. Every ``recheck``
+    seconds a cached pid is checked against its start time (field 22 of
+    ``/proc/<pid>/stat``, one small read), so a pid reused by another
+    process, even between two ticks, is looked up again within that time.
+    Entries older than ``revalidate`` seconds are re-read as well, for a
+    process that changed uid. Processes that cannot be read (already
+    exited) map to ``None`` until they disappear.
+    """
+
+    def __init__(
+        self, proc_root: str = "/proc", recheck: float = 5.0, revalidate: float = 60.0
+    ) -> None:
+        self.proc_root = proc_root
+        self.recheck = recheck
+        self.revalidate = revalidate
+        # pid -> (uid, starttime, read at, start time checked at)
+        self._cache: dict[int, tuple[int | None, int | None, float, float]] = {}
+        self.reads = 0  # uid lookups so far
+        self.checks = 0  # start time reads so far
+
+    def _starttime(self, pid: int) -> int | None:
+        self.checks += 1
+        try:
+            with open(f"{self.proc_root}/{pid}/stat", "rb") as f:
+                stat = f.read()
+            # the command name (field 2) may hold spaces and parentheses
+            return int(stat[stat.rindex(b")") + 2 :].split()[19])
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _read(self, pid: int) -> tuple[int | None, int | None]:
+        self.reads += 1
+        start = self._starttime(pid)
+        try:
+            return os.stat(f"{self.proc_root}/{pid}").st_uid, start
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            return None, start
+
+    def lookup(self, pids: Iterable[int]) -> dict[int, int | None]:
+        """Owner of every pid in ``pids``."""
+        now = time.monotonic()
+        cache = self._cache
+        seen: dict[int, int | None] = {}
+        for pid in pids:
+            if pid in seen:
+                continue
+            hit = cache.get(pid)
+            if hit is not None and now - hit[2] > self.revalidate:
+                hit = None
+            elif hit is not None and now - hit[3] >= self.recheck:
+                if self._starttime(pid) != hit[1]:
+                    hit = None  # the pid now names another process
+                else:
+                    hit = cache[pid] = (*hit[:3], now)
+            if hit is None:
+                hit = cache[pid] = (*self._read(pid), now, now)
+            seen[pid] = hit[0]
+        for pid in cache.keys() - seen.keys():
+            del cache[pid]
+        return seen
+
+
+@dataclass
+class GpuUserUsage:
+    uid: int | None  # None: owner unknown
+    processes: int = 0
+    gpus: int = 0  # distinct GPUs with at least one of the user's processes
+    gpu_memory_MiB: int = 0
+    gpu_seconds: float = 0.0  # gpus x seconds since the previous tick
+
+
+@dataclass
+class GpuUserSample:
+    elapsed: float  # seconds credited to this tick (0.0 on the first)
+    owners: dict[int, int | None]  # pid -> uid
+    users: dict[int | None, GpuUserUsage]
+
+
+class GpuUserSampler:
+    """Per-user GPU memory and GPU-seconds from successive process lists.
+
+    :meth:`sample` takes the ``processes`` of one sampler frame. A user
+    holding any process on a GPU is credited the time since the previous
+    call on that GPU; gaps longer than ``max_elapsed`` (a stalled scheduler)
+    are capped so one late tick does not book minutes at once.
+
+    Pass ``live=False`` for frames that do not describe processes running
+    on this machine now (a replayed capture). Their processes, like all
+    processes seen from inside a container, are booked to ``uid=None``.
+    """
+
+    def __init__(self, proc_root: str = "/proc", max_elapsed: float = 10.0) -> None:
+        self.owners = PidOwners(proc_root)
+        self.max_elapsed = max_elapsed
+        self.attribute = host_pid_namespace(proc_root)
+        self._prev_time: float | None = None
+
+    def sample(self, processes: Iterable[Mapping], live: bool = True) -> GpuUserSample:
+        now = time.monotonic()
+        elapsed = 0.0 if self._prev_time is None else min(now - self._prev_time, self.max_elapsed)
+        self._prev_time = now
+
+        processes = list(processes)
+        if live and self.attribute:
+            owners = self.owners.lookup(p["pid"] for p in processes)
+        else:
+            owners = {p["pid"]: None for p in processes}
+        users: dict[int | None, GpuUserUsage] = {}
+        gpus: dict[int | None, set] = {}
+        for p in processes:
+            uid = owners[p["pid"]]
+            u = users.get(uid)
+            if u is None:
+                u = users[uid] = GpuUserUsage(uid)
+                gpus[uid] = set()
+            u.processes += 1
+            u.gpu_memory_MiB += p.get("gpu_memory_MiB") or 0
+            gpus[uid].add(p.get("gpu"))
+        for uid, u in users.items():
+            u.gpus = len(gpus[uid])
+            u.gpu_seconds = u.gpus * elapsed
+        return GpuUserSample(elapsed, owners, users)
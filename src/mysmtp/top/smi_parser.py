@@ -0,0 +1,164 @@
+"""Single-pass, incremental parser for the ``nvidia-smi`` text table.
+
+Patterns are compiled once at import. :class:`SmiParser` is a small state
+machine fed one line at a time, so the same code parses a captured string,
+a file, or the stdout of a running ``nvidia-smi --loop-ms`` child frame by
+frame. The output matches :func:`mysmtp.top.gpu.parse_nvidia_smi`.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator
+
+HEADER_RE = re.compile(r"NVIDIA-SMI\s+([\d\.]+).*CUDA Version:\s+([\d\.]+)")
+GPU_INFO_RE = re.compile(r"\|\s*(\d+)\s+(.+?)\s+\S+\s*\|\s*([0-9A-Fa-f:.]+)\s+(\S+)\s*\|")
+# Fan is "NN%" or "N/A" (passively cooled cards); power may be "N/A" too.
+GPU_METRICS_RE = re.compile(
+    r"\|\s*(?:\d+%|N/A)\s+(\d+)C.*?(\d+|N/A)W?\s*/\s*(\d+|N/A)W?\s*\|"
+    r"\s*(\d+)MiB\s*/\s*(\d+)MiB\s*\|\s*(\d+)%"
+)
+
+# Parser states, in the order they appear in a frame.
+_HEADER, _GPUS, _PROC_HEAD, _PROCS = range(4)
+
+
+def _maybe_int(value: str) -> int | None:
+    return None if value == "N/A" else int(value)
+
+
+def parse_process_row(line: str) -> dict | None:
+    """Parse one row of the process table, or return ``None`` if it is not one.
+
+    There can be hundreds of rows per frame, so they are split on whitespace
+    instead of matched with a regex. The process name keeps its inner spacing.
+    """
+    fields = line[1:].split(None, 5)
+    if len(fields) < 6 or not fields[0].isdigit() or not fields[3].isdigit():
+        return None
+    tail = fields[5].rsplit(None, 2)
+    if len(tail) != 3 or not tail[1].endswith("MiB"):
+        return None
+    name, mem, _ = tail
+    return {
+        "gpu": int(fields[0]),
+        "pid": int(fields[3]),
+        "type": fields[4],  # C = compute, G = graphics
+        "process_name": name,
+        "gpu_memory_MiB": int(mem[:-3]),
+    }
+
+
+class SmiParser:
+    """Incrementally parse ``nvidia-smi`` output.
+
+    Call :meth:`feed` with each line; it returns the parsed frame once the
+    closing border of the process table has been seen and ``None`` before
+    that. The parser then resets itself for the next frame.
+    """
+
+    __slots__ = ("_state", "_result", "_gpu")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._state = _HEADER
+        self._gpu: dict | None = None
+        self._result = {
+            "driver_version": None,
+            "cuda_version": None,
+            "gpus": [],
+            "processes": [],
+        }
+
+    def feed(self, line: str) -> dict | None:
+        state = self._state
+
+        if state == _GPUS:
+            if line.startswith("| Processes:"):
+                self._state = _PROC_HEAD
+            elif line.startswith("|"):
+                self._feed_gpu(line)
+            return None
+
+        if state == _PROCS:
+            if line.startswith("+"):
+                return self.finish()
+            proc = parse_process_row(line)
+            if proc is not None:
+                self._result["processes"].append(proc)
+            return None
+
+        if state == _HEADER:
+            if line.startswith("|="):
+                self._state = _GPUS
+            elif "NVIDIA-SMI" in line:
+                m = HEADER_RE.search(line)
+                if m:
+                    self._result["driver_version"] = m.group(1)
+                    self._result["cuda_version"] = m.group(2)
+            return None
+
+        # _PROC_HEAD: skip the column titles up to the "|===" rule
+        if line.startswith("|="):
+            self._state = _PROCS
+        return None
+
+    def _feed_gpu(self, line: str) -> None:
+        gpu = self._gpu
+        if gpu is None:
+            m = GPU_INFO_RE.match(line)
+            if m:
+                self._gpu = {
+                    "index": int(m.group(1)),
+                    "name": m.group(2).strip(),
+                    "bus_id": m.group(3),
+                    "temperature_C": None,
+                    "power_usage_W": None,
+                    "power_cap_W": None,
+                    "memory_used_MiB": None,
+                    "memory_total_MiB": None,
+                    "util_percent": None,
+                }
+            return
+
+        m = GPU_METRICS_RE.match(line)
+        if m:
+            gpu["temperature_C"] = int(m.group(1))
+            gpu["power_usage_W"] = _maybe_int(m.group(2))
+            gpu["power_cap_W"] = _maybe_int(m.group(3))
+            gpu["memory_used_MiB"] = int(m.group(4))
+            gpu["memory_total_MiB"] = int(m.group(5))
+            gpu["util_percent"] = int(m.group(6))
+            self._result["gpus"].append(gpu)
+            self._gpu = None
+
+    def finish(self) -> dict:
+        """Return whatever has been parsed so far and reset for the next frame."""
+        result = self._result
+        self.reset()
+        return result
+
+    def parse(self, lines: Iterable[str]) -> dict:
+        """Parse the first frame in ``lines`` (or everything, if it is truncated)."""
+        for line in lines:
+            frame = self.feed(line)
+            if frame is not None:
+                return frame
+        return self.finish()
+
+    def frames(self, lines: Iterable[str]) -> Iterator[dict]:
+        """Yield every complete frame in ``lines``, e.g. a streaming stdout."""
+        for line in lines:
+            frame = self.feed(line)
+            if frame is not None:
+                yield frame
+
+
+def parse_lines(lines: Iterable[str]) -> dict:
+    return SmiParser().parse(lines)
+
+
+def iter_frames(lines: Iterable[str]) -> Iterator[dict]:
+    return SmiParser().frames(lines)
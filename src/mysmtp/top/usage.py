@@ -1,6 +1,129 @@
 import os
 import pwd
 import time
+from dataclasses import dataclass
+from typing import Iterator, NamedTuple
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+class ProcStat(NamedTuple):
+    pid: int
+    uid: int
+    ticks: int  # utime + stime
+    starttime: int  # clock ticks after boot; disambiguates reused pids
+    rss_bytes: int
+
+
+@dataclass
+class UserUsage:
+    uid: int
+    processes: int = 0
+    cpu_ticks: int = 0
+    rss_bytes: int = 0
+    cpu_percent: float = 0.0  # only filled in by UserCpuSampler
+
+
+def iter_proc_stats(proc_root: str = "/proc") -> Iterator[ProcStat]:
+    """Walk ``/proc`` once, reading only ``/proc/<pid>/stat`` per process.
+
+    The owner comes from ``stat()`` on the ``/proc/<pid>`` directory (the
+    effective UID), so ``status`` is never opened. Processes that exit
+    mid-scan are skipped.
+    """
+    with os.scandir(proc_root) as it:
+        for entry in it:
+            if not entry.name.isdigit():
+                continue
+            try:
+                uid = entry.stat().st_uid
+                with open(f"{entry.path}/stat", "rb") as f:
+                    data = f.read()
+            except (FileNotFoundError, ProcessLookupError, PermissionError):
+                continue
+            # comm (field 2) may contain spaces and parentheses; fields after
+            # the last ")" start at field 3.
+            fields = data[data.rindex(b")") + 2 :].split()
+            yield ProcStat(
+                int(entry.name),
+                uid,
+                int(fields[11]) + int(fields[12]),
+                int(fields[19]),
+                int(fields[21]) * PAGE_SIZE,
+            )
+
+
+def _add_proc(users: dict[int, UserUsage], p: ProcStat) -> UserUsage:
+    u = users.get(p.uid)
+    if u is None:
+        u = users[p.uid] = UserUsage(p.uid)
+    u.processes += 1
+    u.cpu_ticks += p.ticks
+    u.rss_bytes += p.rss_bytes
+    return u
+
+
+def user_snapshot(proc_root: str = "/proc") -> dict[int, UserUsage]:
+    """Return process count, CPU ticks and RSS for every UID in one scan."""
+    users: dict[int, UserUsage] = {}
+    for p in iter_proc_stats(proc_root):
+        _add_proc(users, p)
+    return users
+
+
+@dataclass
+class CpuSample:
+    elapsed: float  # seconds since the previous sample (0.0 on the first)
+    users: dict[int, UserUsage]
+    processes: dict[int, float]  # pid -> CPU%
+
+
+class UserCpuSampler:
+    """Per-user and per-process CPU% as deltas between successive scans.
+
+    :meth:`sample` never sleeps: it compares the CPU ticks of each process
+    with the previous call. Processes are keyed by ``(pid, starttime)`` so a
+    reused pid is treated as a new process rather than producing a bogus
+    (possibly negative) delta. 100% is one fully used core, as in ``top``.
+    """
+
+    def __init__(self, proc_root: str = "/proc") -> None:
+        self.proc_root = proc_root
+        self._prev: dict[tuple[int, int], int] = {}
+        self._prev_time: float | None = None
+        self._prev_boot_ticks = 0.0
+
+    def sample(self) -> CpuSample:
+        now = time.monotonic()
+        boot_ticks = time.clock_gettime(time.CLOCK_BOOTTIME) * CLK_TCK
+        first = self._prev_time is None
+        elapsed = 0.0 if first else now - self._prev_time
+        scale = 100.0 / (CLK_TCK * elapsed) if elapsed > 0 else 0.0
+
+        prev = self._prev
+        current: dict[tuple[int, int], int] = {}
+        users: dict[int, UserUsage] = {}
+        processes: dict[int, float] = {}
+        for p in iter_proc_stats(self.proc_root):
+            key = (p.pid, p.starttime)
+            current[key] = p.ticks
+            before = prev.get(key)
+            if before is not None:
+                delta = p.ticks - before
+            elif not first and p.starttime >= self._prev_boot_ticks:
+                delta = p.ticks  # started since the last sample
+            else:
+                delta = 0
+            pct = delta * scale
+            processes[p.pid] = pct
+            _add_proc(users, p).cpu_percent += pct
+
+        self._prev = current
+        self._prev_time = now
+        self._prev_boot_ticks = boot_ticks
+        return CpuSample(elapsed, users, processes)
+
 
 def list_pids():
     return [int(p) for p in os.listdir("/proc") if p.isdigit()]
@@ -29,61 +152,124 @@ def get_cpu_ticks(pid: int) -> int | None:
         return None
 
 def count_user_processes(uid: int) -> int:
-    count = 0
-    for pid in list_pids():
-        p_uid = get_uid(pid)
-        if p_uid == uid:
-            count += 1
-    return count
+    usage = user_snapshot().get(uid)
+    return usage.processes if usage else 0
 
 def user_is_active(uid: int) -> bool:
     return count_user_processes(uid) > 0
 
 def user_cpu_usage(uid: int) -> int:
-    total = 0
-    for pid in list_pids():
-        p_uid = get_uid(pid)
-        if p_uid == uid:
-            ticks = get_cpu_ticks(pid)
-            if ticks is not None:
-                total += ticks
-    return total
+    usage = user_snapshot().get(uid)
+    return usage.cpu_ticks if usage else 0
+
+
+NOLOGIN_SHELLS = frozenset(
+    ("/usr/sbin/nologin", "/usr/bin/nologin", "/sbin/nologin", "/bin/false", "/usr/bin/false", "")
+)
+
+
+def has_login_shell(entry: pwd.struct_passwd) -> bool:
+    """Whether ``entry`` can log in, i.e. its shell is not in :data:`NOLOGIN_SHELLS`."""
+    return entry.pw_shell not in NOLOGIN_SHELLS
+
+
+class UserDirectory:
+    """Cache of passwd lookups with TTL-based refresh.
+
+    On LDAP/SSSD nodes every ``getpwuid`` may be a network round trip, and
+    ``getpwall`` enumerates the whole directory. Entries are kept for ``ttl``
+    seconds; UIDs that do not resolve are remembered for ``negative_ttl``
+    seconds so a process owned by an unknown UID does not hit NSS every tick.
+    """
+
+    def __init__(self, ttl: float = 600.0, negative_ttl: float = 60.0) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: dict[int, tuple[float, pwd.struct_passwd | None]] = {}
+        self._all: tuple[float, list[pwd.struct_passwd]] | None = None
+
+    def get(self, uid: int) -> pwd.struct_passwd | None:
+        now = time.monotonic()
+        cached = self._entries.get(uid)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        try:
+            entry = pwd.getpwuid(uid)
+        except KeyError:
+            self._entries[uid] = (now + self.negative_ttl, None)
+            return None
+        self._entries[uid] = (now + self.ttl, entry)
+        return entry
+
+    def resolve(self, uids) -> dict[int, str]:
+        """Map many UIDs to names at once, e.g. the keys of :func:`user_snapshot`.
+
+        Unknown UIDs map to their number as a string.
+        """
+        names = {}
+        for uid in uids:
+            entry = self.get(uid)
+            names[uid] = entry.pw_name if entry else str(uid)
+        return names
+
+    def all(self) -> list[pwd.struct_passwd]:
+        """Return ``getpwall()``, enumerating the directory at most once per TTL."""
+        now = time.monotonic()
+        if self._all is None or self._all[0] <= now:
+            entries = pwd.getpwall()
+            expires = now + self.ttl
+            self._all = (expires, entries)
+            for entry in entries:
+                self._entries[entry.pw_uid] = (expires, entry)
+        return self._all[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._all = None
+
+
+_directory: UserDirectory | None = None
+
+
+def user_directory() -> UserDirectory:
+    """Return the process-wide :class:`UserDirectory`."""
+    global _directory
+    if _directory is None:
+        _directory = UserDirectory()
+    return _directory
 
 
 def username_from_uid(uid: int) -> str:
-    return pwd.getpwuid(uid).pw_name
+    entry = user_directory().get(uid)
+    if entry is None:
+        raise KeyError(f"getpwuid(): uid not found: {uid}")
+    return entry.pw_name
 
 def is_human_uid(uid: int) -> bool:
     return uid >= 1000
 
 def is_human_user_ldap(uid: int) -> bool:
-    try:
-        entry = pwd.getpwuid(uid)
-    except KeyError:
-        return False
-
-    shell = entry.pw_shell
-    return shell not in ("/usr/sbin/nologin", "/usr/bin/nologin", "/bin/false")
+    entry = user_directory().get(uid)
+    return entry is not None and has_login_shell(entry)
 
 def list_human_users():
     human = []
-    for entry in pwd.getpwall():
+    for entry in user_directory().all():
         uid = entry.pw_uid
-        shell = entry.pw_shell
 
         # filter out system accounts
-        if uid < 1000:
+        if not is_human_uid(uid):
             continue
 
         # filter out non-login shells
-        if shell in ("/usr/sbin/nologin", "/usr/bin/nologin", "/bin/false", ""):
+        if not has_login_shell(entry):
             continue
 
         human.append({
             "uid": uid,
             "username": entry.pw_name,
             "home": entry.pw_dir,
-            "shell": shell
+            "shell": entry.pw_shell
         })
     return human
 
@@ -94,27 +280,119 @@ def read_cpu_times():
         fields = f.readline().split()[1:]
         return list(map(int, fields))
 
-num_cores = os.cpu_count()
-# cpu_usage = min(cpu_usage / num_cores, 100.0)
+def read_cpu_times_all(path: str = "/proc/stat") -> dict[str, list[int]]:
+    """Read the aggregate ``cpu`` line and every ``cpuN`` line in one pass.
+
+    Each value holds the first eight fields: user, nice, system, idle,
+    iowait, irq, softirq and steal (guest time is already part of user).
+    """
+    times = {}
+    with open(path) as f:
+        for line in f:
+            if not line.startswith("cpu"):
+                break
+            name, *fields = line.split()
+            times[name] = [int(x) for x in fields[:8]]
+    return times
+
+
+@dataclass
+class CpuUtil:
+    busy: float
+    user: float  # user + nice
+    system: float  # system + irq + softirq
+    iowait: float
+    steal: float
+    idle: float
+
+
+@dataclass
+class CpuSnapshot:
+    time: float  # time.monotonic() when the snapshot was taken
+    elapsed: float  # seconds covered by the deltas
+    total: CpuUtil
+    cores: list[CpuUtil]
+
+
+def cpu_util(t1: list[int], t2: list[int]) -> CpuUtil:
+    """Percentages of each state between two :func:`read_cpu_times_all` rows."""
+    d = [b - a for a, b in zip(t1, t2)]
+    d += [0] * (8 - len(d))
+    user, nice, system, idle, iowait, irq, softirq, steal = d
+    total = sum(d)
+    if total <= 0:
+        return CpuUtil(0.0, 0.0, 0.0, 0.0, 0.0, 100.0)
+    pct = 100.0 / total
+    return CpuUtil(
+        busy=(total - idle - iowait) * pct,
+        user=(user + nice) * pct,
+        system=(system + irq + softirq) * pct,
+        iowait=iowait * pct,
+        steal=steal * pct,
+        idle=idle * pct,
+    )
+
+
+class SystemCpuSampler:
+    """Aggregate and per-core CPU utilization as deltas between snapshots.
+
+    :meth:`sample` never sleeps. Calls within ``max_age`` seconds of the last
+    snapshot return that same snapshot, so several consumers in one tick
+    share a single read of ``/proc/stat`` (see :func:`shared_cpu_sampler`).
+    """
+
+    def __init__(self, path: str = "/proc/stat", max_age: float = 0.5) -> None:
+        self.path = path
+        self.max_age = max_age
+        self._prev = read_cpu_times_all(path)
+        self._prev_time = time.monotonic()
+        self._last: CpuSnapshot | None = None
+
+    def sample(self) -> CpuSnapshot:
+        now = time.monotonic()
+        if self._last is not None and now - self._last.time < self.max_age:
+            return self._last
+
+        cur = read_cpu_times_all(self.path)
+        prev = self._prev
+        cores = []
+        n = 0
+        while f"cpu{n}" in cur:
+            key = f"cpu{n}"
+            cores.append(cpu_util(prev.get(key, cur[key]), cur[key]))
+            n += 1
+
+        self._last = CpuSnapshot(
+            now, now - self._prev_time, cpu_util(prev["cpu"], cur["cpu"]), cores
+        )
+        self._prev = cur
+        self._prev_time = now
+        return self._last
 
-def cpu_percent(interval=1.0):
-    t1 = read_cpu_times()
-    time.sleep(interval)
-    t2 = read_cpu_times()
 
-    idle1 = t1[3] + t1[4]
-    idle2 = t2[3] + t2[4]
+_shared_cpu: SystemCpuSampler | None = None
 
-    non_idle1 = sum(t1[:3] + t1[5:8])
-    non_idle2 = sum(t2[:3] + t2[5:8])
 
-    total1 = idle1 + non_idle1
-    total2 = idle2 + non_idle2
+def shared_cpu_sampler() -> SystemCpuSampler:
+    """Return the process-wide :class:`SystemCpuSampler`."""
+    global _shared_cpu
+    if _shared_cpu is None:
+        _shared_cpu = SystemCpuSampler()
+    return _shared_cpu
 
-    totald = total2 - total1
-    idled = idle2 - idle1
-    nonidled = non_idle2 - non_idle1
 
-    cpu_usage = (nonidled / totald) * 100.0
-    return cpu_usage
+def cpu_percent(interval: float | None = 1.0) -> float:
+    """System-wide busy CPU percentage.
 
+    By default this blocks for ``interval`` seconds and measures across
+    them. With ``interval=None`` it returns immediately with the busy share
+    since the previous snapshot of :func:`shared_cpu_sampler`. The first
+    such call in a process only covers the instant since that sampler was
+    created (usually 0.0), so prime it once and read it on later ticks.
+    """
+    if interval:
+        t1 = read_cpu_times_all()["cpu"]
+        time.sleep(interval)
+        t2 = read_cpu_times_all()["cpu"]
+        return cpu_util(t1, t2).busy
+    return shared_cpu_sampler().sample().total.busy
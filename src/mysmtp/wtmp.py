@@ -0,0 +1,255 @@
+"""Login sessions read directly from ``wtmp``.
+
+``wtmp`` is an append-only file of fixed-size ``struct utmp`` records
+(384 bytes on Linux/glibc). :class:`WtmpReader` views them in place
+through a NumPy structured dtype over an :mod:`mmap` of the file, keeps
+only login-related records, and pairs logins with their logouts the way
+``last`` does:
+
+* a ``USER_PROCESS`` record opens a session on its terminal line;
+* a later ``DEAD_PROCESS`` or login on the same line closes it;
+* a reboot (``BOOT_TIME``) or shutdown (``RUN_LVL`` by ``shutdown``)
+  closes every open session at that time.
+
+The reader remembers its byte offset and the sessions still open, so each
+:meth:`WtmpReader.read` only decodes records appended since the previous
+call. Passing ``state_path`` keeps that state across runs. When ``wtmp``
+is rotated, the rest of the old file is read from ``wtmp.1`` first. Times
+are naive local datetimes, like the output of ``last``.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+WTMP = "/var/log/wtmp"
+
+# struct utmp (glibc, 32-bit time fields): type, pid, line, id, user, host,
+# exit status, session, tv_sec, tv_usec, addr_v6, reserved
+RECORD = struct.Struct("<hxxi32s4s32s256shhiii16s20s")
+RECORD_DTYPE = np.dtype(
+    {
+        "names": ["type", "pid", "line", "user", "host", "sec", "usec"],
+        "formats": ["<i2", "<i4", "S32", "S32", "S256", "<i4", "<i4"],
+        "offsets": [0, 4, 8, 44, 76, 340, 344],
+        "itemsize": RECORD.size,
+    }
+)
+
+# ut_type values
+EMPTY = 0
+RUN_LVL = 1
+BOOT_TIME = 2
+NEW_TIME = 3
+OLD_TIME = 4
+INIT_PROCESS = 5
+LOGIN_PROCESS = 6
+USER_PROCESS = 7
+DEAD_PROCESS = 8
+
+
+class Record(NamedTuple):
+    type: int
+    pid: int
+    line: str
+    user: str
+    host: str
+    time: float  # seconds since the epoch
+
+
+@dataclass
+class Session:
+    user: str
+    line: str
+    host: str
+    start: datetime
+    end: datetime | None = None  # None while still logged in
+    pid: int = 0
+
+
+def pack_record(type: int, line: str = "", user: str = "", host: str = "", time: float = 0.0,
+                pid: int = 0, id: str = "") -> bytes:
+    """Encode one ``struct utmp`` record, e.g. for a synthetic ``wtmp``."""
+    sec = int(time)
+    return RECORD.pack(
+        type, pid, line.encode(), id.encode(), user.encode(), host.encode(),
+        0, 0, 0, sec, int(round((time - sec) * 1e6)), b"", b"",
+    )
+
+
+def records_end(size: int, offset: int = 0) -> int:
+    """Offset just past the last complete record of a ``size``-byte file."""
+    return offset + (size - offset) // RECORD.size * RECORD.size
+
+
+def load_records(path: str | Path, offset: int = 0, size: int | None = None) -> np.ndarray:
+    """Login-relevant records of ``path`` between byte ``offset`` and ``size``.
+
+    The complete records are viewed through :data:`RECORD_DTYPE` (a
+    partially written one at the end is left for the next read) and only
+    logins, logouts, boots and run-level changes are copied out.
+    """
+    with open(path, "rb") as fh:
+        if size is None:
+            size = os.fstat(fh.fileno()).st_size
+        count = (records_end(size, offset) - offset) // RECORD.size
+        if count <= 0:
+            return np.empty(0, RECORD_DTYPE)
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            recs = np.frombuffer(mm, RECORD_DTYPE, count, offset)
+            out = recs[np.isin(recs["type"], (USER_PROCESS, DEAD_PROCESS, BOOT_TIME, RUN_LVL))]
+            del recs  # release the buffer before the map closes
+    return out
+
+
+def iter_records(path: str | Path, offset: int = 0, size: int | None = None) -> Iterator[Record]:
+    """Decode the login-relevant records of ``path`` (see :func:`load_records`)."""
+    recs = load_records(path, offset, size)
+    for kind, pid, line, user, host, sec, usec in zip(
+        *(recs[f].tolist() for f in ("type", "pid", "line", "user", "host", "sec", "usec"))
+    ):
+        yield Record(kind, pid, line.decode("utf-8", "replace"), user.decode("utf-8", "replace"),
+                     host.decode("utf-8", "replace"), sec + usec / 1e6)
+
+
+class WtmpReader:
+    """Incremental login/logout pairing over a ``wtmp`` file."""
+
+    def __init__(self, path: str | Path = WTMP, state_path: str | Path | None = None) -> None:
+        self.path = Path(path)
+        self.state_path = Path(state_path) if state_path is not None else None
+        self.inode: int | None = None
+        self.offset = 0
+        self.open: dict[str, Session] = {}  # by terminal line
+        if self.state_path is not None:
+            self._load_state()
+
+    # --------------------
+    # STATE
+    # --------------------
+    def get_state(self) -> dict:
+        """JSON-serializable position and open sessions, see :meth:`set_state`."""
+        return {
+            "path": str(self.path),
+            "inode": self.inode,
+            "offset": self.offset,
+            "open": [{**asdict(s), "start": s.start.isoformat()} for s in self.open.values()],
+        }
+
+    def set_state(self, state: dict) -> None:
+        """Continue from a :meth:`get_state` snapshot (ignored for another file)."""
+        if state.get("path") != str(self.path):
+            return
+        self.inode, self.offset = state["inode"], state["offset"]
+        self.open = {
+            s["line"]: Session(**{**s, "start": datetime.fromisoformat(s["start"])}) for s in state["open"]
+        }
+
+    def _load_state(self) -> None:
+        try:
+            self.set_state(json.loads(self.state_path.read_text()))
+        except (OSError, ValueError):
+            return
+
+    def _save_state(self) -> None:
+        if self.state_path is None:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.get_state()))
+        os.replace(tmp, self.state_path)
+
+    # --------------------
+    # READ
+    # --------------------
+    def read(self) -> list[Session]:
+        """Sessions that ended in records appended since the last read."""
+        closed: list[Session] = []
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return closed
+
+        if self.inode is not None and st.st_ino != self.inode:
+            # rotated: finish the old file if it is still around as wtmp.1
+            old = self.path.with_name(self.path.name + ".1")
+            if old.exists() and old.stat().st_ino == self.inode:
+                self._consume(old, old.stat().st_size, closed)
+            self.offset = 0
+        elif st.st_size < self.offset:
+            self.offset = 0  # truncated in place
+        self.inode = st.st_ino
+        self._consume(self.path, st.st_size, closed)
+        self._save_state()
+        return closed
+
+    def _consume(self, path: Path, size: int, closed: list[Session]) -> None:
+        recs = load_records(path, self.offset, size)
+        self.offset = records_end(size, self.offset)
+        if not len(recs):
+            return
+        when = recs["sec"] + recs["usec"] / 1e6
+        opened = self.open
+        # compare raw bytes; decode only the fields of sessions that open
+        for i, (kind, line, user) in enumerate(
+            zip(recs["type"].tolist(), recs["line"].tolist(), recs["user"].tolist())
+        ):
+            if kind == USER_PROCESS and user:
+                line = line.decode("utf-8", "replace")
+                prev = opened.pop(line, None)
+                start = datetime.fromtimestamp(when[i])
+                if prev is not None:  # a new login on the same line ends the old one
+                    prev.end = start
+                    closed.append(prev)
+                opened[line] = Session(user.decode("utf-8", "replace"), line,
+                                       recs["host"][i].decode("utf-8", "replace"), start,
+                                       pid=int(recs["pid"][i]))
+            elif kind in (USER_PROCESS, DEAD_PROCESS):
+                prev = opened.pop(line.decode("utf-8", "replace"), None)
+                if prev is not None:
+                    prev.end = datetime.fromtimestamp(when[i])
+                    closed.append(prev)
+            elif kind == BOOT_TIME or (kind == RUN_LVL and user == b"shutdown"):
+                end = datetime.fromtimestamp(when[i])
+                for s in opened.values():
+                    s.end = end
+                closed.extend(opened.values())
+                opened.clear()
+
+    def sessions(self) -> list[Session]:
+        """Read new records; return the sessions they closed plus those still open."""
+        return self.read() + list(self.open.values())
+
+
+def read_sessions(path: str | Path = WTMP) -> list[Session]:
+    """Every session in ``path`` (no state is kept)."""
+    return WtmpReader(path).sessions()
+
+
+def sessions_frame(sessions: list[Session], now: datetime | None = None) -> pd.DataFrame:
+    """Sessions as ``user, tty, remote, start, end, duration_seconds``.
+
+    Sessions still open end at ``now``. Sorted by user and start.
+    """
+    now = now or datetime.now()
+    df = pd.DataFrame(
+        {
+            "user": [s.user for s in sessions],
+            "tty": [s.line for s in sessions],
+            "remote": [s.host for s in sessions],
+            "start": pd.to_datetime([s.start for s in sessions]),
+            "end": pd.to_datetime([s.end or now for s in sessions]),
+        }
+    )
+    df["duration_seconds"] = (df["end"] - df["start"]).dt.total_seconds()
+    return df.sort_values(["user", "start"], ignore_index=True)
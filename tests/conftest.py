@@ -0,0 +1,58 @@
+from pathlib import Path
+
+import pytest
+
+from mysmtp import tasks
+from mysmtp.email import Mailer
+from smtp_stub import StubSMTPServer
+
+DATA = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def capture():
+    """A recorded ``nvidia-smi --loop-ms`` capture: three frames and a truncated one."""
+    return DATA / "nvidia-smi-loop.txt"
+
+
+class MemorySink:
+    def __init__(self):
+        self.rows = []
+
+    def write_many(self, rows):
+        self.rows.extend(rows)
+
+
+@pytest.fixture
+def sinks(monkeypatch):
+    """Route :func:`mysmtp.tasks.get_sink` to in-memory sinks, keyed by table."""
+    sinks = {}
+    monkeypatch.setattr(tasks, "get_sink", lambda name: sinks.setdefault(name, MemorySink()))
+    monkeypatch.setattr(tasks, "_sampler", None)
+    monkeypatch.setattr(tasks, "_gpu_user_sampler", None)
+    yield sinks
+    if tasks._sampler is not None:
+        tasks._sampler.close()
+
+
+@pytest.fixture
+def server():
+    with StubSMTPServer() as server:
+        yield server
+
+
+@pytest.fixture
+def smtp_env(server):
+    return {
+        "SMTP_SERVER": server.host,
+        "SMTP_PORT": str(server.port),
+        "SMTP_PASSWORD": "secret",
+        "EMAIL_FROM": "gpu@example.com",
+        "EMAIL_TO": "ops@example.com",
+    }
+
+
+@pytest.fixture
+def mailer(smtp_env):
+    with Mailer(smtp_env, timeout=5) as mailer:
+        yield mailer
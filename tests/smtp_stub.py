@@ -0,0 +1,177 @@
+"""A tiny local SMTP server for exercising :class:`mysmtp.email.Mailer` offline.
+
+It speaks just enough ESMTP for :mod:`smtplib` (EHLO, AUTH PLAIN/LOGIN with
+any credentials, MAIL, RCPT, DATA, NOOP, RSET, QUIT), keeps every received
+message in memory and counts connections, so callers can check that a batch
+went over a single session. ``latency`` delays each reply to mimic a remote
+server, :meth:`StubSMTPServer.drop_connections` simulates the server
+hanging up on idle clients, and ``refuse`` maps sender or recipient
+addresses to the reply that rejects them (e.g. ``"550 5.1.1 No such
+user"``). Usage::
+
+    with StubSMTPServer() as server:
+        env = {"SMTP_SERVER": server.host, "SMTP_PORT": str(server.port), ...}
+        Mailer(env).send(subject="hi", message="...")
+        assert len(server.messages) == 1
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ReceivedMessage:
+    mail_from: str
+    rcpt_to: list[str]
+    data: bytes
+    connection: int  # sequence number of the session it arrived on
+
+
+@dataclass
+class StubSMTPServer:
+    host: str = "127.0.0.1"
+    port: int = 0  # 0 picks a free port
+    latency: float = 0.0
+    refuse: dict[str, str] = field(default_factory=dict)  # address -> reply
+    messages: list[ReceivedMessage] = field(default_factory=list)
+    connections: int = 0
+
+    def __post_init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.base_events.Server | None = None
+        self._thread: threading.Thread | None = None
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    # --------------------
+    # LIFECYCLE
+    # --------------------
+    def start(self) -> "StubSMTPServer":
+        ready = threading.Event()
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+
+        async def shutdown() -> None:
+            self._server.close()
+            self._close_writers()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+
+    def drop_connections(self) -> None:
+        """Hang up on every connected client without a reply."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._close_writers)
+
+    def _close_writers(self) -> None:
+        for writer in list(self._writers):
+            writer.close()
+
+    def __enter__(self) -> "StubSMTPServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --------------------
+    # PROTOCOL
+    # --------------------
+    async def _reply(self, writer: asyncio.StreamWriter, text: str) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(text.encode() + b"\r\n")
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        session = self.connections
+        self._writers.add(writer)
+        mail_from, rcpt_to = "", []
+        await self._reply(writer, "220 stub ESMTP ready")
+        try:
+            while line := await reader.readline():
+                cmd = line.decode(errors="replace").strip()
+                verb = cmd.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    await self._reply(
+                        writer, "250-stub\r\n250-AUTH PLAIN LOGIN\r\n250-8BITMIME\r\n250 SMTPUTF8"
+                    )
+                elif verb == "HELO":
+                    await self._reply(writer, "250 stub")
+                elif verb == "AUTH":
+                    args = cmd.split()[1:]
+                    # PLAIN may carry the response inline; LOGIN asks twice
+                    prompts = {"PLAIN": 1, "LOGIN": 2}.get(args[0].upper(), 0) if args else 0
+                    if len(args) > 1:
+                        prompts -= 1
+                    for _ in range(prompts):
+                        await self._reply(writer, "334 ")
+                        await reader.readline()
+                    await self._reply(writer, "235 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, rcpt_to = (cmd[10:].split() or [""])[0].strip("<> "), []
+                    await self._reply(writer, self.refuse.get(mail_from, "250 OK"))
+                elif verb == "RCPT":
+                    rcpt = (cmd[8:].split() or [""])[0].strip("<> ")
+                    if rcpt in self.refuse:
+                        await self._reply(writer, self.refuse[rcpt])
+                    else:
+                        rcpt_to.append(rcpt)
+                        await self._reply(writer, "250 OK")
+                elif verb == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    chunks = []
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        chunks.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    self.messages.append(
+                        ReceivedMessage(mail_from, rcpt_to, b"".join(chunks), session)
+                    )
+                    await self._reply(writer, "250 OK queued")
+                elif verb in ("NOOP", "RSET"):
+                    if verb == "RSET":
+                        mail_from, rcpt_to = "", []
+                    await self._reply(writer, "250 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                else:
+                    await self._reply(writer, "502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+def main() -> None:
+    server = StubSMTPServer(port=8025).start()
+    print(f"Stub SMTP server listening on {server.host}:{server.port}; Ctrl-C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
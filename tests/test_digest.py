@@ -0,0 +1,55 @@
+import os
+from datetime import date
+
+import pytest
+
+from mysmtp.digest import collect_reports, prune_spool, remove_reports, send_digest, submit_report
+
+DAY = date(2026, 10, 16)
+STATS = {"gpus": 4, "util_mean": 50.0, "util_max": 99.0, "mem_mean": 40.0, "samples": 10}
+
+
+@pytest.fixture
+def spool(tmp_path):
+    png = tmp_path / "plot.png"
+    png.write_bytes(b"\x89PNG fake")
+    for host in ("gpu01", "gpu02"):
+        submit_report(host, STATS, png, day=DAY, spool=tmp_path / "spool")
+    return tmp_path / "spool"
+
+
+def test_sent_reports_leave_the_spool(spool, mailer, server):
+    assert send_digest(mailer, DAY, spool) == 2
+    assert len(server.messages) == 1
+    assert b"gpu01" in server.messages[0].data and b"gpu02" in server.messages[0].data
+    assert not (spool / DAY.isoformat()).exists()
+    assert send_digest(mailer, DAY, spool) == 0  # nothing is sent twice
+    assert len(server.messages) == 1
+
+
+def test_failed_send_keeps_reports(spool, mailer, server):
+    server.stop()
+    with pytest.raises(OSError):
+        send_digest(mailer, DAY, spool)
+    assert sorted(f.name for f in (spool / DAY.isoformat()).iterdir()) == [
+        "gpu01.json", "gpu01.png", "gpu02.json", "gpu02.png"
+    ]
+
+
+def test_resubmitted_report_is_kept(spool):
+    reports = collect_reports(DAY, spool)
+    newer = spool / DAY.isoformat() / "gpu02.json"
+    st = newer.stat()
+    os.utime(newer, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    remove_reports(reports)
+    assert sorted(f.name for f in (spool / DAY.isoformat()).iterdir()) == ["gpu02.json", "gpu02.png"]
+    assert [r.host for r in collect_reports(DAY, spool)] == ["gpu02"]
+
+
+def test_prune_spool_removes_old_days(spool):
+    submit_report("late", STATS, day=date(2026, 10, 1), spool=spool)
+    (spool / "notes").mkdir()
+    assert prune_spool(spool, keep_days=7, today=DAY) == 1
+    assert sorted(f.name for f in spool.iterdir()) == [DAY.isoformat(), "notes"]
+    assert prune_spool(spool.parent / "missing") == 0
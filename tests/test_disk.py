@@ -0,0 +1,72 @@
+import threading
+import time
+from collections import namedtuple
+
+import psutil
+
+from mysmtp.top import disk, usage
+
+Part = namedtuple("Part", "device mountpoint fstype opts")
+Usage = namedtuple("Usage", "total used free percent")
+
+
+def test_cpu_section_reads_the_shared_sampler(monkeypatch):
+    snaps = []
+
+    class Shared:
+        def sample(self):
+            util = usage.CpuUtil(25.0, 20.0, 5.0, 0.0, 0.0, 75.0)
+            snaps.append(usage.CpuSnapshot(0.0, 1.0, util, [util, usage.CpuUtil(0, 0, 0, 0, 0, 100.0)]))
+            return snaps[-1]
+
+    monkeypatch.setattr(usage, "_shared_cpu", Shared())
+    stats = disk.SystemStatsCollector(sections=("cpu",)).collect()
+    assert len(snaps) == 1
+    assert stats == {
+        "cpu": {
+            "busy": 25.0, "user": 20.0, "system": 5.0, "iowait": 0.0, "steal": 0.0, "idle": 75.0,
+            "per_core": [25.0, 0], "interval": 1.0,
+        }
+    }
+
+
+def test_hanging_network_mount_is_bounded(monkeypatch):
+    release = threading.Event()
+    calls = []
+    parts = [
+        Part("/dev/sda1", "/", "ext4", "rw"),
+        Part("proc", "/proc", "proc", "rw"),
+        Part("tmpfs", "/run", "tmpfs", "rw"),
+        Part("nas:/export", "/mnt/nas", "nfs4", "rw"),
+    ]
+
+    def disk_usage(mount):
+        calls.append(mount)
+        if mount == "/mnt/nas":
+            release.wait(30)  # statvfs against a dead server
+        return Usage(100, 40, 60, 40.0)
+
+    monkeypatch.setattr(psutil, "disk_partitions", lambda all=False: parts if all else parts[:1])
+    monkeypatch.setattr(psutil, "disk_usage", disk_usage)
+    collector = disk.SystemStatsCollector(sections=("disks",), mount_timeout=0.2)
+    try:
+        t0 = time.monotonic()
+        stats = collector.collect()
+        assert time.monotonic() - t0 < 2
+        assert list(stats["disks"]) == ["/"]
+        assert stats["stale_mounts"] == ["/mnt/nas"]
+
+        # still hanging: reported stale without starting another query
+        stats = collector.collect()
+        assert stats["stale_mounts"] == ["/mnt/nas"]
+        assert calls.count("/mnt/nas") == 1
+
+        # the server is back
+        release.set()
+        collector._pending["/mnt/nas"].join(5)
+        stats = collector.collect()
+        assert set(stats["disks"]) == {"/", "/mnt/nas"}
+        assert stats["disks"]["/mnt/nas"]["fstype"] == "nfs4"
+        assert stats["stale_mounts"] == []
+    finally:
+        release.set()
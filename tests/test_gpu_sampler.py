@@ -0,0 +1,128 @@
+import stat
+import time
+
+import pytest
+
+from mysmtp import tasks
+from mysmtp.top.gpu import parse_nvidia_smi
+from mysmtp.top.gpu_sampler import ReplaySampler, SmiStreamSampler, make_sampler
+from mysmtp.top.smi_parser import SmiParser, iter_frames
+
+
+def test_parser_on_recorded_frame(capture):
+    frame = SmiParser().parse(capture.read_text().splitlines())
+    assert frame["driver_version"] == "550.54.14"
+    assert frame["cuda_version"] == "12.4"
+    assert frame["gpus"][0] == {
+        "index": 0,
+        "name": "NVIDIA GeForce RTX 4090",
+        "bus_id": "00000000:01:00.0",
+        "temperature_C": 45,
+        "power_usage_W": 85,
+        "power_cap_W": 450,
+        "memory_used_MiB": 1234,
+        "memory_total_MiB": 24564,
+        "util_percent": 12,
+    }
+    # passively cooled, no power readout
+    gpu = frame["gpus"][1]
+    assert (gpu["power_usage_W"], gpu["power_cap_W"], gpu["memory_used_MiB"]) == (None, None, 4)
+    assert [(p["pid"], p["type"], p["gpu_memory_MiB"]) for p in frame["processes"]] == [
+        (1234, "C", 1200),
+        (2345, "G", 34),
+    ]
+    assert parse_nvidia_smi(capture.read_text()) == frame
+
+
+def test_iter_frames_skips_truncated_frame(capture):
+    frames = list(iter_frames(capture.read_text().splitlines()))
+    assert len(frames) == 3
+    assert frames[1]["gpus"][0]["util_percent"] == 87
+    assert frames[1]["processes"][-1]["process_name"] == "python train.py --lr 3e-4"
+    assert frames[2]["processes"] == []
+
+
+def test_replay_sampler(capture):
+    sampler = ReplaySampler(capture, loop=False)
+    utils = [sampler.sample()["gpus"][0]["util_percent"] for _ in range(3)]
+    assert utils == [12, 87, 12]
+    assert sampler.sample() is None
+
+    looping = ReplaySampler(capture.read_text())
+    assert [looping.sample() for _ in range(4)][3] == looping.frames[0]
+
+
+def test_make_sampler_rejects_unknown_backend(tmp_path, capture):
+    with pytest.raises(ValueError):
+        make_sampler("nvml2")
+    empty = tmp_path / "empty.txt"
+    empty.write_text("no frames here\n")
+    with pytest.raises(ValueError):
+        make_sampler(str(empty))
+    assert isinstance(make_sampler(str(capture)), ReplaySampler)
+
+
+def test_log_gpu_metrics_replays_without_gpu(monkeypatch, capture, sinks):
+    monkeypatch.setenv("MYSMTP_GPU_BACKEND", str(capture))
+    monkeypatch.setattr(tasks, "has_nvidia_gpu_dev", lambda: False)
+
+    tasks.log_gpu_metrics()
+    tasks.log_gpu_metrics()
+    assert [r["util_percent"] for r in sinks["gpu"].rows] == [12, 0, 87, 0]
+    assert len(sinks["gpu_processes"].rows) == 5
+
+
+def test_log_gpu_metrics_unknown_backend(monkeypatch, capsys):
+    monkeypatch.setenv("MYSMTP_GPU_BACKEND", "no-such-backend")
+    monkeypatch.setattr(tasks, "_sampler", None)
+    monkeypatch.setattr(tasks, "_backend_error", None)
+    tasks.log_gpu_metrics()
+    tasks.log_gpu_metrics()
+    assert capsys.readouterr().out.count("unavailable") == 1
+
+
+# --------------------
+# STREAMING CHILD
+# --------------------
+@pytest.fixture
+def fake_smi(tmp_path, capture):
+    """An ``nvidia-smi`` that prints the capture once and then hangs."""
+    script = tmp_path / "nvidia-smi"
+    script.write_text(f"#!/bin/sh\ncat '{capture}'\nexec sleep 60\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+def wait_for(sampler, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        frame = sampler.sample()
+        if frame is not None:
+            return frame
+        time.sleep(0.02)
+    raise AssertionError("no frame")
+
+
+def test_stream_sampler_returns_each_frame_once(fake_smi):
+    sampler = SmiStreamSampler(loop_ms=50, cmd=fake_smi, stale_after=30)
+    try:
+        time.sleep(0.3)  # all three complete frames have arrived
+        assert wait_for(sampler)["processes"] == []  # the newest one
+        assert sampler.sample() is None
+    finally:
+        sampler.close()
+
+
+def test_stream_sampler_restarts_silent_child(fake_smi):
+    sampler = SmiStreamSampler(loop_ms=50, cmd=fake_smi, stale_after=0.5)
+    try:
+        wait_for(sampler)
+        first = sampler._proc
+        time.sleep(0.7)  # child hangs: no frame within stale_after
+        assert sampler.sample() is None
+        assert sampler._proc is not first
+        assert first.poll() is not None
+        assert wait_for(sampler) is not None
+    finally:
+        sampler.close()
+    assert sampler._proc.poll() is not None
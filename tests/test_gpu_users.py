@@ -0,0 +1,116 @@
+import os
+
+from mysmtp import tasks
+from mysmtp.top import gpu_users
+from mysmtp.top.gpu_sampler import ReplaySampler
+from mysmtp.top.gpu_users import GpuUserSampler, PidOwners, host_pid_namespace
+
+
+def fake_proc(root, owners, nspid="4242"):
+    """A ``/proc`` with one directory per ``pid -> uid``, started at tick ``pid``."""
+    (root / "self").mkdir(parents=True)
+    (root / "self" / "status").write_text(f"Name:\tpython\nNSpid:\t{nspid}\n")
+    for pid, uid in owners.items():
+        (root / str(pid)).mkdir()
+        start(root, pid, pid)
+        os.chown(root / str(pid), uid, uid)
+    return str(root)
+
+
+def start(root, pid, starttime, comm="python (train) 1"):
+    """Write ``/proc/<pid>/stat`` with ``starttime`` as field 22."""
+    fields = ["S"] + ["0"] * 18 + [str(starttime)] + ["0"] * 30
+    (root / str(pid) / "stat").write_text(f"{pid} ({comm}) {' '.join(fields)}\n")
+
+
+def test_pid_owners_caches_until_pid_leaves(tmp_path):
+    owners = PidOwners(fake_proc(tmp_path, {100: 1000, 200: 2000}))
+    assert owners.lookup([100, 200, 300, 100]) == {100: 1000, 200: 2000, 300: None}
+    assert owners.reads == 3
+    assert owners.lookup([100, 200]) == {100: 1000, 200: 2000}
+    assert owners.reads == 3
+
+    # pid 100 leaves the GPUs and comes back as another user's process
+    os.chown(tmp_path / "100", 3000, 3000)
+    owners.lookup([200])
+    assert owners.lookup([100, 200]) == {100: 3000, 200: 2000}
+    assert owners.reads == 4
+
+
+def test_pid_owners_notices_reused_pid(tmp_path):
+    owners = PidOwners(fake_proc(tmp_path, {100: 1000, 200: 2000}), recheck=0.0)
+    owners.lookup([100, 200])
+    assert (owners.reads, owners.checks) == (2, 2)
+
+    # pid 100 exits and is reused by another user's process before the next tick
+    os.chown(tmp_path / "100", 3000, 3000)
+    start(tmp_path, 100, 5000)
+    assert owners.lookup([100, 200]) == {100: 3000, 200: 2000}
+    assert owners.reads == 3  # only pid 100 was looked up again
+    assert owners.lookup([100, 200]) == {100: 3000, 200: 2000}
+    assert owners.reads == 3
+
+
+def test_pid_owners_revalidates(tmp_path):
+    owners = PidOwners(fake_proc(tmp_path, {100: 1000}), revalidate=0.0)
+    owners.lookup([100])
+    os.chown(tmp_path / "100", 3000, 3000)  # reused between two ticks
+    assert owners.lookup([100]) == {100: 3000}
+
+
+def test_host_pid_namespace(tmp_path):
+    assert host_pid_namespace(fake_proc(tmp_path / "host", {}))
+    assert not host_pid_namespace(fake_proc(tmp_path / "container", {}, nspid="81234\t17"))
+    assert host_pid_namespace(str(tmp_path / "missing"))  # no NSpid: old kernel
+
+
+def test_sampler_sums_per_user(tmp_path):
+    sampler = GpuUserSampler(fake_proc(tmp_path, {100: 1000, 200: 2000, 300: 1000}))
+    frame = [
+        {"pid": 100, "gpu": 0, "gpu_memory_MiB": 500},
+        {"pid": 300, "gpu": 1, "gpu_memory_MiB": 700},
+        {"pid": 200, "gpu": 1, "gpu_memory_MiB": 100},
+    ]
+    assert sampler.sample(frame).elapsed == 0.0
+    users = sampler.sample(frame).users
+    assert (users[1000].processes, users[1000].gpus, users[1000].gpu_memory_MiB) == (2, 2, 1200)
+    assert users[1000].gpu_seconds == 2 * users[2000].gpu_seconds > 0
+
+
+def test_no_attribution_inside_container_or_for_replay(tmp_path):
+    frame = [{"pid": 100, "gpu": 0, "gpu_memory_MiB": 500}]
+    contained = GpuUserSampler(fake_proc(tmp_path / "container", {100: 1000}, nspid="9\t1"))
+    assert contained.sample(frame).owners == {100: None}
+
+    host = GpuUserSampler(fake_proc(tmp_path / "host", {100: 1000}))
+    assert host.sample(frame).owners == {100: 1000}
+    assert host.sample(frame, live=False).owners == {100: None}
+    assert list(host.sample(frame, live=False).users) == [None]
+
+
+def test_log_gpu_metrics_does_not_attribute_replayed_pids(capture, sinks):
+    # pid 1 exists on every machine; a replayed pid 1 must not be booked to root
+    replay = ReplaySampler(capture)
+    replay.frames = [{"gpus": [], "processes": [{"pid": 1, "gpu": 0, "gpu_memory_MiB": 9}]}]
+    tasks.log_gpu_metrics(replay)
+    assert [r["uid"] for r in sinks["gpu_processes"].rows] == [None]
+    assert [(r["uid"], r["user"]) for r in sinks["gpu_users"].rows] == [(None, "unknown")]
+
+
+def test_pid_owners_checks_start_times_every_recheck(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(gpu_users.time, "monotonic", lambda: now[0])
+    owners = PidOwners(fake_proc(tmp_path, {100: 1000}), recheck=5.0)
+    owners.lookup([100])
+    os.chown(tmp_path / "100", 3000, 3000)
+    start(tmp_path, 100, 5000)
+
+    now[0] += 4.0
+    assert owners.lookup([100]) == {100: 1000}  # not checked yet
+    assert owners.checks == 1
+    now[0] += 1.0
+    assert owners.lookup([100]) == {100: 3000}
+    assert (owners.reads, owners.checks) == (2, 3)
+    now[0] += 1.0
+    assert owners.lookup([100]) == {100: 3000}
+    assert owners.checks == 3
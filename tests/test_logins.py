@@ -0,0 +1,99 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from mysmtp.logins import LoginStore
+from test_wtmp import append, login, logout
+
+
+def at(*args):
+    """Epoch seconds of a local time, as ``wtmp`` stores it."""
+    return datetime(*args).timestamp()
+
+
+@pytest.fixture
+def wtmp(tmp_path):
+    return tmp_path / "wtmp"
+
+
+@pytest.fixture
+def store(tmp_path, wtmp):
+    with LoginStore(tmp_path / "logins.sqlite3", wtmp) as store:
+        yield store
+
+
+def daily(store):
+    df = store.daily()
+    return [(d.date().isoformat(), u, n) for d, u, n in zip(df["day"], df["user"], df["blocks"])]
+
+
+def test_open_session_is_not_counted_twice(store, wtmp):
+    append(wtmp, login("pts/0", "alice", at(2026, 10, 16, 10, 5)))
+    # still logged in: 10:00, 10:15 and 10:30 so far
+    assert store.update(now=datetime(2026, 10, 16, 10, 35)) == 3
+    assert daily(store) == [("2026-10-16", "alice", 3)]
+
+    append(wtmp, logout("pts/0", at(2026, 10, 16, 10, 50)))
+    assert store.update(now=datetime(2026, 10, 16, 12, 0)) == 1  # only 10:45 is new
+    assert daily(store) == [("2026-10-16", "alice", 4)]
+    assert store.update(now=datetime(2026, 10, 16, 13, 0)) == 0
+
+
+def test_session_across_midnight_is_split(store, wtmp):
+    append(wtmp, login("pts/0", "alice", at(2026, 10, 16, 23, 40)), logout("pts/0", at(2026, 10, 17, 0, 20)))
+    assert store.update(now=datetime(2026, 10, 17, 9, 0)) == 4
+    assert daily(store) == [("2026-10-16", "alice", 2), ("2026-10-17", "alice", 2)]
+
+
+def test_overlapping_sessions_count_once(store, wtmp):
+    append(
+        wtmp,
+        login("pts/0", "alice", at(2026, 10, 16, 9, 0)),
+        login("pts/1", "alice", at(2026, 10, 16, 9, 20), pid=101),
+        logout("pts/0", at(2026, 10, 16, 9, 40)),
+        logout("pts/1", at(2026, 10, 16, 10, 10), pid=101),
+    )
+    store.update(now=datetime(2026, 10, 16, 12, 0))
+    assert daily(store) == [("2026-10-16", "alice", 5)]  # 9:00 through 10:00
+
+
+def test_restart_resumes_from_saved_state(tmp_path, wtmp):
+    path = tmp_path / "logins.sqlite3"
+    append(
+        wtmp,
+        login("pts/0", "alice", at(2026, 10, 16, 10, 5)),
+        login("pts/1", "bob", at(2026, 10, 16, 11, 0), pid=101),
+    )
+    with LoginStore(path, wtmp) as store:
+        store.update(now=datetime(2026, 10, 16, 11, 10))
+
+    append(wtmp, logout("pts/0", at(2026, 10, 16, 11, 20)))
+    with LoginStore(path, wtmp) as store:
+        # the reader continues after the records already read, with bob still open
+        assert store.update(now=datetime(2026, 10, 16, 11, 40)) == 3  # alice 11:15, bob 11:15 and 11:30
+        assert daily(store) == [("2026-10-16", "alice", 6), ("2026-10-16", "bob", 3)]
+        state = store._db.execute("SELECT value FROM state WHERE key = 'wtmp'").fetchone()[0]
+        assert f'"offset": {wtmp.stat().st_size}' in state
+
+
+def test_totals_and_top_over_a_date_range(store):
+    sessions = pd.DataFrame(
+        [
+            ("alice", "2026-10-12 09:00", "2026-10-12 10:59"),  # 8 blocks
+            ("alice", "2026-10-14 09:00", "2026-10-14 09:29"),  # 2
+            ("bob", "2026-10-13 09:00", "2026-10-13 09:59"),  # 4
+            ("bob", "2026-10-15 09:00", "2026-10-15 12:59"),  # 16
+            ("carol", "2026-10-11 09:00", "2026-10-11 23:59"),  # 60, before the range
+        ],
+        columns=["user", "start", "end"],
+    )
+    sessions[["start", "end"]] = sessions[["start", "end"]].apply(pd.to_datetime)
+    store.add_sessions(sessions)
+
+    totals = store.totals(start=date(2026, 10, 12), end=date(2026, 10, 15))
+    assert totals.to_dict() == {"alice": 10 * 900.0, "bob": 4 * 900.0}
+    assert store.totals(start="2026-10-13").index.tolist() == ["bob", "alice"]
+    assert store.totals(end=date(2026, 10, 12)).to_dict() == {"carol": 60 * 900.0}
+    assert store.top(1).to_dict() == {"carol": 60 * 900.0}
+    assert store.top(2, start=date(2026, 10, 12)).index.tolist() == ["bob", "alice"]
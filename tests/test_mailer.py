@@ -0,0 +1,95 @@
+import asyncio
+import smtplib
+import time
+
+import pytest
+
+from mysmtp.email import AsyncMailer, Mailer, PartialDelivery
+
+
+def envelopes(mailer, *recipients):
+    return [
+        mailer.compose(subject=f"report for {to}", message="GPU usage today", to=to)
+        for to in recipients
+    ]
+
+
+def test_send_many_uses_one_session(mailer, server):
+    results = mailer.send_many(envelopes(mailer, "a@example.com", "b@example.com", "c@example.com"))
+    assert results == [None, None, None]
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"], ["b@example.com"], ["c@example.com"]]
+    assert {m.connection for m in server.messages} == {1}
+    assert server.connections == 1
+
+
+def test_failure_only_affects_its_message(mailer, server):
+    server.refuse["nobody@example.com"] = "550 5.1.1 No such user"
+    results = mailer.send_many(envelopes(mailer, "a@example.com", "nobody@example.com", "b@example.com"))
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], smtplib.SMTPRecipientsRefused)
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"], ["b@example.com"]]
+    assert server.connections == 1  # a refusal does not cost the session
+
+
+def test_reconnects_after_server_hangs_up(mailer, server):
+    [first, second] = envelopes(mailer, "a@example.com", "b@example.com")
+    mailer.deliver(first)
+    server.drop_connections()
+    time.sleep(0.1)
+
+    mailer.deliver(second)  # the stale session fails, the retry goes over a new one
+    assert [m.connection for m in server.messages] == [1, 2]
+    assert server.connections == 2
+
+
+def test_idle_session_is_probed_before_reuse(mailer, server, monkeypatch):
+    monkeypatch.setattr(mailer, "KEEPALIVE_INTERVAL", 0.0)
+    mailer.deliver(envelopes(mailer, "a@example.com")[0])
+    smtp = mailer.connection()
+    assert mailer.connection() is smtp  # NOOP answered: same session
+
+    server.drop_connections()
+    time.sleep(0.1)
+    assert mailer.connection() is not smtp
+    assert server.connections == 2
+
+
+def test_close_says_quit(mailer, server):
+    mailer.deliver(envelopes(mailer, "a@example.com")[0])
+    mailer.close()
+    assert mailer._smtp is None
+    mailer.close()  # idempotent
+    mailer.deliver(envelopes(mailer, "b@example.com")[0])
+    assert server.connections == 2
+
+
+@pytest.mark.parametrize("missing", ["SMTP_PASSWORD", "EMAIL_TO"])
+def test_missing_settings_fail_early(smtp_env, missing):
+    del smtp_env[missing]
+    with pytest.raises(EnvironmentError, match=missing):
+        Mailer(smtp_env)
+
+
+def test_async_send_to_reports_every_recipient(smtp_env, server):
+    server.refuse["nobody@example.com"] = "550 5.1.1 No such user"
+    recipients = ["a@example.com", "nobody@example.com", "a@example.com"]
+
+    async def send():
+        async with AsyncMailer(smtp_env, concurrency=2, timeout=5) as mailer:
+            return await mailer.send_to(recipients, subject="Weekly usage", message=lambda to: f"hi {to}")
+
+    results = asyncio.run(send())
+    assert [to for to, _ in results] == recipients
+    assert results[0][1] is None and results[2][1] is None
+    assert isinstance(results[1][1], smtplib.SMTPRecipientsRefused)
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"], ["a@example.com"]]
+    assert server.connections <= 2
+
+
+def test_partly_refused_message_raises(mailer, server):
+    server.refuse["nobody@example.com"] = "550 5.1.1 No such user"
+    envelope = mailer.compose(subject="report", message="GPU usage today", to="a@example.com")
+    with pytest.raises(PartialDelivery) as e:
+        mailer.deliver(envelope, ["a@example.com", "nobody@example.com"])
+    assert e.value.recipients == {"nobody@example.com": (550, b"5.1.1 No such user")}
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"]]
@@ -0,0 +1,134 @@
+import threading
+import time
+from email.message import EmailMessage
+
+import pytest
+
+from mysmtp.email import Outbox
+
+
+def message(to="ops@example.com", sender="gpu@example.com"):
+    msg = EmailMessage()
+    msg["From"], msg["To"], msg["Subject"] = sender, to, f"report for {to}"
+    msg.set_content("GPU usage today")
+    return msg
+
+
+@pytest.fixture
+def outbox(tmp_path, mailer):
+    with Outbox(tmp_path / "outbox.sqlite3", mailer, rate=1000, burst=100) as outbox:
+        yield outbox
+
+
+def rows(outbox):
+    with outbox._lock:
+        return outbox._db.execute("SELECT id, attempts, status, last_error FROM outbox").fetchall()
+
+
+def test_delivers_queue_over_one_session(outbox, server):
+    for to in ("a@example.com", "b@example.com", "c@example.com"):
+        outbox.enqueue(message(to))
+    assert outbox.deliver_due() == 3
+    assert outbox.counts() == {}
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"], ["b@example.com"], ["c@example.com"]]
+    assert server.connections == 1
+
+
+def test_refused_recipient_fails_without_pausing_queue(outbox, server):
+    server.refuse["nobody@example.com"] = "550 5.1.1 No such user"
+    bad = outbox.enqueue(message("nobody@example.com"))
+    outbox.enqueue(message("ops@example.com"))
+
+    assert outbox.deliver_due() == 1
+    assert outbox._resume_at == 0.0
+    [(msg_id, attempts, status, error)] = rows(outbox)
+    assert (msg_id, attempts, status) == (bad, 1, "failed")
+    assert error.startswith("SMTPRecipientsRefused")
+
+
+def test_temporarily_refused_recipient_is_retried(outbox, server):
+    server.refuse["full@example.com"] = "452 4.2.2 Mailbox full"
+    outbox.enqueue(message("full@example.com"))
+    outbox.enqueue(message("ops@example.com"))
+
+    assert outbox.deliver_due() == 1
+    assert outbox._resume_at == 0.0
+    [(_, attempts, status, _)] = rows(outbox)
+    assert (attempts, status) == (1, "pending")
+    assert outbox._seconds_until_due() > outbox.base_delay / 2
+
+
+def test_refused_sender_fails(outbox, server):
+    server.refuse["spoof@example.com"] = "553 5.7.1 Sender address rejected"
+    outbox.enqueue(message(sender="spoof@example.com"))
+    assert outbox.deliver_due() == 0
+    assert outbox.counts() == {"failed": 1}
+    assert outbox._resume_at == 0.0
+
+
+def test_unreachable_server_pauses_queue(outbox, server):
+    outbox.enqueue(message("a@example.com"))
+    outbox.enqueue(message("b@example.com"))
+    server.stop()
+
+    assert outbox.deliver_due() == 0
+    assert outbox._resume_at > time.time()
+    assert sorted((a, s) for _, a, s, _ in rows(outbox)) == [(0, "pending"), (1, "pending")]
+    assert outbox.deliver_due() == 0  # still paused: nothing is attempted
+    assert sorted(a for _, a, _, _ in rows(outbox)) == [0, 1]
+
+
+class BrokenMailer:
+    def __init__(self):
+        self.calls = threading.Event()
+
+    def deliver(self, msg, to_addrs=None):
+        self.calls.set()
+        raise RuntimeError("mailer bug")
+
+    def close(self):
+        pass
+
+
+def test_worker_survives_unexpected_errors(tmp_path, capsys):
+    mailer = BrokenMailer()
+    with Outbox(tmp_path / "outbox.sqlite3", mailer, poll_interval=0.05) as outbox:
+        outbox.enqueue(message())
+        outbox.start()
+        assert mailer.calls.wait(5)
+        time.sleep(0.2)
+        assert outbox._thread.is_alive()
+        assert outbox._resume_at > time.time()
+        assert outbox.counts() == {"pending": 1}
+    assert "RuntimeError: mailer bug" in capsys.readouterr().err
+
+
+def test_partly_refused_message_is_kept_for_the_refused_recipients(outbox, server):
+    server.refuse["full@example.com"] = "452 4.2.2 Mailbox full"
+    msg_id = outbox.enqueue(message("a@example.com, full@example.com"))
+
+    assert outbox.deliver_due() == 0
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"]]
+    [(_, attempts, status, error)] = rows(outbox)
+    assert (attempts, status) == (1, "pending")
+    assert error.startswith("PartialDelivery")
+    assert outbox._resume_at == 0.0
+
+    # the retry only goes to the recipient that was refused
+    del server.refuse["full@example.com"]
+    with outbox._lock:
+        outbox._db.execute("UPDATE outbox SET next_attempt = 0 WHERE id = ?", (msg_id,))
+    assert outbox.deliver_due() == 1
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"], ["full@example.com"]]
+    assert outbox.counts() == {}
+
+
+def test_permanently_refused_recipient_of_several_fails(outbox, server):
+    server.refuse["nobody@example.com"] = "550 5.1.1 No such user"
+    outbox.enqueue(message("a@example.com, nobody@example.com"))
+    assert outbox.deliver_due() == 0
+    assert [m.rcpt_to for m in server.messages] == [["a@example.com"]]
+    assert outbox.counts() == {"failed": 1}
+    with outbox._lock:
+        [(recipients,)] = outbox._db.execute("SELECT recipients FROM outbox").fetchall()
+    assert recipients == '["nobody@example.com"]'
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from mysmtp.task.columns import UTIL_COLUMNS, pick_column
+from mysmtp.task.plot_cache import PlotCache, aggregate_minutes
+
+
+def rows(start, n):
+    t = pd.date_range(start, periods=n, freq="7s")
+    return pd.DataFrame({
+        "time": t.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+        "index": [i % 2 for i in range(n)],
+        "gpu_util": [(i * 13) % 101 for i in range(n)],
+        "memory_used_MiB": [1000 + i for i in range(n)],
+        "memory_total_MiB": 24564,
+    })
+
+
+def test_pick_column():
+    assert pick_column(["time", "gpu_util"], UTIL_COLUMNS, "util") == "gpu_util"
+    with pytest.raises(KeyError):
+        pick_column(["time"], UTIL_COLUMNS, "util")
+
+
+def test_incremental_update_matches_full_aggregate(tmp_path):
+    csv = tmp_path / "gpu_metrics.csv"
+    first, second = rows("2025-03-01 23:50", 200), rows("2025-03-02 00:13:20", 200)
+    first.to_csv(csv, index=False)
+    cache = PlotCache(csv, tmp_path / "cache")
+    assert {day for _, day in cache.update()} == {"2025-03-01", "2025-03-02"}
+
+    second.to_csv(csv, mode="a", header=False, index=False)
+    assert {day for _, day in cache.update()} == {"2025-03-02"}
+    assert cache.update() == []
+
+    raw = pd.concat([first, second], ignore_index=True).rename(
+        columns={"time": "timestamp", "gpu_util": "util_percent"})
+    raw["timestamp"] = pd.to_datetime(raw["timestamp"]).dt.tz_localize(None)
+    expected = aggregate_minutes(raw).sort_values(["index", "timestamp"], ignore_index=True)
+    got = cache.read(pd.Timestamp("2025-03-01"), pd.Timestamp("2025-03-03"))
+    pd.testing.assert_frame_equal(
+        got[["index", "timestamp", "util_max", "count"]],
+        expected[["index", "timestamp", "util_max", "count"]],
+        check_dtype=False,
+    )
@@ -0,0 +1,126 @@
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from mysmtp.rollup import SETTLE, Tier, apply_retention, choose_tier, rollup, rollup_all
+from mysmtp.store import ROLLUP_SCHEMA, open_store
+from test_store import gpu_row
+
+T0 = datetime(2026, 10, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def samples(seconds, start=T0, gpus=(0, 1)):
+    """1 Hz rows; GPU ``i`` reports ``util = second % 60 + 100 * i``."""
+    return [
+        gpu_row(start + timedelta(seconds=s), index=i, util=s % 60 + 100 * i)
+        for s in range(seconds)
+        for i in gpus
+    ]
+
+
+def rollup_row(t):
+    row = {name: 0 for name in ROLLUP_SCHEMA.names}
+    row.update(timestamp=t, samples=1)
+    return [row]
+
+
+@pytest.fixture
+def raw(tmp_path):
+    return open_store(tmp_path, "gpu")
+
+
+def test_rollup_of_known_samples(raw, tmp_path):
+    raw.append(samples(180))
+    tier = open_store(tmp_path, "gpu_1m")
+    now = pd.Timestamp(T0) + pd.Timedelta(hours=1)
+
+    assert rollup(raw, tier, pd.Timedelta(minutes=1), now=now) == 6  # 3 minutes x 2 GPUs
+    df = tier.read().sort_values(["timestamp", "index"], ignore_index=True)
+    assert df["timestamp"].tolist() == [pd.Timestamp(T0) + pd.Timedelta(minutes=m) for m in (0, 0, 1, 1, 2, 2)]
+    assert df["index"].tolist() == [0, 1] * 3
+    assert df["samples"].tolist() == [60] * 6
+    assert df["util_percent_min"].tolist() == [0, 100] * 3
+    assert df["util_percent_max"].tolist() == [59, 159] * 3
+    np.testing.assert_allclose(df["util_percent"], [29.5, 129.5] * 3)
+    np.testing.assert_allclose(df["util_percent_p95"], [56.05, 156.05] * 3, rtol=1e-6)
+    assert df["memory_total_MiB"].tolist() == [40960] * 6
+
+
+def test_rollup_is_idempotent_across_the_settle_window(raw, tmp_path):
+    raw.append(samples(30 * 60, gpus=(0,)))  # 12:00 through 12:29:59
+    tier = open_store(tmp_path, "gpu_1m")
+    freq = pd.Timedelta(minutes=1)
+
+    # at 12:35 buckets from 12:25 on are still settling
+    now = pd.Timestamp(T0) + pd.Timedelta(minutes=35)
+    assert rollup(raw, tier, freq, now=now) == 25
+    assert rollup(raw, tier, freq, now=now) == 0
+    assert tier.last_time() == (now - SETTLE).floor(freq) - freq
+
+    later = now + pd.Timedelta(hours=1)
+    assert rollup(raw, tier, freq, now=later) == 5
+    assert rollup(raw, tier, freq, now=later) == 0
+    df = tier.read()
+    assert len(df) == 30
+    assert df["timestamp"].is_unique
+    assert df["samples"].sum() == 30 * 60
+
+
+def test_rollup_spans_days(raw, tmp_path):
+    midnight = datetime(2026, 10, 16, tzinfo=timezone.utc)
+    raw.append(samples(120, start=midnight - timedelta(minutes=1), gpus=(0,)))
+    tier = open_store(tmp_path, "gpu_1m")
+    assert rollup(raw, tier, pd.Timedelta(minutes=1), now=pd.Timestamp(midnight) + pd.Timedelta(days=1)) == 2
+    assert tier.days() == [date(2026, 10, 15), date(2026, 10, 16)]
+
+
+@pytest.mark.parametrize(
+    "span, table",
+    [(pd.Timedelta(hours=1), "gpu"), (pd.Timedelta(days=1), "gpu_1m"), (pd.Timedelta(weeks=1), "gpu_15m")],
+)
+def test_choose_tier(tmp_path, span, table):
+    first = datetime(2026, 9, 1, tzinfo=timezone.utc)
+    for name in ("gpu", "gpu_1m", "gpu_15m"):
+        open_store(tmp_path, name).append(
+            [gpu_row(first)] if name == "gpu" else rollup_row(first)
+        )
+    end = pd.Timestamp("2026-10-15", tz="UTC")
+    assert choose_tier(tmp_path, end - span, end) == table
+
+
+def test_choose_tier_needs_coverage(tmp_path):
+    open_store(tmp_path, "gpu").append([gpu_row(datetime(2026, 10, 14, tzinfo=timezone.utc))])
+    open_store(tmp_path, "gpu_15m").append(rollup_row(datetime(2026, 10, 10, tzinfo=timezone.utc)))
+    end = pd.Timestamp("2026-10-15", tz="UTC")
+    # only the 15 minute tier reaches back three days; nothing covers a month
+    assert choose_tier(tmp_path, end - pd.Timedelta(days=3), end) == "gpu_15m"
+    assert choose_tier(tmp_path, end - pd.Timedelta(days=30), end) == "gpu"
+
+
+def test_retention_drops_expired_partitions(tmp_path):
+    today = pd.Timestamp.now(tz="UTC").normalize()
+    raw = open_store(tmp_path, "gpu")
+    for days_ago in (10, 3, 1):
+        raw.append([gpu_row(today - pd.Timedelta(days=days_ago))])
+    users = open_store(tmp_path, "user_cpu")
+    users.append(
+        [{"timestamp": today - pd.Timedelta(days=10), "uid": 1000, "user": "alice", "processes": 1,
+          "cpu_percent": 5.0, "rss_bytes": 1}]
+    )
+
+    tiers = [
+        Tier("gpu", pd.Timedelta(seconds=1), 7),
+        Tier("gpu_1m", pd.Timedelta(minutes=1), 90),
+        Tier("gpu_15m", pd.Timedelta(minutes=15), 730),
+    ]
+    written = rollup_all(tmp_path, tiers)
+    assert written == {"gpu_1m": 3, "gpu_15m": 3}
+    assert raw.days() == [(today - pd.Timedelta(days=d)).date() for d in (3, 1)]
+    assert users.days() == []
+    assert len(open_store(tmp_path, "gpu_1m").days()) == 3  # rollups outlive the raw rows
+
+    assert apply_retention(open_store(tmp_path, "gpu_1m"), 1, today=today.date()) == [
+        (today - pd.Timedelta(days=10)).date(), (today - pd.Timedelta(days=3)).date()
+    ]
@@ -0,0 +1,83 @@
+import csv
+
+import pytest
+
+from mysmtp import sink as sink_module
+from mysmtp.sink import BufferedSink, CsvSink, flush_all
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_csv_sink_flushes_at_max_rows(tmp_path):
+    path = tmp_path / "out" / "metrics.csv"
+    with CsvSink(path, ["a", "b"], max_rows=3, max_age=3600) as sink:
+        sink.write_many([{"a": 1, "b": 2}, {"a": 3, "b": 4}])
+        assert not path.exists() and len(sink) == 2
+        sink.write({"a": 5, "b": 6, "extra": 7})
+        assert len(sink) == 0
+        assert read_csv(path) == [["a", "b"], ["1", "2"], ["3", "4"], ["5", "6"]]
+        sink.write({"a": 7, "b": 8})
+    assert read_csv(path)[-1] == ["7", "8"]  # flushed on close
+
+
+def test_csv_sink_flushes_at_max_age(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(sink_module.time, "monotonic", lambda: now[0])
+    path = tmp_path / "metrics.csv"
+    sink = CsvSink(path, max_rows=100, max_age=30)
+    sink.write({"a": 1})
+    now[0] += 29
+    sink.write({"a": 2})
+    assert not path.exists()
+    now[0] += 1  # the oldest row is now 30 s old
+    sink.write({"a": 3})
+    assert read_csv(path) == [["a"], ["1"], ["2"], ["3"]]
+    sink.close()
+
+
+def test_csv_sink_keeps_existing_header(tmp_path):
+    path = tmp_path / "metrics.csv"
+    path.write_text("b,a\n0,0\n")
+    with CsvSink(path, ["a", "b", "c"], max_rows=1) as sink:
+        sink.write({"a": 1, "b": 2, "c": 3})
+    assert read_csv(path) == [["b", "a"], ["0", "0"], ["2", "1"]]
+
+
+class RecordingSink(BufferedSink):
+    def __init__(self, during_write=None, **kwargs):
+        self.batches = []
+        self.during_write = during_write
+        super().__init__(**kwargs)
+
+    def _write_batch(self, rows):
+        if self.during_write is not None:
+            hook, self.during_write = self.during_write, None
+            hook(self)
+        self.batches.append(list(rows))
+
+
+def test_flush_during_write_does_not_repeat_rows():
+    # the SIGTERM handler calls flush_all() while a flush is writing
+    sink = RecordingSink(during_write=lambda s: flush_all(), max_rows=100)
+    sink.write_many([{"n": 1}, {"n": 2}])
+    sink.flush()
+    assert sink.batches == [[{"n": 1}, {"n": 2}]]
+    sink.close()
+
+
+def test_failed_write_keeps_rows():
+    def fail(sink):
+        sink.write({"n": 3})  # buffered while the failing write runs
+        raise OSError("disk full")
+
+    sink = RecordingSink(during_write=fail, max_rows=100)
+    sink.write_many([{"n": 1}, {"n": 2}])
+    with pytest.raises(OSError):
+        sink.flush()
+    assert len(sink) == 3
+    sink.flush()
+    assert sink.batches == [[{"n": 1}, {"n": 2}, {"n": 3}]]
+    sink.close()
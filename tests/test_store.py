@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from mysmtp.sink import ParquetSink
+from mysmtp.store import import_csv, open_store
+
+T0 = datetime(2026, 10, 15, 22, 0, tzinfo=timezone.utc)
+
+
+def gpu_row(t, index=0, util=50):
+    return {
+        "timestamp": t,
+        "driver_version": "550.54",
+        "cuda_version": "12.4",
+        "index": index,
+        "name": "NVIDIA A100",
+        "bus_id": f"00000000:0{index}:00.0",
+        "temperature_C": 40,
+        "power_usage_W": 100.5,
+        "power_cap_W": 400.0,
+        "memory_used_MiB": 1000,
+        "memory_total_MiB": 40960,
+        "util_percent": util,
+    }
+
+
+def hourly(hours, start=T0):
+    return [gpu_row(start + timedelta(hours=h), util=h) for h in range(hours)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return open_store(tmp_path, "gpu")
+
+
+def test_round_trip_filtered_by_time(store):
+    store.append(hourly(6))  # 22:00 on the 15th through 03:00 on the 16th
+    assert store.days() == [date(2026, 10, 15), date(2026, 10, 16)]
+
+    df = store.read(T0 + timedelta(hours=1), T0 + timedelta(hours=4), columns=["timestamp", "util_percent"])
+    assert df.columns.tolist() == ["timestamp", "util_percent"]
+    assert df["util_percent"].tolist() == [1, 2, 3]
+    assert str(df["timestamp"].dt.tz) == "UTC"
+
+    everything = store.read()
+    assert len(everything) == 6
+    assert everything["name"].astype(str).unique().tolist() == ["NVIDIA A100"]
+    assert store.last_time() == pd.Timestamp(T0 + timedelta(hours=5))
+
+
+def test_read_opens_only_overlapping_partitions(store, monkeypatch):
+    store.append(hourly(72, start=datetime(2026, 10, 14, tzinfo=timezone.utc)))
+    opened = []
+    parts = store.parts
+    monkeypatch.setattr(store, "parts", lambda day: opened.append(day) or parts(day))
+
+    # naive bounds are UTC; the end is exclusive, so the 16th is not opened
+    df = store.read(datetime(2026, 10, 15, 12), datetime(2026, 10, 16))
+    assert opened == [date(2026, 10, 15)]
+    assert df["util_percent"].tolist() == list(range(36, 48))
+    assert store.read(datetime(2026, 11, 1)).empty
+
+
+def test_new_day_compacts_finished_days(store):
+    store.append(hourly(1))
+    store.append(hourly(1, start=T0 + timedelta(hours=1)))
+    assert len(store.parts(date(2026, 10, 15))) == 2
+
+    store.append(hourly(1, start=T0 + timedelta(hours=3)))  # 01:00 on the 16th
+    assert len(store.parts(date(2026, 10, 15))) == 1
+    assert len(store.parts(date(2026, 10, 16))) == 1
+    assert store.read(end=datetime(2026, 10, 16))["util_percent"].tolist() == [0, 0]
+
+
+def test_drop_before_removes_whole_partitions(store):
+    store.append(hourly(72, start=datetime(2026, 10, 14, tzinfo=timezone.utc)))
+    assert store.drop_before(date(2026, 10, 16)) == [date(2026, 10, 14), date(2026, 10, 15)]
+    assert store.days() == [date(2026, 10, 16)]
+    assert not store.partition(date(2026, 10, 14)).exists()
+    assert store.drop_before(date(2026, 10, 16)) == []
+
+
+def test_import_csv(store, tmp_path):
+    legacy = pd.DataFrame(hourly(30)).drop(columns=["bus_id"])  # older files lack columns
+    legacy["timestamp"] = legacy["timestamp"].map(lambda t: t.isoformat())
+    legacy["unused"] = "x"
+    csv = tmp_path / "gpu_metrics.csv"
+    legacy.to_csv(csv, index=False)
+
+    assert import_csv(csv, store, chunksize=7) == 30
+    assert all(len(store.parts(day)) == 1 for day in store.days())
+    df = store.read()
+    assert df["util_percent"].tolist() == list(range(30))
+    assert df["bus_id"].isna().all()
+    assert df["timestamp"].iloc[0] == pd.Timestamp(T0)
+
+
+def test_parquet_sink_batches_into_store(tmp_path):
+    sink = ParquetSink(tmp_path, "gpu", max_rows=4, max_age=3600)
+    sink.write_many(hourly(3))
+    assert sink.store is None  # nothing written yet, store not opened
+    sink.write(gpu_row(T0 + timedelta(hours=3)))
+    assert len(sink) == 0
+    sink.write(gpu_row(T0 + timedelta(hours=4)))
+    sink.close()
+    assert len(open_store(tmp_path, "gpu").read()) == 5
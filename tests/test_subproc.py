@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from mysmtp.subproc import hostname, probe, run, run_all, run_many
+
+
+def alive(pid):
+    """Whether ``pid`` still runs (a killed child not reaped yet does not)."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def pids_in(path):
+    return [int(p) for p in path.read_text().split()]
+
+
+def test_run_captures_output_and_exit_code():
+    ok, failed, missing = run_all([
+        ["sh", "-c", "echo out; echo err >&2"],
+        ["sh", "-c", "exit 3"],
+        ["no-such-command-here"],
+    ])
+    assert (ok.ok, ok.stdout, ok.stderr) == (True, "out\n", "err\n")
+    assert (failed.ok, failed.returncode, failed.timed_out) == (False, 3, False)
+    assert missing.returncode is None and "no-such-command-here" in missing.stderr
+
+
+def test_timeout_kills_child(tmp_path):
+    pids = tmp_path / "pids"
+    [result] = run_all([["sh", "-c", f"echo $$ >> {pids}; exec sleep 30"]], timeout=0.3)
+    assert result.timed_out and result.returncode is None
+    assert result.elapsed < 5
+    assert not alive(pids_in(pids)[0])
+
+
+def test_cancelled_run_kills_child(tmp_path):
+    pids = tmp_path / "pids"
+
+    async def cancel_soon():
+        task = asyncio.create_task(run(["sh", "-c", f"echo $$ >> {pids}; exec sleep 30"]))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_soon())
+    assert not alive(pids_in(pids)[0])
+
+
+def test_run_many_bounds_concurrency_and_keeps_order():
+    commands = [["sh", "-c", f"sleep 0.3; echo {i}"] for i in range(4)]
+    t0 = time.monotonic()
+    results = run_all(commands, concurrency=2)
+    elapsed = time.monotonic() - t0
+    assert [r.stdout for r in results] == ["0\n", "1\n", "2\n", "3\n"]
+    assert 0.6 <= elapsed < 3  # two rounds of two
+
+
+def test_run_many_cancelled_kills_every_child(tmp_path):
+    pids = tmp_path / "pids"
+    commands = [["sh", "-c", f"echo $$ >> {pids}; exec sleep 30"]] * 3
+
+    async def give_up():
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(run_many(commands, concurrency=3), 0.5)
+
+    asyncio.run(give_up())
+    assert len(pids_in(pids)) == 3
+    assert not any(alive(pid) for pid in pids_in(pids))
+
+
+def test_children_killed_when_cancelled_twice(tmp_path):
+    # a plain gather gives up on the other runs at the first cancellation;
+    # asyncio.run then cancels them again while they are cleaning up
+    pids = tmp_path / "pids"
+    sleeper = ["sh", "-c", f"echo $$ >> {pids}; exec sleep 30"]
+
+    async def give_up():
+        with pytest.raises(TimeoutError):
+            await asyncio.wait_for(asyncio.gather(*(run(sleeper) for _ in range(3))), 0.5)
+
+    for _ in range(3):
+        asyncio.run(give_up())
+    time.sleep(0.1)
+    assert len(pids_in(pids)) == 9
+    assert not any(alive(pid) for pid in pids_in(pids))
+
+
+def test_cached_probes():
+    assert hostname() == socket.gethostname()
+    probe.cache_clear()
+    assert probe("echo", "hi") == "hi"
+    probe("echo", "hi")
+    assert probe.cache_info().hits == 1
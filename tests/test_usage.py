@@ -0,0 +1,93 @@
+import pwd
+
+import pytest
+
+from mysmtp.top import usage
+from mysmtp.top.usage import SystemCpuSampler, cpu_percent, cpu_util, read_cpu_times_all
+
+
+def write_stat(path, cpu, *cores):
+    rows = [("cpu", cpu)] + [(f"cpu{i}", c) for i, c in enumerate(cores)]
+    path.write_text(
+        "".join(f"{name} {' '.join(map(str, f))} 0 0\n" for name, f in rows) + "intr 12345 0 0\n"
+    )
+
+
+def test_read_cpu_times_all(tmp_path):
+    stat = tmp_path / "stat"
+    write_stat(stat, [1, 2, 3, 4, 5, 6, 7, 8], [1] * 8, [2] * 8)
+    times = read_cpu_times_all(str(stat))
+    assert times == {"cpu": [1, 2, 3, 4, 5, 6, 7, 8], "cpu0": [1] * 8, "cpu1": [2] * 8}
+
+
+def test_cpu_util():
+    #           user nice sys idle iowait irq softirq steal
+    t1 = [0, 0, 0, 0, 0, 0, 0, 0]
+    t2 = [30, 10, 10, 40, 5, 2, 3, 0]
+    u = cpu_util(t1, t2)
+    assert (u.busy, u.user, u.system, u.iowait, u.idle) == (55.0, 40.0, 15.0, 5.0, 40.0)
+    assert cpu_util(t2, t2).idle == 100.0
+
+
+def test_sampler_shares_snapshots(tmp_path, monkeypatch):
+    stat = tmp_path / "stat"
+    write_stat(stat, [0] * 8, [0] * 8, [0] * 8)
+    now = [100.0]
+    monkeypatch.setattr(usage.time, "monotonic", lambda: now[0])
+    sampler = SystemCpuSampler(str(stat), max_age=0.5)
+
+    write_stat(stat, [50, 0, 0, 150, 0, 0, 0, 0], [50, 0, 0, 50, 0, 0, 0, 0], [0, 0, 0, 100, 0, 0, 0, 0])
+    now[0] = 101.0
+    snap = sampler.sample()
+    assert snap.elapsed == 1.0
+    assert snap.total.busy == 25.0
+    assert [c.busy for c in snap.cores] == [50.0, 0.0]
+
+    write_stat(stat, [100, 0, 0, 200, 0, 0, 0, 0])
+    now[0] = 101.2
+    assert sampler.sample() is snap  # within max_age: no new read
+    now[0] = 102.0
+    assert sampler.sample().total.busy == 50.0
+
+
+def test_cpu_percent_blocks_by_default(monkeypatch):
+    reads = iter([{"cpu": [0] * 8}, {"cpu": [25, 0, 0, 75, 0, 0, 0, 0]}])
+    slept = []
+    monkeypatch.setattr(usage, "read_cpu_times_all", lambda path="/proc/stat": next(reads))
+    monkeypatch.setattr(usage.time, "sleep", slept.append)
+    assert cpu_percent() == 25.0
+    assert slept == [1.0]
+
+
+def test_cpu_percent_without_interval_uses_shared_sampler(monkeypatch):
+    class Fixed:
+        def sample(self):
+            return usage.CpuSnapshot(0.0, 1.0, usage.CpuUtil(42.0, 0, 0, 0, 0, 58.0), [])
+
+    monkeypatch.setattr(usage, "_shared_cpu", Fixed())
+    monkeypatch.setattr(usage.time, "sleep", pytest.fail)
+    assert cpu_percent(None) == 42.0
+
+
+def passwd(name, uid, shell):
+    return pwd.struct_passwd((name, "x", uid, uid, "", f"/home/{name}", shell))
+
+
+@pytest.fixture
+def directory(monkeypatch):
+    entries = [
+        passwd("root", 0, "/bin/bash"),
+        passwd("alice", 1000, "/bin/bash"),
+        passwd("svc", 1001, "/sbin/nologin"),
+        passwd("locked", 1002, "/usr/bin/false"),
+        passwd("blank", 1003, ""),
+    ]
+    directory = usage.UserDirectory()
+    monkeypatch.setattr(directory, "all", lambda: entries)
+    monkeypatch.setattr(directory, "get", {e.pw_uid: e for e in entries}.get)
+    monkeypatch.setattr(usage, "_directory", directory)
+
+
+def test_login_shell_checks_agree(directory):
+    assert [u["username"] for u in usage.list_human_users()] == ["alice"]
+    assert [uid for uid in (1000, 1001, 1002, 1003, 4242) if usage.is_human_user_ldap(uid)] == [1000]
@@ -0,0 +1,154 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from mysmtp.wtmp import (
+    BOOT_TIME,
+    DEAD_PROCESS,
+    LOGIN_PROCESS,
+    RECORD,
+    RUN_LVL,
+    USER_PROCESS,
+    WtmpReader,
+    load_records,
+    pack_record,
+    sessions_frame,
+)
+
+T0 = 1_700_000_000.0
+
+
+def login(line, user, t, host="10.0.0.1", pid=100):
+    return pack_record(LOGIN_PROCESS, line, "LOGIN", time=t - 1, pid=pid) + pack_record(
+        USER_PROCESS, line, user, host, t, pid
+    )
+
+
+def logout(line, t, pid=100):
+    return pack_record(DEAD_PROCESS, line, time=t, pid=pid)
+
+
+def append(path, *records):
+    with open(path, "ab") as fh:
+        fh.write(b"".join(records))
+
+
+def spans(sessions):
+    return sorted(
+        (s.user, s.line, s.start.timestamp() - T0, s.end and s.end.timestamp() - T0) for s in sessions
+    )
+
+
+@pytest.fixture
+def wtmp(tmp_path):
+    """Two closed sessions, one still open."""
+    path = tmp_path / "wtmp"
+    append(
+        path,
+        pack_record(BOOT_TIME, "~", "reboot", time=T0),
+        login("pts/0", "alice", T0 + 10),
+        login("pts/1", "bob", T0 + 20, pid=101),
+        logout("pts/0", T0 + 70),
+        login("pts/0", "carol", T0 + 80, pid=102),
+        logout("pts/1", T0 + 90, pid=101),
+    )
+    return path
+
+
+def test_load_records_keeps_login_records(wtmp):
+    recs = load_records(wtmp)
+    assert recs["type"].tolist() == [BOOT_TIME] + [USER_PROCESS] * 2 + [DEAD_PROCESS, USER_PROCESS, DEAD_PROCESS]
+    assert recs["user"].tolist()[1:3] == [b"alice", b"bob"]
+    assert recs["sec"][1] == T0 + 10
+
+
+def test_load_records_leaves_partial_record(wtmp):
+    size = wtmp.stat().st_size
+    append(wtmp, pack_record(RUN_LVL, "~~", "shutdown", time=T0 + 100)[:100])
+    assert len(load_records(wtmp)) == 6
+    assert len(load_records(wtmp, offset=size)) == 0
+    assert len(load_records(wtmp, offset=2 * RECORD.size, size=5 * RECORD.size)) == 2  # alice, LOGIN, bob
+
+
+def test_pairs_logins_and_logouts(wtmp):
+    reader = WtmpReader(wtmp)
+    assert spans(reader.read()) == [("alice", "pts/0", 10, 70), ("bob", "pts/1", 20, 90)]
+    assert spans(reader.open.values()) == [("carol", "pts/0", 80, None)]
+
+
+def test_new_login_on_a_line_ends_the_previous_one(tmp_path):
+    path = tmp_path / "wtmp"
+    append(path, login("pts/3", "alice", T0), login("pts/3", "bob", T0 + 30))
+    assert spans(WtmpReader(path).read()) == [("alice", "pts/3", 0, 30)]
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        pack_record(BOOT_TIME, "~", "reboot", time=T0 + 200),
+        pack_record(RUN_LVL, "~~", "shutdown", time=T0 + 200),
+    ],
+    ids=["reboot", "shutdown"],
+)
+def test_reboot_ends_every_session(wtmp, record):
+    reader = WtmpReader(wtmp)
+    reader.read()
+    append(wtmp, login("pts/1", "dave", T0 + 150), record)
+    assert spans(reader.read()) == [("carol", "pts/0", 80, 200), ("dave", "pts/1", 150, 200)]
+    assert reader.open == {}
+
+
+def test_reads_only_appended_records(wtmp):
+    reader = WtmpReader(wtmp)
+    reader.read()
+    assert reader.read() == []
+
+    tail = logout("pts/0", T0 + 300, pid=102)
+    append(wtmp, tail[:50])  # still being written
+    assert reader.read() == []
+    append(wtmp, tail[50:])
+    assert spans(reader.read()) == [("carol", "pts/0", 80, 300)]
+    assert reader.offset == wtmp.stat().st_size
+
+
+def test_state_survives_restart(wtmp, tmp_path):
+    state = tmp_path / "state" / "wtmp.json"
+    assert len(WtmpReader(wtmp, state).read()) == 2
+
+    append(wtmp, logout("pts/0", T0 + 300, pid=102))
+    reader = WtmpReader(wtmp, state)
+    assert spans(reader.read()) == [("carol", "pts/0", 80, 300)]
+
+    other = WtmpReader(tmp_path / "btmp", state)  # a snapshot of another file is ignored
+    assert (other.offset, other.open) == (0, {})
+
+
+def test_rotation_finishes_the_old_file(wtmp):
+    reader = WtmpReader(wtmp)
+    reader.read()
+
+    # records written just before rotation, then logrotate moves wtmp to wtmp.1
+    append(wtmp, login("pts/1", "dave", T0 + 150, pid=103))
+    os.rename(wtmp, wtmp.with_name("wtmp.1"))
+    append(wtmp, logout("pts/0", T0 + 300, pid=102), logout("pts/1", T0 + 310, pid=103))
+
+    assert spans(reader.read()) == [("carol", "pts/0", 80, 300), ("dave", "pts/1", 150, 310)]
+    assert reader.offset == wtmp.stat().st_size
+    assert reader.inode == wtmp.stat().st_ino
+
+
+def test_truncated_file_is_read_from_the_start(wtmp):
+    reader = WtmpReader(wtmp)
+    reader.read()
+    with open(wtmp, "wb") as fh:
+        fh.write(login("pts/5", "erin", T0 + 500) + logout("pts/5", T0 + 560))
+    assert spans(reader.read()) == [("erin", "pts/5", 500, 560)]
+
+
+def test_sessions_frame(wtmp):
+    now = datetime.fromtimestamp(T0 + 100)
+    df = sessions_frame(WtmpReader(wtmp).sessions(), now=now)
+    assert df["user"].tolist() == ["alice", "bob", "carol"]
+    assert df["duration_seconds"].tolist() == [60.0, 70.0, 20.0]
+    assert df["remote"].iloc[0] == "10.0.0.1"